@@ -29,4 +29,24 @@ def create_app(config_class='config.DevelopmentConfig'):
     from .routes import init_routes
     init_routes(app)  # 确保所有路由在此之后添加
 
+    # 4. 后台任务队列
+    from .utils.job_queue import init_job_queue
+    init_job_queue(app)
+
+    # 5. 进程内目录索引
+    from .utils.catalog import init_package_catalog
+    init_package_catalog(app)
+
+    # 6. 首页文档流
+    from .utils.home_feed import init_home_feed
+    init_home_feed(app)
+
+    # 7. 下载统计
+    from .utils.download_stats import init_download_stats
+    init_download_stats(app)
+
+    # 8. 命令行命令
+    from .commands import init_commands
+    init_commands(app)
+
     return app
\ No newline at end of file
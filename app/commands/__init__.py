@@ -0,0 +1,8 @@
+def init_commands(app):
+    """集中注册所有命令行命令（flask <group> <command>）"""
+    from .images import images_cli
+    app.cli.add_command(images_cli)
+    from .packages import packages_cli
+    app.cli.add_command(packages_cli)
+    from .documents import documents_cli
+    app.cli.add_command(documents_cli)
@@ -0,0 +1,35 @@
+import json
+
+import click
+from flask.cli import AppGroup
+
+from app.utils.image_gc import collect_orphan_images
+
+images_cli = AppGroup('images', help='图片维护命令')
+
+
+@images_cli.command('gc')
+@click.option('--grace-hours', default=24, show_default=True, type=float, help='宽限期(小时)，只回收早于该时长的图片')
+@click.option('--chunk-size', default=1000, show_default=True, type=int, help='每批处理数量(最大1000)')
+@click.option('--dry-run', is_flag=True, help='只统计，不删除')
+@click.option('--rate-limit', default=None, type=float, help='每秒最多删除的图片数')
+@click.option('--metrics', is_flag=True, help='以JSON输出统计信息')
+def gc_images(grace_hours, chunk_size, dry_run, rate_limit, metrics):
+    """回收未上传或未被引用的图片（数据库记录 + OSS对象）"""
+    stats = collect_orphan_images(
+        grace_hours=grace_hours,
+        chunk_size=chunk_size,
+        dry_run=dry_run,
+        rate_limit=rate_limit
+    )
+
+    if metrics:
+        click.echo(json.dumps(stats, ensure_ascii=False))
+        return
+
+    action = '待回收' if dry_run else '已回收'
+    click.echo(
+        f"扫描 {stats['scanned']} 张(未上传 {stats['not_uploaded']}，未引用 {stats['not_in_use']})，"
+        f"{action} {stats['scanned'] if dry_run else stats['rows_deleted']} 张，"
+        f"失败批次 {stats['errors']}，耗时 {stats['elapsed']}s"
+    )
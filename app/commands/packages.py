@@ -0,0 +1,78 @@
+import json
+
+import click
+from flask.cli import AppGroup
+
+from app.utils.arch_rescan import rescan_architectures
+from app.utils.package_retention import apply_retention, schedule_retention
+
+packages_cli = AppGroup('packages', help='软件包维护命令')
+
+
+@packages_cli.command('rescan-arch')
+@click.option('--chunk-size', default=200, show_default=True, type=int, help='每批处理数量')
+@click.option('--workers', default=None, type=int, help='解析进程数，默认CPU核数')
+@click.option('--checkpoint', default='rescan_arch.checkpoint.json', show_default=True,
+              help='检查点文件，中断后重新执行会从上次位置继续')
+@click.option('--restart', is_flag=True, help='忽略检查点，从头扫描')
+@click.option('--dry-run', is_flag=True, help='只统计，不写库')
+@click.option('--metrics', is_flag=True, help='以JSON输出统计信息')
+def rescan_arch(chunk_size, workers, checkpoint, restart, dry_run, metrics):
+    """重新读取存量 APK 的中央目录，回填 CPU 架构(ar)"""
+    stats = rescan_architectures(
+        chunk_size=max(1, chunk_size),
+        workers=workers,
+        checkpoint_path=checkpoint,
+        restart=restart,
+        dry_run=dry_run
+    )
+
+    if metrics:
+        click.echo(json.dumps(stats, ensure_ascii=False))
+        return
+
+    action = '待更新' if dry_run else '已更新'
+    click.echo(
+        f"扫描 {stats['scanned']} 个(重试 {stats['retried']}，解析 {stats['inspected']}，复用 {stats['memo_hits']}，"
+        f"不可读 {stats['missing']}，失败 {stats['errors']})，{action} {stats['changed']} 个，"
+        f"读取 {stats['bytes_read']} 字节，最后ID {stats['last_id']}，耗时 {stats['elapsed']}s"
+    )
+
+
+@packages_cli.command('retention')
+@click.option('--rules', 'rules_json', default=None,
+              help='保留规则(JSON列表)，默认使用配置 PACKAGE_RETENTION_RULES')
+@click.option('--chunk-size', default=200, show_default=True, type=int, help='每批删除数量(最大1000)')
+@click.option('--dry-run', is_flag=True, help='只输出报告，不删除')
+@click.option('--rate-limit', default=None, type=float, help='每秒最多删除的包数')
+@click.option('--schedule', is_flag=True, help='不立即执行，按 PACKAGE_RETENTION_INTERVAL 投递定时任务')
+@click.option('--metrics', is_flag=True, help='以JSON输出统计信息')
+def retention(rules_json, chunk_size, dry_run, rate_limit, schedule, metrics):
+    """按保留规则删除旧构建（OSS对象 + 数据库记录 + 增量补丁）"""
+    if schedule:
+        job = schedule_retention(delay=0)
+        click.echo(f"已投递定时任务 {job.id}" if job else "未投递：定时间隔为 0 或已有待执行的任务")
+        return
+
+    try:
+        rules = json.loads(rules_json) if rules_json else None
+        stats = apply_retention(rules=rules, chunk_size=chunk_size, dry_run=dry_run, rate_limit=rate_limit)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--rules')
+
+    if metrics:
+        click.echo(json.dumps(stats, ensure_ascii=False))
+        return
+
+    for report in stats['rules']:
+        click.echo(
+            f"规则 appname={report['appname']} system={report['system']} is_debug={report['is_debug']} "
+            f"每{'版本' if report['per'] == 'version' else '应用'}保留 {report['keep_last']} 个："
+            f"过期 {report['expired']} 个，{report['bytes']} 字节，示例ID {report['sample_ids']}"
+        )
+    action = '待删除' if dry_run else '已删除'
+    click.echo(
+        f"过期 {stats['expired']} 个({stats['bytes']} 字节)，{action} "
+        f"{stats['expired'] if dry_run else stats['rows_deleted']} 个，"
+        f"增量补丁 {stats['deltas_deleted']} 个，失败批次 {stats['errors']}，耗时 {stats['elapsed']}s"
+    )
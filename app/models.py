@@ -21,13 +21,29 @@ class Package(db.Model):
     ar = db.Column(db.String(256), nullable=True, comment='架构信息')
     package_name = db.Column(db.String(256), nullable=False, comment='包名')
     oss_key = db.Column(db.String(256), nullable=False, comment='oss的key值')
+    meta = db.Column(JSON, nullable=True, comment='服务端解析的安装包元数据')
     # 外键：指向 Icon 表的 id
     icon_id = db.Column(db.Integer, db.ForeignKey('icons.id'))
     
     # 关系定义：backref 可选的，用于反向访问
     icon = db.relationship('Icon', backref='packages', lazy='joined')
     # lazy='joined' 表示查询 Package 时自动联表加载 Icon
+
+    __table_args__ = (
+        # 搜索接口的游标分页：等值过滤在前，排序键 (create_time, id) 在后
+        db.Index('ix_packages_search', 'appname', 'system', 'is_debug', 'version', 'create_time', 'id'),
+        # 只按应用名查询时直接按时间倒序定位
+        db.Index('ix_packages_appname_time', 'appname', 'create_time', 'id'),
+    )
     
+    # 列表接口默认返回的字段（不含 meta 和内嵌的 icon 对象）
+    LIST_FIELDS = (
+        'id', 'appname', 'version', 'name', 'size', 'system', 'create_time',
+        'is_debug', 'comment', 'ar', 'package_name', 'oss_key', 'icon_id'
+    )
+    # ?fields= 允许选择的字段
+    SELECTABLE_FIELDS = LIST_FIELDS + ('meta',)
+
     def __repr__(self):
         return f'<Package {self.name}@{self.version}>'
     
@@ -49,6 +65,7 @@ class Package(db.Model):
             'ar': self.ar,
             'package_name': self.package_name,
             'oss_key': self.oss_key,
+            'meta': self.meta,
             'icon_id': self.icon_id,
             'icon': self.icon.to_dict() if self.icon else None
         }
@@ -245,6 +262,13 @@ class doc_tag(db.Model):
     tag_id = db.Column(db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'))
     doc_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'))
 
+    __table_args__ = (
+        # 按标签找文档(倒排)，同时保证同一标签不会重复挂到同一文档上
+        db.UniqueConstraint('tag_id', 'doc_id', name='uq_doc_tag_tag_doc'),
+        # 按文档找标签 / EXISTS 半连接探测
+        db.Index('ix_doc_tag_doc_tag', 'doc_id', 'tag_id'),
+    )
+
     
     def to_dict(self):
         """
@@ -267,6 +291,7 @@ class Images(db.Model):
     oss_key = db.Column(db.String(256), nullable=False, comment='oss的key值')
     uploaded = db.Column(db.Boolean, default=False, comment="是否成功上传oss")
     in_use = db.Column(db.Boolean, default=False, comment="是否使用到")
+    created_at = db.Column(db.DateTime, server_default=func.now(), comment='预留时间')
 
     def to_dict(self):
         """
@@ -276,7 +301,8 @@ class Images(db.Model):
             'id': self.id,
             'oss_key': self.oss_key,
             'uploaded': self.uploaded,
-            'in_use': self.in_use
+            'in_use': self.in_use,
+            'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
 
@@ -352,4 +378,128 @@ class StatusChangeRecord(db.Model):
     operator_id = db.Column(db.String(50))     # 操作人账号ID
     operator_name = db.Column(db.String(50))   # 操作人账号名
     operated_at = db.Column(db.DateTime, default=datetime.utcnow)
-    extra_info = db.Column(JSON)  # 存储gitee_url/ignore_reason等额外信息
\ No newline at end of file
+    extra_info = db.Column(JSON)  # 存储gitee_url/ignore_reason等额外信息
+
+class Job(db.Model):
+    """
+    后台任务模型（数据库持久化的任务队列）
+    """
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    kind = db.Column(db.String(64), nullable=False, comment='任务类型')
+    payload = db.Column(JSON, comment='任务参数')
+    status = db.Column(db.String(20), default='pending', nullable=False, comment='pending/running/succeeded/failed')
+    attempts = db.Column(db.Integer, default=0, nullable=False, comment='已执行次数')
+    max_attempts = db.Column(db.Integer, default=5, nullable=False, comment='最大执行次数')
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment='最早执行时间')
+    locked_by = db.Column(db.String(128), comment='执行中的worker')
+    locked_at = db.Column(db.DateTime, comment='开始执行时间')
+    heartbeat_at = db.Column(db.DateTime, comment='执行中的worker最近一次心跳时间')
+    last_error = db.Column(db.Text, comment='最近一次错误信息')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment='创建时间')
+    finished_at = db.Column(db.DateTime, comment='结束时间')
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    def to_dict(self):
+        """
+        将模型转换为字典格式
+        """
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'locked_by': self.locked_by,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ChangeGeneration(db.Model):
+    """
+    数据变更代数：每次写入对应数据时在同一事务内 +1，
+    各 worker 进程通过比较代数判断本地内存索引是否过期
+    """
+    __tablename__ = 'change_generations'
+
+    name = db.Column(db.String(64), primary_key=True, comment='数据集名称')
+    generation = db.Column(db.BigInteger, default=0, nullable=False, comment='变更代数')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='最近变更时间')
+
+class PackageStats(db.Model):
+    """软件包下载统计：每个包一行，各进程刷新时把增量合并进来"""
+    __tablename__ = 'package_stats'
+
+    package_id = db.Column(db.Integer, primary_key=True, autoincrement=False, comment='软件包ID')
+    downloads = db.Column(db.BigInteger, default=0, nullable=False, comment='下载次数')
+    sketch = db.Column(db.LargeBinary, nullable=False, comment='设备ID的HyperLogLog寄存器')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment='最近刷新时间')
+
+class PackageDelta(db.Model):
+    """
+    两个构建之间的增量补丁（from_id 的安装包 + 补丁 = to_id 的安装包）
+    """
+    __tablename__ = 'package_deltas'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    from_id = db.Column(db.Integer, nullable=False, comment='旧版本软件包ID')
+    to_id = db.Column(db.Integer, nullable=False, comment='新版本软件包ID')
+    status = db.Column(db.String(20), default='pending', nullable=False, comment='pending/ready/skipped/failed')
+    oss_key = db.Column(db.String(256), comment='补丁文件的oss key')
+    size = db.Column(db.BigInteger, comment='补丁大小(字节)')
+    full_size = db.Column(db.BigInteger, comment='新版本安装包大小(字节)')
+    error = db.Column(db.Text, comment='失败原因')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, comment='创建时间')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='更新时间')
+
+    __table_args__ = (
+        db.UniqueConstraint('from_id', 'to_id', name='uq_package_deltas_pair'),
+        db.Index('ix_package_deltas_to_id', 'to_id'),
+    )
+
+    def to_dict(self):
+        """
+        将模型转换为字典格式
+        """
+        return {
+            'id': self.id,
+            'from_id': self.from_id,
+            'to_id': self.to_id,
+            'status': self.status,
+            'size': self.size,
+            'full_size': self.full_size,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class DocSearchTerm(db.Model):
+    """
+    文档全文检索倒排表：词项 -> 文档，主键 (term, doc_id) 即倒排链，按词项范围扫描
+    """
+    __tablename__ = 'doc_search_terms'
+
+    term = db.Column(db.String(32), primary_key=True, comment='词项(中文单字/双字、英文单词)')
+    doc_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True,
+                       autoincrement=False, comment='文档ID')
+    tf = db.Column(db.SmallInteger, nullable=False, comment='加权词频(标题中出现计2次)')
+
+    __table_args__ = (
+        db.Index('ix_doc_search_terms_doc_id', 'doc_id'),
+    )
+
+class DocSearchDoc(db.Model):
+    """
+    文档全文检索的文档长度，BM25 长度归一化使用
+    """
+    __tablename__ = 'doc_search_docs'
+
+    doc_id = db.Column(db.Integer, db.ForeignKey('documents.id', ondelete='CASCADE'), primary_key=True,
+                       autoincrement=False, comment='文档ID')
+    length = db.Column(db.Integer, nullable=False, comment='加权词项总数')
@@ -4,6 +4,7 @@ from .tag_repository import TagRepository
 from .image_repository import ImageRepository
 from .doc_image_repository import DocImageRepository
 from .result import RepoResult
+from .pagination import Page
 
 __all__ = [
 	'DocumentRepository', 
@@ -11,4 +12,5 @@ __all__ = [
 	'TagRepository',
 	'ImageRepository', 
     'DocImageRepository',
-    'RepoResult']
\ No newline at end of file
+    'RepoResult',
+    'Page']
\ No newline at end of file
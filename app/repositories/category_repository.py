@@ -1,5 +1,10 @@
 from typing import List, Optional
 from app.models import db, Categories
+from .document_repository import DOCUMENT_GENERATION
+from .generation_repository import GenerationRepository
+from app.utils.generation import watcher_for
+
+CATEGORY_GENERATION = 'categories'
 
 class CategoryRepository:
     
@@ -22,7 +27,9 @@ class CategoryRepository:
             path=path or f"/{name}"
         )
         db.session.add(category)
+        generation = GenerationRepository.bump(CATEGORY_GENERATION)
         db.session.commit()
+        watcher_for(CATEGORY_GENERATION).note(generation)
         return category
     
     @staticmethod
@@ -36,7 +43,9 @@ class CategoryRepository:
             if hasattr(category, key):
                 setattr(category, key, value)
         
+        generation = GenerationRepository.bump(CATEGORY_GENERATION)
         db.session.commit()
+        watcher_for(CATEGORY_GENERATION).note(generation)
         return category
     
     @staticmethod
@@ -45,7 +54,12 @@ class CategoryRepository:
         category = Categories.query.get(category_id)
         if category:
             db.session.delete(category)
+            # 文档的 category_id 由外键置空，首页文档流需要重建
+            generation = GenerationRepository.bump(DOCUMENT_GENERATION)
+            category_generation = GenerationRepository.bump(CATEGORY_GENERATION)
             db.session.commit()
+            watcher_for(DOCUMENT_GENERATION).note(generation)
+            watcher_for(CATEGORY_GENERATION).note(category_generation)
             return True
         return False
     
@@ -54,6 +68,12 @@ class CategoryRepository:
         """获取子分类"""
         return Categories.query.filter_by(parent_id=parent_id).all()
     
+    @staticmethod
+    def get_rows():
+        """分类树的构建数据 [(id, name, parent_id), ...]"""
+        return db.session.query(Categories.id, Categories.name, Categories.parent_id)\
+            .order_by(Categories.id).all()
+
     @staticmethod
     def get_tree() -> List[dict]:
         """获取分类树形结构"""
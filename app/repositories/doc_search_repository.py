@@ -0,0 +1,94 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, insert, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.sql import func
+from app.models import db, Documents, DocSearchTerm, DocSearchDoc
+from app.utils.search_terms import document_terms
+
+
+class DocSearchRepository:
+    """文档全文检索的倒排表读写，写入方法都不提交，随文档本身的写入一起提交"""
+
+    @staticmethod
+    def index(doc_id: int, title: Optional[str], short_content: Optional[str]) -> None:
+        """重建单个文档的倒排记录"""
+        DocSearchRepository.index_many([(doc_id, title, short_content)])
+
+    @staticmethod
+    def index_many(docs: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> int:
+        """
+        批量重建倒排记录（先删后插，各一条语句）
+        :param docs: [(doc_id, title, short_content), ...]
+        :return: 写入的倒排记录数
+        """
+        term_rows, length_rows = [], []
+        for doc_id, title, short_content in docs:
+            counts, length = document_terms(title, short_content)
+            term_rows.extend({'term': term, 'doc_id': doc_id, 'tf': tf} for term, tf in counts.items())
+            length_rows.append({'doc_id': doc_id, 'length': length})
+        if not length_rows:
+            return 0
+
+        doc_ids = [row['doc_id'] for row in length_rows]
+        DocSearchTerm.query.filter(DocSearchTerm.doc_id.in_(doc_ids)).delete(synchronize_session=False)
+        if term_rows:
+            db.session.execute(insert(DocSearchTerm), term_rows)
+        stmt = mysql_insert(DocSearchDoc)
+        stmt = stmt.on_duplicate_key_update(length=stmt.inserted.length)
+        db.session.execute(stmt, length_rows)
+        return len(term_rows)
+
+    @staticmethod
+    def corpus_stats() -> Tuple[int, float]:
+        """:return: (已索引文档数, 平均加权长度)"""
+        count, avg_length = db.session.query(
+            func.count(DocSearchDoc.doc_id), func.avg(DocSearchDoc.length)
+        ).one()
+        return count or 0, float(avg_length or 0)
+
+    @staticmethod
+    def document_frequencies(terms: List[str]) -> Dict[str, int]:
+        """各词项出现的文档数（主键范围扫描，只读索引）"""
+        return dict(
+            db.session.query(DocSearchTerm.term, func.count())
+            .filter(DocSearchTerm.term.in_(terms))
+            .group_by(DocSearchTerm.term)
+            .all()
+        )
+
+    @staticmethod
+    def matching_ids(terms: List[str]):
+        """包含全部词项的文档ID子查询，供文档列表做半连接"""
+        return select(DocSearchTerm.doc_id)\
+            .where(DocSearchTerm.term.in_(terms))\
+            .group_by(DocSearchTerm.doc_id)\
+            .having(func.count() == len(terms))
+
+    @staticmethod
+    def ranked(idfs: Dict[str, float], avg_length: float, k1: float, b: float,
+               status: Optional[List[int]] = None, category_id: Optional[int] = None,
+               user_id: Optional[int] = None):
+        """
+        包含全部词项的文档及其 BM25 得分，按得分倒序（未分页）
+        :param idfs: 词项 -> idf
+        :return: Query，列为 (doc_id, score)
+        """
+        tf = DocSearchTerm.tf
+        norm = k1 * (1 - b + b * DocSearchDoc.length / (avg_length or 1))
+        weight = case(idfs, value=DocSearchTerm.term, else_=0)
+        score = func.sum(weight * tf * (k1 + 1) / (tf + norm)).label('score')
+
+        query = db.session.query(DocSearchTerm.doc_id, score)\
+            .join(DocSearchDoc, DocSearchDoc.doc_id == DocSearchTerm.doc_id)
+        if status is not None or category_id is not None or user_id:
+            query = query.join(Documents, Documents.id == DocSearchTerm.doc_id)
+            if status is not None:
+                query = query.filter(Documents.status.in_(status))
+            if category_id is not None:
+                query = query.filter(Documents.category_id == category_id)
+            if user_id:
+                query = query.filter(Documents.user_id == user_id)
+        return query.filter(DocSearchTerm.term.in_(list(idfs)))\
+            .group_by(DocSearchTerm.doc_id)\
+            .having(func.count() == len(idfs))\
+            .order_by(score.desc(), DocSearchTerm.doc_id.desc())
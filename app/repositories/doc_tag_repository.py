@@ -1,5 +1,8 @@
 from typing import List
 from app.models import db, doc_tag, Documents, Tags
+from .document_repository import DOCUMENT_GENERATION
+from .generation_repository import GenerationRepository
+from app.utils.generation import watcher_for
 
 class DocTagRepository:
     
@@ -26,5 +29,7 @@ class DocTagRepository:
     def delete_relations_for_document(doc_id: int) -> int:
         """删除文档的所有标签关系"""
         count = doc_tag.query.filter_by(doc_id=doc_id).delete()
+        generation = GenerationRepository.bump(DOCUMENT_GENERATION)
         db.session.commit()
+        watcher_for(DOCUMENT_GENERATION).note(generation)
         return count
\ No newline at end of file
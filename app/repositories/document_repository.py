@@ -1,6 +1,25 @@
 from datetime import datetime
 from typing import List, Optional
+from sqlalchemy import exists, select
+from sqlalchemy.exc import IntegrityError
 from app.models import db, Documents, Categories, Tags, doc_tag
+from app.utils.search_terms import query_terms
+from app.utils.generation import watcher_for
+from .doc_search_repository import DocSearchRepository
+from .generation_repository import GenerationRepository
+from .pagination import Page, paginate
+
+DOCUMENT_GENERATION = 'documents'              # 已发布文档及其标签、分类归属的变更代数（首页文档流依赖）
+DRAFT_GENERATION = 'document_drafts'           # 只涉及未发布文档的变更代数
+PUBLISHED = 3
+
+
+def count_generations(status=None):
+    """分页总数缓存依赖的代数：只列已发布文档时，草稿的写入不影响总数"""
+    if status is not None and set(status) == {PUBLISHED}:
+        return (DOCUMENT_GENERATION,)
+    return (DOCUMENT_GENERATION, DRAFT_GENERATION)
+
 
 class DocumentRepository:
     
@@ -8,6 +27,14 @@ class DocumentRepository:
     def get_by_id(doc_id: int) -> Optional[Documents]:
         """根据ID获取文档"""
         return Documents.query.get(doc_id)
+
+    @staticmethod
+    def get_by_ids(doc_ids: List[int]) -> List[Documents]:
+        """按给定ID顺序批量获取文档（跳过已不存在的ID）"""
+        if not doc_ids:
+            return []
+        docs = {doc.id: doc for doc in Documents.query.filter(Documents.id.in_(doc_ids)).all()}
+        return [docs[doc_id] for doc_id in doc_ids if doc_id in docs]
     
     @staticmethod
     def create(user_id: int, oss_key: str, title:str = '新建文章', short_content: str = None, 
@@ -22,7 +49,11 @@ class DocumentRepository:
             category_id=category_id
         )
         db.session.add(doc)
+        db.session.flush()
+        DocSearchRepository.index(doc.id, title, short_content)
+        bumped = DocumentRepository._bump(status == PUBLISHED)
         db.session.commit()
+        DocumentRepository._after_commit(bumped, doc.id)
         # print(doc.to_dict())
         return doc
     
@@ -36,14 +67,21 @@ class DocumentRepository:
             return None
 
         print(kwargs)
+        was_published = doc.status == PUBLISHED
         for key, value in kwargs.items():
             if key == 'id':
                 continue
             if hasattr(doc, key) and value!=None:
                 setattr(doc, key, value)
+
+        # 标题或摘要变化时同步更新全文检索倒排表
+        if kwargs.get('title') is not None or kwargs.get('short_content') is not None:
+            DocSearchRepository.index(doc.id, doc.title, doc.short_content)
         
         doc.updated_at = db.func.now()
+        bumped = DocumentRepository._bump(was_published or doc.status == PUBLISHED)
         db.session.commit()
+        DocumentRepository._after_commit(bumped, doc.id)
         return doc
     
     @staticmethod
@@ -51,8 +89,10 @@ class DocumentRepository:
         """删除文档"""
         doc = Documents.query.get(doc_id)
         if doc:
+            bumped = DocumentRepository._bump(doc.status == PUBLISHED)
             db.session.delete(doc)
             db.session.commit()
+            DocumentRepository._after_commit(bumped, doc_id)
             return True
         return False
     
@@ -64,8 +104,11 @@ class DocumentRepository:
         status: Optional[int] = None,
         title: Optional[str] = None,
         category_id: Optional[int] = None,
-        tag_ids: Optional[List[int]] = None
-    ):
+        tag_ids: Optional[List[int]] = None,
+        match_all: bool = False,
+        with_total: bool = True,
+        include_descendants: bool = False
+    ) -> Page:
         """
         分页获取用户文档（支持多条件筛选）
         
@@ -73,10 +116,13 @@ class DocumentRepository:
         :param page: 页码
         :param per_page: 每页数量
         :param status: 文档状态筛选（可选）
-        :param title: 标题关键词模糊搜索（可选）
+        :param title: 关键词检索标题和摘要（可选，走全文检索倒排表，需包含全部词项）
         :param category_id: 分类ID筛选（可选）
         :param tag_ids: 标签ID列表（筛选包含任一标签的文档，可选）
-        :return: Flask-SQLAlchemy Pagination对象
+        :param match_all: 为 True 时只返回包含全部 tag_ids 的文档
+        :param with_total: False 时不计算总数，只返回 has_more
+        :param include_descendants: 为 True 时 category_id 包含其全部子孙分类
+        :return: Page，总数按筛选条件缓存到下一次文档写入
         """
         query = Documents.query
 
@@ -88,30 +134,70 @@ class DocumentRepository:
         if status is not None:
             query = query.filter(Documents.status.in_(status))
         
-        # 标题模糊搜索
+        # 关键词检索：半连接倒排表；关键词里没有可检索的词项(如只有标点)时退回标题模糊匹配
+        terms = query_terms(title) if title else []
         if title:
-            query = query.filter(Documents.title.ilike(f'%{title}%'))
+            if terms:
+                query = query.filter(Documents.id.in_(DocSearchRepository.matching_ids(terms)))
+            else:
+                query = query.filter(Documents.title.ilike(f'%{title}%'))
         
-        # 分类筛选
+        # 分类筛选：包含子分类时由进程内分类树展开成ID列表，一个 IN 完成筛选
+        category_ids = None
         if category_id is not None:
-            query = query.filter(Documents.category_id == category_id)
+            if include_descendants:
+                from app.utils.category_tree import category_tree  # category_tree 依赖本模块，延迟导入
+                category_ids = category_tree.descendants(category_id)
+                query = query.filter(Documents.category_id.in_(category_ids))
+            else:
+                query = query.filter(Documents.category_id == category_id)
         
-        # 标签筛选（包含任一标签）
+        # 标签筛选：半连接，不联表展开也不需要 GROUP BY 去重
         if tag_ids:
-            query = query.join(doc_tag, Documents.id == doc_tag.doc_id)\
-                         .filter(doc_tag.tag_id.in_(tag_ids))\
-                         .group_by(Documents.id)\
-                         .having(db.func.count(doc_tag.tag_id) >= 1)
+            query = query.filter(DocumentRepository.tag_filter(tag_ids, match_all))
         
 
         # 排序并分页
-        return query.order_by(Documents.created_at.desc())\
-                   .paginate(page=page, per_page=per_page, error_out=False)
+        count_key = (
+            'documents',
+            str(user_id) if user_id else None,  # 原样参与筛选，非数字时只是匹配不到
+            tuple(sorted(status)) if status is not None else None,
+            tuple(terms) or (title or None),
+            category_ids or category_id,
+            tuple(sorted(set(tag_ids))) if tag_ids else None,
+            bool(match_all) and bool(tag_ids) and len(set(tag_ids)) > 1
+        )
+        return paginate(
+            query.order_by(Documents.created_at.desc(), Documents.id.desc()),
+            page=page,
+            per_page=per_page,
+            with_total=with_total,
+            count_key=count_key,
+            generations=count_generations(status)
+        )
     
+    @staticmethod
+    def tag_filter(tag_ids: List[int], match_all: bool = False):
+        """
+        文档的标签筛选条件
+        包含任一标签：EXISTS 半连接，逐个文档走 (doc_id, tag_id) 索引探测；
+        包含全部标签：在 (tag_id, doc_id) 唯一索引上按标签范围扫描各自的文档列表，取交集
+        """
+        tag_ids = sorted(set(tag_ids))
+        if match_all and len(tag_ids) > 1:
+            return Documents.id.in_(
+                select(doc_tag.doc_id)
+                .where(doc_tag.tag_id.in_(tag_ids))
+                .group_by(doc_tag.doc_id)
+                .having(db.func.count() == len(tag_ids))
+            )
+        return exists().where(doc_tag.doc_id == Documents.id, doc_tag.tag_id.in_(tag_ids))
+
     @staticmethod
     def add_tag(doc_id: int, tag_id: int) -> bool:
         """为文档添加标签"""
-        if not Documents.query.get(doc_id) or not Tags.query.get(tag_id):
+        doc = Documents.query.get(doc_id)
+        if not doc or not Tags.query.get(tag_id):
             return False
             
         existing = doc_tag.query.filter_by(doc_id=doc_id, tag_id=tag_id).first()
@@ -120,7 +206,14 @@ class DocumentRepository:
             
         relation = doc_tag(doc_id=doc_id, tag_id=tag_id)
         db.session.add(relation)
-        db.session.commit()
+        try:
+            bumped = DocumentRepository._bump(doc.status == PUBLISHED)
+            db.session.commit()
+        except IntegrityError:
+            # 并发请求已经添加了同一标签（唯一索引 uq_doc_tag_tag_doc）
+            db.session.rollback()
+            return True
+        DocumentRepository._after_commit(bumped, doc_id)
         return True
     
     @staticmethod
@@ -128,14 +221,65 @@ class DocumentRepository:
         """移除文档标签"""
         relation = doc_tag.query.filter_by(doc_id=doc_id, tag_id=tag_id).first()
         if relation:
+            doc = Documents.query.get(doc_id)
             db.session.delete(relation)
+            bumped = DocumentRepository._bump(doc is not None and doc.status == PUBLISHED)
             db.session.commit()
+            DocumentRepository._after_commit(bumped, doc_id)
             return True
         return False
     
     @staticmethod
-    def get_documents_by_category(category_id: int, page: int = 1, per_page: int = 10):
+    def get_documents_by_category(category_id: int, page: int = 1, per_page: int = 10,
+                                  with_total: bool = True) -> Page:
         """按分类获取文档"""
-        return Documents.query.filter_by(category_id=category_id)\
-                             .order_by(Documents.created_at.desc())\
-                             .paginate(page=page, per_page=per_page, error_out=False)
\ No newline at end of file
+        query = Documents.query.filter_by(category_id=category_id)\
+                             .order_by(Documents.created_at.desc(), Documents.id.desc())
+        return paginate(query, page=page, per_page=per_page, with_total=with_total,
+                        count_key=('category_documents', category_id), generations=count_generations())
+
+    @staticmethod
+    def get_feed_rows(status: int = PUBLISHED):
+        """
+        首页文档流的构建数据
+        :return: ([(id, created_at, category_id), ...], [(doc_id, tag_id), ...])
+        """
+        rows = db.session.query(Documents.id, Documents.created_at, Documents.category_id)\
+            .filter(Documents.status == status).all()
+        tag_rows = db.session.query(doc_tag.doc_id, doc_tag.tag_id)\
+            .join(Documents, Documents.id == doc_tag.doc_id)\
+            .filter(Documents.status == status).all()
+        return rows, tag_rows
+
+    @staticmethod
+    def _bump(published: bool):
+        """
+        在写入事务中递增变更代数：涉及已发布文档（写入前或写入后）时递增 documents，首页文档流随之更新；
+        只涉及草稿等未发布文档时递增 document_drafts，其他进程不需要重建首页文档流
+        :return: (代数名, 新代数)
+        """
+        name = DOCUMENT_GENERATION if published else DRAFT_GENERATION
+        return name, GenerationRepository.bump(name)
+
+    @staticmethod
+    def _after_commit(bumped, doc_id: int) -> None:
+        name, generation = bumped
+        if name == DOCUMENT_GENERATION:
+            DocumentRepository._sync_home_feed(generation, doc_id)
+        else:
+            watcher_for(name).note(generation)
+
+    @staticmethod
+    def _sync_home_feed(generation: int, doc_id: int) -> None:
+        """提交后把文档的当前状态同步到进程内首页文档流，并记录本进程的变更代数（home_feed 依赖本模块，延迟导入）"""
+        from app.utils.home_feed import home_feed, feed_entry
+
+        if home_feed.generation is not None:
+            doc = Documents.query.get(doc_id)
+            if doc is None or doc.status != PUBLISHED:
+                home_feed.apply(generation, delete=[doc_id])
+            else:
+                tag_ids = [tag_id for tag_id, in db.session.query(doc_tag.tag_id).filter(doc_tag.doc_id == doc_id)]
+                home_feed.apply(generation, upsert=[feed_entry(doc, tag_ids)])
+        # 分页总数缓存也以这个代数为键，本进程的写入立即可见
+        watcher_for(DOCUMENT_GENERATION).note(generation)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy.dialects.mysql import insert
+from app.models import db, ChangeGeneration
+
+
+class GenerationRepository:
+
+    @staticmethod
+    def bump(name: str) -> int:
+        """
+        变更代数 +1 并返回新值（不提交，随调用方的业务数据一起提交）
+        行锁会一直持有到事务结束，并发写入按提交顺序得到连续的代数
+        """
+        now = datetime.utcnow()
+        stmt = insert(ChangeGeneration).values(name=name, generation=1, updated_at=now)
+        stmt = stmt.on_duplicate_key_update(
+            generation=ChangeGeneration.generation + 1,
+            updated_at=now
+        )
+        db.session.execute(stmt)
+        return GenerationRepository.get(name)
+
+    @staticmethod
+    def get(name: str) -> int:
+        """读取当前代数，尚未有过变更时返回 0"""
+        value = db.session.query(ChangeGeneration.generation).filter(
+            ChangeGeneration.name == name
+        ).scalar()
+        return value or 0
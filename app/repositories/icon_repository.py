@@ -15,11 +15,17 @@ class IconRepository:
         return Icon.query.get(icon_id)
 
     @staticmethod
-    def create(icon_data):
-        """创建新包记录"""
+    def create(icon_data, commit=True):
+        """
+        创建新图标记录
+        :param commit: False 时只 flush，由调用方与其他写入（如上传任务）一起提交
+        """
         icon = Icon(**icon_data)
         db.session.add(icon)
-        db.session.commit()
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
         return icon
 
     @staticmethod
@@ -30,4 +36,27 @@ class IconRepository:
         :return: id（如果找到）或 None（如果没找到）
         """
         icon = Icon.query.filter_by(name=name).first()  # 查询第一条记录
-        return icon.id if icon else None  # 返回 id 或 None
\ No newline at end of file
+        return icon.id if icon else None  # 返回 id 或 None
+
+    @staticmethod
+    def get_by_names(names):
+        """
+        按多个候选 name 查找图标（用于兼容新旧两种 md5 命名）
+        :param names: name 列表
+        :return: 第一个匹配的 Icon 或 None
+        """
+        names = [name for name in names if name]
+        if not names:
+            return None
+        return Icon.query.filter(Icon.name.in_(names)).order_by(Icon.id).first()
+
+    @staticmethod
+    def get_map(icon_ids):
+        """
+        批量获取图标，用于列表接口的 icons 字段
+        :return: {id: icon_dict}
+        """
+        icon_ids = {icon_id for icon_id in icon_ids if icon_id}
+        if not icon_ids:
+            return {}
+        return {icon.id: icon.to_dict() for icon in Icon.query.filter(Icon.id.in_(icon_ids)).all()}
@@ -1,8 +1,16 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterator, List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
 from app.models import db, Images
 from .result import RepoResult
 
 class ImageRepository:
+
+    @staticmethod
+    def db_now() -> datetime:
+        """数据库服务器的当前时间，与 created_at 的 server_default(NOW()) 使用同一时钟和时区"""
+        return db.session.query(db.func.now()).scalar()
     
     @staticmethod
     def create(oss_key: str) -> Images:
@@ -56,7 +64,42 @@ class ImageRepository:
             db.session.rollback()
             return RepoResult.fail(f"数据库错误: {e}")
 
+    @staticmethod
+    def _orphan_filter(cutoff: datetime):
+        """未上传或未被引用，且预留时间早于 cutoff 的图片"""
+        return and_(
+            or_(Images.uploaded.is_(False), Images.in_use.is_(False)),
+            Images.created_at < cutoff
+        )
 
+    @staticmethod
+    def iter_orphan_chunks(cutoff: datetime, chunk_size: int = 1000,
+                           lock: bool = False) -> Iterator[List[Images]]:
+        """
+        按 id 游标分块遍历孤儿图片（keyset，不使用 OFFSET）
+        :param lock: True 时每块 SELECT ... FOR UPDATE，调用方需在处理完后提交事务
+        """
+        last_id = 0
+        while True:
+            query = Images.query.filter(
+                Images.id > last_id,
+                ImageRepository._orphan_filter(cutoff)
+            ).order_by(Images.id).limit(chunk_size)
+            if lock:
+                query = query.with_for_update()
 
-    
-    
+            chunk = query.all()
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            yield chunk
+
+    @staticmethod
+    def delete_by_ids(ids: List[int], cutoff: datetime) -> int:
+        """批量删除图片记录（再次校验孤儿条件，避免误删刚被引用的图片），不提交事务"""
+        if not ids:
+            return 0
+        return Images.query.filter(
+            Images.id.in_(ids),
+            ImageRepository._orphan_filter(cutoff)
+        ).delete(synchronize_session=False)
@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import func, case
+from app.models import db, Job
+
+
+class JobRepository:
+
+    @staticmethod
+    def enqueue(kind: str, payload: dict = None, run_at: datetime = None,
+                max_attempts: int = 5, commit: bool = True) -> Job:
+        """
+        新增一个待执行任务
+        :param commit: False 时只加入当前会话，由调用方随业务数据一起提交
+        """
+        job = Job(
+            kind=kind,
+            payload=payload or {},
+            status='pending',
+            attempts=0,
+            max_attempts=max_attempts,
+            run_at=run_at or datetime.utcnow()
+        )
+        db.session.add(job)
+        if commit:
+            db.session.commit()
+        return job
+
+    @staticmethod
+    def enqueue_many(kind: str, payloads: List[dict], run_at: datetime = None,
+                     max_attempts: int = 5, commit: bool = True) -> List[Job]:
+        """
+        批量新增同类任务，一次提交
+        :param commit: False 时只加入当前会话，由调用方随业务数据一起提交
+        """
+        run_at = run_at or datetime.utcnow()
+        jobs = [
+            Job(kind=kind, payload=payload or {}, status='pending', attempts=0,
+                max_attempts=max_attempts, run_at=run_at)
+            for payload in payloads
+        ]
+        db.session.add_all(jobs)
+        if commit:
+            db.session.commit()
+        return jobs
+
+    @staticmethod
+    def get(job_id: int) -> Optional[Job]:
+        """根据ID获取任务"""
+        return Job.query.get(job_id)
+
+    @staticmethod
+    def list(status: str = None, kind: str = None, limit: int = 50) -> List[Job]:
+        """按状态/类型查询最近的任务"""
+        query = Job.query
+        if status:
+            query = query.filter(Job.status == status)
+        if kind:
+            query = query.filter(Job.kind == kind)
+        return query.order_by(Job.id.desc()).limit(limit).all()
+
+    @staticmethod
+    def count_by_status() -> dict:
+        """各状态的任务数量"""
+        rows = db.session.query(Job.status, func.count(Job.id)).group_by(Job.status).all()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def claim_next(worker_id: str, batch: int = 5) -> Optional[Job]:
+        """
+        领取一个到期的任务（乐观锁：只有把 pending 改成 running 成功的 worker 才拿到任务）
+        """
+        now = datetime.utcnow()
+        candidates = db.session.query(Job.id).filter(
+            Job.status == 'pending',
+            Job.run_at <= now
+        ).order_by(Job.run_at).limit(batch).all()
+        db.session.commit()  # 结束只读事务，保证下次能看到新任务
+
+        for (job_id,) in candidates:
+            claimed = Job.query.filter(
+                Job.id == job_id,
+                Job.status == 'pending'
+            ).update({
+                'status': 'running',
+                'locked_by': worker_id,
+                'locked_at': now,
+                'heartbeat_at': now,
+                'attempts': Job.attempts + 1
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return Job.query.get(job_id)
+        return None
+
+    @staticmethod
+    def _owned(job_id: int, worker_id: str):
+        """仍由该 worker 执行中的任务（超时后被放回队列或其他 worker 接管的不算）"""
+        return Job.query.filter(Job.id == job_id, Job.status == 'running', Job.locked_by == worker_id)
+
+    @staticmethod
+    def heartbeat(job_id: int, worker_id: str) -> bool:
+        """
+        刷新执行中任务的心跳
+        :return: False 表示任务已不归该 worker 所有
+        """
+        updated = JobRepository._owned(job_id, worker_id).update(
+            {'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        return bool(updated)
+
+    @staticmethod
+    def mark_succeeded(job_id: int, worker_id: str) -> bool:
+        """
+        标记任务成功
+        :return: False 表示任务已不归该 worker 所有，状态未修改
+        """
+        updated = JobRepository._owned(job_id, worker_id).update({
+            'status': 'succeeded',
+            'last_error': None,
+            'locked_by': None,
+            'finished_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        return bool(updated)
+
+    @staticmethod
+    def mark_failed(job_id: int, worker_id: str, error: str, retry_at: datetime = None) -> bool:
+        """
+        标记任务失败
+        :param retry_at: 下次重试时间，None 表示不再重试
+        :return: False 表示任务已不归该 worker 所有，状态未修改
+        """
+        values = {'last_error': error, 'locked_by': None}
+        if retry_at:
+            values.update(status='pending', run_at=retry_at)
+        else:
+            values.update(status='failed', finished_at=datetime.utcnow())
+        updated = JobRepository._owned(job_id, worker_id).update(values, synchronize_session=False)
+        db.session.commit()
+        return bool(updated)
+
+    @staticmethod
+    def requeue_stale(timeout_seconds: int) -> int:
+        """
+        处理超过 timeout_seconds 没有心跳的执行中任务（worker 崩溃或卡死）：
+        还有剩余次数的放回队列，次数已用完的标记为失败
+        """
+        now = datetime.utcnow()
+        deadline = now - timedelta(seconds=timeout_seconds)
+        exhausted = Job.attempts >= Job.max_attempts
+        count = Job.query.filter(
+            Job.status == 'running',
+            func.coalesce(Job.heartbeat_at, Job.locked_at) < deadline
+        ).update({
+            'status': case((exhausted, 'failed'), else_='pending'),
+            'finished_at': case((exhausted, now), else_=Job.finished_at),
+            'last_error': case((exhausted, '执行超时'), else_=Job.last_error),
+            'locked_by': None
+        }, synchronize_session=False)
+        db.session.commit()
+        return count
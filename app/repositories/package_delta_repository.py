@@ -0,0 +1,66 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from app.models import db, PackageDelta
+
+
+class PackageDeltaRepository:
+
+    @staticmethod
+    def get(from_id: int, to_id: int) -> Optional[PackageDelta]:
+        return PackageDelta.query.filter_by(from_id=from_id, to_id=to_id).first()
+
+    @staticmethod
+    def request(from_id: int, to_id: int, jobs=None) -> Tuple[PackageDelta, bool]:
+        """
+        登记一个待生成的补丁，已存在时直接返回
+        :param jobs: 可选，新建时 jobs(delta) 在提交前调用，其中以 commit=False 投递的生成任务与登记一起提交
+        :return: (PackageDelta, 是否新建)
+        """
+        delta = PackageDeltaRepository.get(from_id, to_id)
+        if delta is not None:
+            return delta, False
+        delta = PackageDelta(from_id=from_id, to_id=to_id, status='pending')
+        db.session.add(delta)
+        try:
+            if jobs:
+                jobs(delta)
+            db.session.commit()
+        except IntegrityError:
+            # 并发请求已登记
+            db.session.rollback()
+            return PackageDeltaRepository.get(from_id, to_id), False
+        return delta, True
+
+    @staticmethod
+    def update_status(delta_id: int, status: str, **fields) -> None:
+        """更新补丁状态及 oss_key/size/full_size/error 等字段"""
+        PackageDelta.query.filter_by(id=delta_id).update(
+            dict(fields, status=status),
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    @staticmethod
+    def delete_for_package(package_id: int) -> List[str]:
+        """
+        删除与软件包相关的全部补丁记录
+        :return: 需要一并删除的 OSS key
+        """
+        return PackageDeltaRepository.delete_for_packages([package_id])
+
+    @staticmethod
+    def delete_for_packages(package_ids: List[int]) -> List[str]:
+        """
+        删除与多个软件包相关的全部补丁记录
+        :return: 需要一并删除的 OSS key
+        """
+        if not package_ids:
+            return []
+        query = PackageDelta.query.filter(
+            or_(PackageDelta.from_id.in_(package_ids), PackageDelta.to_id.in_(package_ids))
+        )
+        oss_keys = [delta.oss_key for delta in query.all() if delta.oss_key]
+        query.delete(synchronize_session=False)
+        db.session.commit()
+        return oss_keys
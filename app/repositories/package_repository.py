@@ -1,8 +1,11 @@
 # from app import db
 from app.models import db, Package, Icon  # 导入package模型
-from sqlalchemy import or_, and_, distinct
+from sqlalchemy import or_, and_, distinct, update, insert, tuple_
 from sqlalchemy.sql import func
 from sqlalchemy.orm import joinedload
+from .pagination import Page, encode_cursor, decode_cursor, count_total
+from .generation_repository import GenerationRepository
+from app.utils.catalog import package_catalog, entry_from_package, parse_is_debug, CatalogEntry, PACKAGE_GENERATION
 
 class PackageRepository:
     """使用Flask-SQLAlchemy的CRUD操作类"""
@@ -16,13 +19,100 @@ class PackageRepository:
         return Package.query.get(package_id)
 
     @staticmethod
-    def create(package_data):
-        """创建新包记录"""
+    def get_previous_build(package):
+        """同一包名、系统、调试/正式渠道中，在该包之前上传的最近一个构建"""
+        return PackageRepository._previous_builds_query(package).first()
+
+    @staticmethod
+    def get_previous_build_ids(package, limit):
+        """同一渠道中在该包之前上传的最近 limit 个构建的ID"""
+        return [row.id for row in PackageRepository._previous_builds_query(package)
+                .with_entities(Package.id).limit(limit)]
+
+    @staticmethod
+    def _previous_builds_query(package):
+        return Package.query.filter(
+            Package.package_name == package.package_name,
+            Package.system == package.system,
+            Package.is_debug == package.is_debug,
+            tuple_(Package.create_time, Package.id) < tuple_(package.create_time, package.id)
+        ).order_by(
+            Package.create_time.desc(),
+            Package.id.desc()
+        )
+
+    @staticmethod
+    def create(package_data, jobs=None):
+        """
+        创建新包记录
+        :param jobs: 可选，jobs(package) 在提交前调用，其中以 commit=False 投递的后台任务与包记录一起提交
+        """
         package = Package(**package_data)
         db.session.add(package)
+        if jobs:
+            db.session.flush()
+            jobs(package)
+        generation = GenerationRepository.bump(PACKAGE_GENERATION)
         db.session.commit()
+        package_catalog.apply(generation, upsert=[entry_from_package(package)])
         return package
 
+    @staticmethod
+    def bulk_create(rows, jobs=None):
+        """
+        批量创建包记录：一次 executemany INSERT，与变更代数在同一事务内提交
+        MySQL 不支持 RETURNING，插入后在同一事务内按 oss_key 取回自增ID（同批次内 oss_key 必须唯一）
+        :param rows: package_data 列表，create_time 需为 datetime
+        :param jobs: 可选，jobs(package_ids) 在提交前调用，同 create()
+        :return: 与 rows 顺序一致的ID列表
+        """
+        db.session.execute(insert(Package), rows)
+        oss_keys = [row['oss_key'] for row in rows]
+        ids = {}
+        for package_id, oss_key in db.session.query(Package.id, Package.oss_key).filter(
+                Package.oss_key.in_(oss_keys)).order_by(Package.id):
+            ids[oss_key] = package_id  # 同一 oss_key 的历史记录被本批次的更大ID覆盖
+        package_ids = [ids[key] for key in oss_keys]
+        if jobs:
+            jobs(package_ids)
+        generation = GenerationRepository.bump(PACKAGE_GENERATION)
+        db.session.commit()
+
+        package_catalog.apply(generation, upsert=[
+            CatalogEntry(package_id, row['appname'], row['system'], row['version'],
+                         row.get('is_debug', True), row.get('ar'), row['create_time'], row['package_name'])
+            for package_id, row in zip(package_ids, rows)
+        ])
+        return package_ids
+
+    @staticmethod
+    def get_list_rows(package_ids, fields=Package.LIST_FIELDS):
+        """
+        按给定ID顺序批量读取列表字段（只查询所需列，不联表加载 icon，跳过已不存在的ID）
+        :param fields: Package.SELECTABLE_FIELDS 的子集
+        :return: [dict, ...]
+        """
+        if not package_ids:
+            return []
+        columns = [getattr(Package, field) for field in fields]
+        if 'id' not in fields:
+            columns.append(Package.id)
+        rows = {
+            row.id: row
+            for row in db.session.query(*columns).filter(Package.id.in_(package_ids)).all()
+        }
+
+        result = []
+        for package_id in package_ids:
+            row = rows.get(package_id)
+            if row is None:
+                continue
+            item = {field: getattr(row, field) for field in fields}
+            if item.get('create_time'):
+                item['create_time'] = item['create_time'].isoformat()
+            result.append(item)
+        return result
+
     # @staticmethod
     # def update_status(package_id, status):
     #     """更新包状态"""
@@ -67,7 +157,92 @@ class PackageRepository:
             update_data,
             synchronize_session=False
         )
+        generation = GenerationRepository.bump(PACKAGE_GENERATION)
         db.session.commit()
+        if is_debug is not None:
+            package_catalog.apply(generation, patch={package_id: {'is_debug': is_debug}})
+        else:
+            package_catalog.apply(generation)
+
+    @staticmethod
+    def update_build_meta(package_id, meta, ar=None, icon_id=None):
+        """
+        写入服务端解析出的安装包元数据
+        参数:
+            meta: 元数据字典（ABI 列表、versionCode 等）
+            ar (可选): 根据 ABI 计算的架构描述
+            icon_id (可选): 从安装包中提取的图标
+        """
+        current = db.session.query(Package.ar, Package.icon_id).filter(Package.id == package_id).first()
+        if current is None:
+            return
+        update_data = {'meta': meta}
+        if ar is not None:
+            update_data['ar'] = ar
+        if icon_id is not None:
+            update_data['icon_id'] = icon_id
+
+        Package.query.filter_by(id=package_id).update(
+            update_data,
+            synchronize_session=False
+        )
+        # 只有索引和列表用到的字段真的变化时才递增代数，否则各进程不必重建目录索引、清空相关缓存
+        ar_changed = ar is not None and ar != current.ar
+        if not ar_changed and (icon_id is None or icon_id == current.icon_id):
+            db.session.commit()
+            return
+        generation = GenerationRepository.bump(PACKAGE_GENERATION)
+        db.session.commit()
+        package_catalog.apply(generation, patch={package_id: {'ar': ar}} if ar_changed else None)
+
+    @staticmethod
+    def iter_chunks(system=None, after_id=0, chunk_size=500):
+        """
+        按 id 游标分块遍历软件包（keyset，不使用 OFFSET）
+        :return: 生成 [(id, oss_key, ar), ...]
+        """
+        last_id = after_id
+        while True:
+            query = db.session.query(Package.id, Package.oss_key, Package.ar).filter(Package.id > last_id)
+            if system:
+                query = query.filter(Package.system == system)
+            rows = query.order_by(Package.id).limit(chunk_size).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield rows
+
+    @staticmethod
+    def get_chunk_rows(package_ids):
+        """按ID取 iter_chunks 同结构的行 [(id, oss_key, ar), ...]，按 id 排序"""
+        if not package_ids:
+            return []
+        return db.session.query(Package.id, Package.oss_key, Package.ar)\
+            .filter(Package.id.in_(package_ids)).order_by(Package.id).all()
+
+    @staticmethod
+    def bulk_update_ar(changes):
+        """
+        批量更新架构信息（按主键 executemany）
+        :param changes: [{'id': 1, 'ar': 'x64'}, ...]
+        """
+        if not changes:
+            return
+        db.session.execute(update(Package), changes)
+        generation = GenerationRepository.bump(PACKAGE_GENERATION)
+        db.session.commit()
+        package_catalog.apply(generation, patch={c['id']: {'ar': c['ar']} for c in changes})
+
+    @staticmethod
+    def iter_catalog_rows(batch_size=2000):
+        """
+        流式读取构建内存目录索引所需的列
+        :return: 生成 (id, appname, system, version, is_debug, ar, create_time, package_name)
+        """
+        return db.session.query(
+            Package.id, Package.appname, Package.system, Package.version,
+            Package.is_debug, Package.ar, Package.create_time, Package.package_name
+        ).yield_per(batch_size)
 
     @staticmethod
     def get_versions(appname, system=None):
@@ -82,45 +257,176 @@ class PackageRepository:
         return [v[0] for v in query.all()]
 
     @staticmethod
-    def get_paginated_packages(appname, system=None, version=None, is_debug=None, page=1, per_page=10):
-        """分页查询包列表"""
-        query = Package.query.filter(Package.appname == appname)
-        
+    def _search_query(appname, system=None, version=None, is_debug=None):
+        """
+        构建搜索条件，过滤字段顺序与索引 ix_packages_search 一致
+        (appname, system, is_debug, version, create_time, id)
+        """
+        # 只取排序键，(create_time, id) 都在索引里，不需要回表
+        query = db.session.query(Package.id, Package.create_time).filter(Package.appname == appname)
+
         # 构建动态过滤条件
         filters = []
         if system and system != 'all':
             filters.append(Package.system == system)
+        is_debug = parse_is_debug(is_debug)
+        if is_debug is not None:
+            filters.append(Package.is_debug == is_debug)
         if version and version != '全部':
             filters.append(Package.version == version)
-        if is_debug and is_debug != '全部':
-            filters.append(Package.is_debug == is_debug)
-            
+
         if filters:
             query = query.filter(and_(*filters))
-        
-        return query.order_by(
-            Package.create_time.desc()
-        ).paginate(
-            page=page,
+        return query
+
+    @staticmethod
+    def _to_page(query, rows, per_page, with_total, page=None, count_key=None):
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        total = None
+        if with_total:
+            if page and not has_more and (rows or page == 1):
+                total = (page - 1) * per_page + len(rows)
+            else:
+                total = count_total(query, count_key, (PACKAGE_GENERATION,))
+        return Page(
+            items=[row.id for row in rows],
             per_page=per_page,
-            error_out=False
+            total=total,
+            page=page,
+            next_cursor=encode_cursor(rows[-1].create_time, rows[-1].id) if has_more else None,
+            has_more=has_more
         )
 
+    @staticmethod
+    def get_paginated_packages(appname, system=None, version=None, is_debug=None, page=1, per_page=10,
+                               with_total=True):
+        """
+        分页查询包列表（页码模式，深分页请使用 get_packages_after）
+        :return: Page，items 为包ID；next_cursor 可用于切换到游标模式继续翻页
+        """
+        query = PackageRepository._search_query(appname, system, version, is_debug)
+        page = max(page, 1)
+        rows = query.order_by(
+            Package.create_time.desc(),
+            Package.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page + 1).all()
+        return PackageRepository._to_page(query, rows, per_page, with_total, page=page,
+                                          count_key=('packages', appname, system, version, parse_is_debug(is_debug)))
+
+    @staticmethod
+    def get_packages_after(appname, system=None, version=None, is_debug=None, after=None, per_page=10,
+                           with_total=False):
+        """
+        游标(keyset)分页查询包列表，按 (create_time, id) 倒序
+        直接在复合索引上定位到游标位置，任意深度的翻页耗时都与第一页相同
+        :param after: 上一页返回的 next_cursor，为空表示第一页
+        :param with_total: 是否计算总数（需要额外一次 COUNT）
+        :raises ValueError: 游标格式错误
+        """
+        query = PackageRepository._search_query(appname, system, version, is_debug)
+        seek = query
+        if after:
+            created, row_id = decode_cursor(after)
+            seek = query.filter(tuple_(Package.create_time, Package.id) < tuple_(created, row_id))
+        rows = seek.order_by(
+            Package.create_time.desc(),
+            Package.id.desc()
+        ).limit(per_page + 1).all()
+        return PackageRepository._to_page(query, rows, per_page, with_total,
+                                          count_key=('packages', appname, system, version, parse_is_debug(is_debug)))
+
     @staticmethod
     def delete(package_id):
         """通过ID删除包"""
         package = Package.query.get(package_id)
         if package:
             db.session.delete(package)
+            generation = GenerationRepository.bump(PACKAGE_GENERATION)
             db.session.commit()
+            package_catalog.apply(generation, delete=[package_id])
             return True
         return False
 
+    @staticmethod
+    def _rule_filters(rule):
+        filters = []
+        if rule.get('appname', '*') != '*':
+            filters.append(Package.appname == rule['appname'])
+        if rule.get('system', '*') != '*':
+            filters.append(Package.system == rule['system'])
+        if rule.get('is_debug') is not None:
+            filters.append(Package.is_debug == rule['is_debug'])
+        return filters
+
+    @staticmethod
+    def find_expired(rule, preceding_rules=(), cutoff=None):
+        """
+        用窗口函数找出超出保留数量的构建
+        :param rule: {'appname', 'system', 'is_debug', 'keep_last', 'per'}，per 为 version 或 app
+        :param preceding_rules: 排在前面的规则，已被它们匹配的包不归本规则管
+        :param cutoff: 只返回早于该时间的构建
+        :return: [(id, oss_key, size), ...]，按 id 排序
+        """
+        filters = PackageRepository._rule_filters(rule)
+        for preceding in preceding_rules:
+            preceding_filters = PackageRepository._rule_filters(preceding)
+            if not preceding_filters:
+                return []  # 前面有匹配全部包的规则，本规则不会生效
+            filters.append(~and_(*preceding_filters))
+
+        partition_by = [Package.appname, Package.system, Package.is_debug]
+        if rule.get('per', 'version') == 'version':
+            partition_by.append(Package.version)
+        rank = func.row_number().over(
+            partition_by=partition_by,
+            order_by=(Package.create_time.desc(), Package.id.desc())
+        ).label('rank')
+
+        ranked = db.session.query(
+            Package.id, Package.oss_key, Package.size, Package.create_time, rank
+        ).filter(*filters).subquery()
+
+        query = db.session.query(ranked.c.id, ranked.c.oss_key, ranked.c.size).filter(
+            ranked.c.rank > rule['keep_last']
+        )
+        if cutoff is not None:
+            query = query.filter(ranked.c.create_time < cutoff)
+        return query.order_by(ranked.c.id).all()
+
+    @staticmethod
+    def delete_by_ids(package_ids):
+        """按ID批量删除（一条 DELETE ... WHERE id IN），返回删除行数"""
+        if not package_ids:
+            return 0
+        deleted = Package.query.filter(Package.id.in_(package_ids)).delete(synchronize_session=False)
+        generation = GenerationRepository.bump(PACKAGE_GENERATION)
+        db.session.commit()
+        package_catalog.apply(generation, delete=package_ids)
+        return deleted
+
     @staticmethod
     def delete_by_packagename(packagename):
         """通过包名删除包"""
         Package.query.filter(Package.packagename == packagename).delete()
+        GenerationRepository.bump(PACKAGE_GENERATION)
         db.session.commit()
+        package_catalog.invalidate()
+
+    @staticmethod
+    def get_facet_groups(appname):
+        """
+        一次 GROUP BY 取回应用在 (system, version, ar, is_debug) 上的全部组合计数
+        各维度的分面计数由调用方在内存中汇总（比 WITH ROLLUP 的层级小计更适合独立维度）
+        :return: [(system, version, ar, is_debug, count), ...]
+        """
+        return db.session.query(
+            Package.system, Package.version, Package.ar, Package.is_debug, func.count(Package.id)
+        ).filter(
+            Package.appname == appname
+        ).group_by(
+            Package.system, Package.version, Package.ar, Package.is_debug
+        ).all()
 
     @staticmethod
     def get_count(appname, system=None, version=None, ar=None):
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.dialects.mysql import insert
+from app.models import db, PackageStats
+from app.utils.hll import HyperLogLog
+
+
+class PackageStatsRepository:
+
+    @staticmethod
+    def merge_many(rows: List[dict]) -> None:
+        """
+        把各进程尚未写入的增量合并进每个包的统计行，每个包只有一行
+        :param rows: [{'package_id', 'downloads', 'sketch'}, ...]，downloads 为新增次数，sketch 为新增设备的 HyperLogLog
+        """
+        if not rows:
+            return
+        rows = sorted(rows, key=lambda row: row['package_id'])
+        package_ids = [row['package_id'] for row in rows]
+        now = datetime.utcnow()
+
+        # 按 package_id 顺序插入占位行（已存在时不修改），同时拿到行锁，并发刷新的进程在这里排队
+        stmt = insert(PackageStats)
+        stmt = stmt.on_duplicate_key_update(package_id=stmt.inserted.package_id)
+        empty = HyperLogLog().to_bytes()
+        db.session.execute(stmt, [
+            {'package_id': package_id, 'downloads': 0, 'sketch': empty, 'updated_at': now}
+            for package_id in package_ids
+        ])
+
+        existing = {
+            stat.package_id: stat
+            for stat in PackageStats.query.filter(PackageStats.package_id.in_(package_ids))
+            .order_by(PackageStats.package_id).with_for_update()
+        }
+        for row in rows:
+            stat = existing[row['package_id']]
+            stat.downloads = stat.downloads + row['downloads']
+            stat.sketch = HyperLogLog.from_bytes(stat.sketch).merge(row['sketch']).to_bytes()
+            stat.updated_at = now
+        db.session.commit()
+
+    @staticmethod
+    def get_for_package(package_id: int) -> Optional[PackageStats]:
+        """某个包的统计行，还没有下载记录时返回 None"""
+        return PackageStats.query.get(package_id)
@@ -0,0 +1,92 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from math import ceil
+from typing import Any, Hashable, Iterable, List, Optional
+
+from app.utils.cache import LRUCache
+from app.utils.generation import watcher_for
+
+# 筛选结果总数缓存：(筛选条件签名, 相关数据的变更代数...) -> 总数
+# 代数是键的一部分，写入后旧条目不会再命中，由 LRU 自然淘汰
+total_cache = LRUCache(10000)
+
+
+@dataclass
+class Page:
+    """分页结果，同时支持页码模式和游标(keyset)模式"""
+    items: List[Any] = field(default_factory=list)
+    per_page: int = 10
+    total: Optional[int] = None
+    page: Optional[int] = None
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+    @property
+    def pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
+        return ceil(self.total / self.per_page) if self.per_page else 0
+
+
+def encode_cursor(created: datetime, row_id: int) -> str:
+    """游标格式: <create_time(ISO)>,<id>"""
+    return f"{created.isoformat()},{row_id}"
+
+
+def decode_cursor(cursor: str):
+    """
+    解析游标
+    :return: (datetime, id)
+    :raises ValueError: 游标格式错误
+    """
+    try:
+        created, row_id = cursor.rsplit(',', 1)
+        return datetime.fromisoformat(created), int(row_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"无效的游标: {cursor}")
+
+
+
+def count_total(query, count_key: Optional[Hashable] = None, generations: Iterable[str] = ()) -> int:
+    """
+    筛选结果总数
+    :param count_key: 规范化的筛选条件签名，给出时按 (签名, generations 的当前代数) 缓存
+    :param generations: 筛选涉及的数据集的变更代数名称，任何一个变化后缓存失效
+    """
+    cache_key = None
+    if count_key is not None:
+        # 先取代数再计数：计数期间有写入时结果记在旧代数下，不会被之后的请求读到
+        cache_key = (count_key,) + tuple(watcher_for(name).current() for name in generations)
+        total = total_cache.get(cache_key)
+        if total is not None:
+            return total
+    total = query.order_by(None).count()
+    if cache_key is not None:
+        total_cache.set(cache_key, total)
+    return total
+
+
+def paginate(query, page: int = 1, per_page: int = 10, with_total: bool = True,
+             count_key: Optional[Hashable] = None, generations: Iterable[str] = ()) -> Page:
+    """
+    页码分页，替代 Flask-SQLAlchemy 的 paginate()：每页多取一条判断 has_more
+    :param query: 已排序的查询
+    :param with_total: False 时完全不计数（total/pages 为 None）
+    :param count_key: 见 count_total，最后一页和只有一页时直接由行数算出总数，不需要计数
+    """
+    page = max(page, 1)
+    # 与 Flask-SQLAlchemy paginate(error_out=False) 一致，per_page 无效时每页 20 条
+    if per_page is None or per_page < 1:
+        per_page = 20
+    offset = (page - 1) * per_page
+    rows = query.offset(offset).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+
+    total = None
+    if with_total:
+        if not has_more and (items or page == 1):
+            total = offset + len(items)
+        else:
+            total = count_total(query, count_key, generations)
+    return Page(items=items, per_page=per_page, total=total, page=page, has_more=has_more)
@@ -1,5 +1,9 @@
 from typing import List, Optional
 from app.models import db, Tags, doc_tag, Documents
+from .document_repository import DOCUMENT_GENERATION, count_generations
+from .generation_repository import GenerationRepository
+from app.utils.generation import watcher_for
+from .pagination import Page, paginate
 
 class TagRepository:
     
@@ -38,17 +42,20 @@ class TagRepository:
             # 先删除关联关系
             doc_tag.query.filter_by(tag_id=tag_id).delete()
             db.session.delete(tag)
+            generation = GenerationRepository.bump(DOCUMENT_GENERATION)
             db.session.commit()
+            watcher_for(DOCUMENT_GENERATION).note(generation)
             return True
         return False
     
     @staticmethod
-    def get_documents_by_tag(tag_id: int, page: int = 1, per_page: int = 10):
+    def get_documents_by_tag(tag_id: int, page: int = 1, per_page: int = 10, with_total: bool = True) -> Page:
         """获取拥有该标签的文档"""
-        return Documents.query.join(doc_tag, Documents.id == doc_tag.doc_id)\
+        query = Documents.query.join(doc_tag, Documents.id == doc_tag.doc_id)\
                              .filter(doc_tag.tag_id == tag_id)\
-                             .order_by(Documents.created_at.desc())\
-                             .paginate(page=page, per_page=per_page, error_out=False)
+                             .order_by(Documents.created_at.desc(), Documents.id.desc())
+        return paginate(query, page=page, per_page=per_page, with_total=with_total,
+                        count_key=('tag_documents', tag_id), generations=count_generations())
     
     @staticmethod
     def search_by_name(name: str) -> List[Tags]:
@@ -24,3 +24,5 @@ def init_routes(app):
     from .issue import issue_bp
     app.register_blueprint(issue_bp, url_prefix='/api/issues')
 
+    from .job import job_bp
+    app.register_blueprint(job_bp, url_prefix='/api/jobs')
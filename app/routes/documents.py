@@ -1,10 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from datetime import datetime
 import uuid
 from app.utils.auth import  token_required
+from app.utils.doc_search import search_documents as run_search
+from app.utils.home_feed import home_feed
+from app.utils.category_tree import category_tree
 from app.repositories import (
     DocumentRepository, 
-    CategoryRepository,
     TagRepository
 )
 
@@ -53,6 +55,11 @@ def get_documents():
         in: query
         type: integer
         description: 分类ID筛选
+      - name: include_descendants
+        in: query
+        type: boolean
+        default: false
+        description: true 时分类筛选包含全部子分类
       - name: tag_id
         in: query
         type: array
@@ -60,6 +67,17 @@ def get_documents():
           type: integer
         collectionFormat: multi
         description: 标签ID(可传多个)
+      - name: match
+        in: query
+        type: string
+        enum: [any, all]
+        default: any
+        description: 多个标签时 any-包含任一标签 / all-包含全部标签
+      - name: with_total
+        in: query
+        type: boolean
+        default: true
+        description: false 时不计算总数(total/pages 为 null)，用 has_more 判断是否还有下一页
     responses:
       200:
         description: 文档列表
@@ -79,6 +97,9 @@ def get_documents():
             current_page:
               type: integer
               example: 1
+            has_more:
+              type: boolean
+              description: 是否还有下一页
     """
     user_id = request.args.get('user_id')
     page = request.args.get('page', 1, type=int)
@@ -91,14 +112,18 @@ def get_documents():
         status=request.args.get('status',type=list),
         title=request.args.get('title', ''),
         category_id=request.args.get('category_id', type=int),
-        tag_ids=request.args.getlist('tag_id', type=int) or None
+        tag_ids=request.args.getlist('tag_id', type=int) or None,
+        match_all=request.args.get('match', 'any') == 'all',
+        with_total=request.args.get('with_total', 'true').lower() == 'true',
+        include_descendants=request.args.get('include_descendants', 'false').lower() == 'true'
     )
     
     return jsonify({
         'items': [doc.to_dict() for doc in result.items],
         'total': result.total,
         'pages': result.pages,
-        'current_page': result.page
+        'current_page': result.page,
+        'has_more': result.has_more
     })
 
 # 获取用户的文章
@@ -128,6 +153,11 @@ def get_home_documents():
         in: query
         type: integer
         description: 分类ID筛选
+      - name: include_descendants
+        in: query
+        type: boolean
+        default: false
+        description: true 时分类筛选包含全部子分类
       - name: tag_id
         in: query
         type: array
@@ -135,6 +165,17 @@ def get_home_documents():
           type: integer
         collectionFormat: multi
         description: 标签ID(可传多个)
+      - name: match
+        in: query
+        type: string
+        enum: [any, all]
+        default: any
+        description: 多个标签时 any-包含任一标签 / all-包含全部标签
+      - name: with_total
+        in: query
+        type: boolean
+        default: true
+        description: false 时不计算总数(total/pages 为 null)，用 has_more 判断是否还有下一页
     responses:
       200:
         description: 文档列表
@@ -154,25 +195,127 @@ def get_home_documents():
             current_page:
               type: integer
               example: 1
+            has_more:
+              type: boolean
+              description: 是否还有下一页
     """
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), current_app.config['HOME_FEED_PER_PAGE_LIMIT'])
+    title = request.args.get('title', '')
+    category_id = request.args.get('category_id', type=int)
+    tag_ids = request.args.getlist('tag_id', type=int) or None
+    match_all = request.args.get('match', 'any') == 'all'
+    include_descendants = request.args.get('include_descendants', 'false').lower() == 'true'
+
+    # 没有关键词时直接用进程内首页文档流（已渲染的响应体，通常不查库）
+    if not title:
+        body = home_feed.render(category_id=category_id, tag_ids=tag_ids, page=page, per_page=per_page,
+                                match_all=match_all, include_descendants=include_descendants)
+        return current_app.response_class(body, mimetype='application/json')
     
     result = DocumentRepository.get_documents(
         user_id=None,
         page=page,
         per_page=per_page,
         status=[3],
-        title=request.args.get('title', ''),
-        category_id=request.args.get('category_id', type=int),
-        tag_ids=request.args.getlist('tag_id', type=int) or None
+        title=title,
+        category_id=category_id,
+        tag_ids=tag_ids,
+        match_all=match_all,
+        with_total=request.args.get('with_total', 'true').lower() == 'true',
+        include_descendants=include_descendants
     )
     
     return jsonify({
         'items': [doc.to_dict() for doc in result.items],
         'total': result.total,
         'pages': result.pages,
-        'current_page': result.page
+        'current_page': result.page,
+        'has_more': result.has_more
+    })
+
+
+@documents_bp.route('/search', methods=['GET'])
+def search_documents():
+    """
+    全文检索已发布文档（标题 + 摘要），按 BM25 相关度排序
+    ---
+    tags:
+      - 文档管理
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: 关键词，中文按双字、英文按单词匹配，需包含全部词项
+      - name: page
+        in: query
+        type: integer
+        default: 1
+        description: 页码
+      - name: per_page
+        in: query
+        type: integer
+        default: 10
+        description: 每页数量(最大50)
+      - name: category_id
+        in: query
+        type: integer
+        description: 分类ID筛选
+      - name: with_total
+        in: query
+        type: boolean
+        default: true
+        description: false 时不计算总数(total/pages 为 null)，用 has_more 判断是否还有下一页
+    responses:
+      200:
+        description: 检索结果
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                $ref: '#/definitions/Document'
+              description: 每项额外包含 score(相关度得分)
+            total:
+              type: integer
+              example: 100
+            pages:
+              type: integer
+              example: 10
+            current_page:
+              type: integer
+              example: 1
+            has_more:
+              type: boolean
+              description: 是否还有下一页
+      400:
+        description: 缺少关键词
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return bad_request("q 必须非空")
+    page = request.args.get('page', 1, type=int)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), current_app.config['SEARCH_PER_PAGE_LIMIT'])
+
+    result = run_search(
+        q,
+        page=page,
+        per_page=per_page,
+        status=[3],
+        category_id=request.args.get('category_id', type=int),
+        with_total=request.args.get('with_total', 'true').lower() == 'true'
+    )
+    scores = dict(result.items)
+    docs = DocumentRepository.get_by_ids([doc_id for doc_id, _ in result.items])
+
+    return jsonify({
+        'items': [dict(doc.to_dict(), score=round(scores[doc.id], 4)) for doc in docs],
+        'total': result.total,
+        'pages': result.pages,
+        'current_page': result.page,
+        'has_more': result.has_more
     })
 
 
@@ -486,7 +629,7 @@ def get_categories():
           items:
             $ref: '#/definitions/Category'
     """
-    return jsonify(CategoryRepository.get_tree())
+    return jsonify(category_tree.tree())
 
 @documents_bp.route('/tags', methods=['GET'])
 def get_tags():
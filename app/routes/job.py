@@ -0,0 +1,77 @@
+from flask import Blueprint, request, jsonify
+from app.repositories.job_repository import JobRepository
+from app.utils.auth import token_required
+
+job_bp = Blueprint('job', __name__, url_prefix='/api/jobs')
+
+
+@job_bp.route('', methods=['GET'])
+@token_required
+def list_jobs():
+    """
+    查询后台任务列表
+    ---
+    tags:
+      - 后台任务
+    parameters:
+      - name: status
+        in: query
+        type: string
+        description: 任务状态(pending/running/succeeded/failed)
+      - name: kind
+        in: query
+        type: string
+        description: 任务类型，如 package.upload_icon
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    responses:
+      200:
+        description: 任务列表及各状态数量
+        schema:
+          type: object
+          properties:
+            jobs:
+              type: array
+              items:
+                type: object
+            counts:
+              type: object
+              example: {"pending": 2, "succeeded": 120, "failed": 1}
+    """
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    jobs = JobRepository.list(
+        status=request.args.get('status'),
+        kind=request.args.get('kind'),
+        limit=limit
+    )
+    return jsonify({
+        'jobs': [job.to_dict() for job in jobs],
+        'counts': JobRepository.count_by_status()
+    })
+
+
+@job_bp.route('/<int:job_id>', methods=['GET'])
+@token_required
+def get_job(job_id):
+    """
+    查询单个后台任务状态
+    ---
+    tags:
+      - 后台任务
+    parameters:
+      - name: job_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: 任务详情
+      404:
+        description: 任务不存在
+    """
+    job = JobRepository.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
@@ -1,5 +1,6 @@
-from flask import Blueprint, jsonify
-from app.utils.oss_utils import generate_sts_token, get_download_url
+from flask import Blueprint, jsonify, request
+from app.utils.oss_utils import generate_sts_token, get_download_url, get_download_urls
+from config import Config
 from app.utils.auth import  token_required
 
 oss_bp = Blueprint('oss', __name__)
@@ -19,7 +20,7 @@ def get_sts_token():
           type: string
           example: "127.0.0.1:5000"
     """
-    result = generate_sts_token()
+    result = generate_sts_token(user_id=request.current_user_id)
     if result['status'] == 'success':
         return jsonify(result['data']), 200
     else:
@@ -55,4 +56,60 @@ def download_file(oss_key):
     obj = get_download_url(oss_key)
 
     return jsonify(obj)
-     
\ No newline at end of file
+
+
+@oss_bp.route('/download-urls', methods=['POST'])
+def batch_download_urls():
+    """
+    批量获取OSS文件的下载URL
+    ---
+    tags:
+      - OSS服务
+    consumes:
+      - application/json
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - oss_keys
+          properties:
+            oss_keys:
+              type: array
+              items:
+                type: string
+              example: ["packages/app-1.0.0.apk", "packages/app-1.0.1.ipa"]
+    responses:
+      200:
+        description: 返回每个key的签名URL和过期时间（顺序与请求一致）
+        schema:
+          type: object
+          properties:
+            items:
+              type: array
+              items:
+                type: object
+                properties:
+                  oss_key:
+                    type: string
+                  url:
+                    type: string
+                  expires:
+                    type: string
+                    format: date-time
+      400:
+        description: 参数错误
+    """
+    payload = request.get_json(silent=True) or {}
+    oss_keys = payload.get('oss_keys')
+
+    if not isinstance(oss_keys, list) or not oss_keys:
+        return jsonify({'error': 'oss_keys 必须是非空数组'}), 400
+    if len(oss_keys) > Config.OSS_BATCH_SIGN_LIMIT:
+        return jsonify({'error': f'oss_keys 最多 {Config.OSS_BATCH_SIGN_LIMIT} 个'}), 400
+    if not all(isinstance(key, str) and key for key in oss_keys):
+        return jsonify({'error': 'oss_keys 中的元素必须是非空字符串'}), 400
+
+    return jsonify({'items': get_download_urls(oss_keys)})
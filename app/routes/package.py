@@ -1,20 +1,31 @@
-from flask import Blueprint, request, jsonify, render_template, current_app
+from flask import Blueprint, request, jsonify, render_template, current_app, url_for, redirect, send_file
 from ..repositories.package_repository import PackageRepository
 from ..repositories.icon_repository import IconRepository
+from ..repositories.package_delta_repository import PackageDeltaRepository
+from ..models import Package
 import os
 from datetime import datetime
 # from androguard.core.bytecodes import apk
 import plistlib
 import zipfile
 import time
-import base64
 from app.utils.package_utils import (
     check_apk_architecture,
     extract_info_plist,
     getappname_by_packagename,
-    get_ip_and_port
+    get_ip_and_port,
+    get_app_title,
+    build_install_manifest,
+    decode_base64_image
 )
-from app.utils.oss_utils import (delete_oss_file,restore_oss_file,upload_to_oss,get_download_url,createplist)
+from app.utils.oss_utils import (delete_oss_file,delete_oss_files,restore_oss_file,get_download_url,get_download_urls)
+from app.utils.icon_utils import ingest_icon
+from app.utils.job_queue import enqueue, enqueue_many
+from app.utils.package_cache import get_package_cache
+from app.utils.cache import LRUCache
+from app.utils.download_stats import download_stats
+from app.utils.catalog import package_catalog, package_generation, version_sort_key, build_facets
+from config import Config
 
 from app.utils.auth import  token_required
 
@@ -22,6 +33,25 @@ import hashlib
 
 package_bp = Blueprint('package', __name__, url_prefix='/api/packages')
 
+# 已渲染的 manifest.plist：(软件包代数, package_id) -> (内容, ETag)
+# 以代数为键，其他进程删除软件包（包括保留策略）后不会继续返回指向已删除对象的清单
+manifest_cache = LRUCache(2000)
+
+# 更新检查的响应缓存：(目录代数, 查询) -> (响应体, ETag)
+latest_cache = LRUCache(5000)
+LATEST_QUERY_LIMIT = 50
+CHANNELS = {'release': False, 'debug': True}
+
+# 不走目录索引时的分面计数缓存：(appname, 变更代数) -> 结果，有新的软件包写入后自然失效
+facets_cache = LRUCache(500)
+
+REQUIRED_PACKAGE_FIELDS = ['version', 'name', 'size', 'system', 'package_name', 'oss_key']
+
+PACKAGE_MIMETYPES = {
+    '.apk': 'application/vnd.android.package-archive',
+    '.ipa': 'application/octet-stream'
+}
+
 @package_bp.route('/ip', methods=['GET'])
 def get_ip_endpoint():
     """
@@ -48,10 +78,11 @@ def create_package():
       - 软件包管理
     consumes:
       - application/json
+      - multipart/form-data
     parameters:
       - in: body
         name: package
-        description: 软件包信息
+        description: 软件包信息（multipart/form-data 时以表单字段提交，图标作为文件part "icon"）
         required: true
         schema:
           type: object
@@ -91,6 +122,9 @@ def create_package():
             oss_key:
               type: string
               description: OSS存储键
+            icon:
+              type: string
+              description: Base64 编码的PNG图标（可选）
     responses:
       201:
         description: 创建成功
@@ -118,67 +152,41 @@ def create_package():
     #     response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
     #     return response
     try:
-        if not request.is_json:
-            return jsonify({'error': 'Request must be JSON'}), 400
-            
-        package_info = request.get_json()
-
-        icon_data = package_info['icon']
-        icon_id = None
-
-        if icon_data:
-          icon_name = hashlib.md5(icon_data.encode()).hexdigest()
-          # print(icon_data)
-          # print(icon_name)
+        icon_bytes = None
+        legacy_icon_name = None
 
-          if IconRepository.get_id_by_name(icon_name):
-            icon_id = IconRepository.get_id_by_name(icon_name)
-          else:
-            os.makedirs('temp', exist_ok=True)
-            temp_file = f'temp/{icon_name}.png'
-            
-            # 保存为临时文件
-            base64_to_png(icon_data, temp_file)
-            
-            # 上传到OSS
-            oss_url = upload_to_oss(temp_file,f'package_icons/{icon_name}.png')
-
-            icon = {'name':icon_name,'url':oss_url}
-            icon_id = IconRepository.create(icon).id
-            # 清理临时文件
-            os.remove(temp_file)
+        if request.is_json:
+            package_info = request.get_json()
+            icon_data = package_info.get('icon')
+            if icon_data:
+                try:
+                    icon_bytes = decode_base64_image(icon_data)
+                except ValueError:
+                    return jsonify({'error': 'icon 不是合法的Base64数据'}), 400
+                legacy_icon_name = hashlib.md5(icon_data.encode()).hexdigest()
+        elif request.mimetype == 'multipart/form-data':
+            # 图标作为文件part上传，避免在JSON中解析大段Base64
+            package_info = request.form.to_dict()
+            icon_file = request.files.get('icon')
+            if icon_file:
+                icon_bytes = icon_file.read()
+        else:
+            return jsonify({'error': 'Request must be JSON or multipart/form-data'}), 400
         
         # 检查必填字段
-        required_fields = ['version', 'name', 'size', 'system', 'package_name','oss_key']
-        missing_fields = [field for field in required_fields if field not in package_info]
+        missing_fields = [field for field in REQUIRED_PACKAGE_FIELDS if field not in package_info]
         if missing_fields:
             return jsonify({'error': f'Missing required fields: {", ".join(missing_fields)}'}), 400
-        
-        package_data = {
-            'appname': package_info.get('appname', ''),
-            'version': package_info['version'],
-            'name': package_info['name'],
-            'size': package_info['size'],
-            'system': package_info['system'],
-            'create_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'comment': package_info.get('comment', ''),
-            'ar': package_info.get('ar', 'x64'),
-            'package_name': package_info['package_name'] ,
-            'oss_key': package_info['oss_key'],
-            'icon_id': icon_id
-        }
 
-        if package_info['system'] == 'ios':
-            apptitles = ["学测学生端","学测教师端","学测家长端"]
-            createplist(
-              package_info['oss_key'], 
-              package_info['package_name'], 
-              package_info['version'], 
-              apptitles[int(package_info['appname'])])
+        icon_id = ingest_icon(icon_bytes, legacy_icon_name) if icon_bytes else None
+        
+        package_data = build_package_data(package_info, icon_id)
 
-        PackageRepository.create(package_data)
+        # 服务端从安装包解析真实的架构/版本信息，任务与包记录在同一事务内提交
+        package = PackageRepository.create(
+            package_data, jobs=lambda created: enqueue_build_jobs([(created.id, created.system)]))
         
-        return jsonify({'message': 'Package created successfully'}), 201
+        return jsonify({'message': 'Package created successfully', 'id': package.id}), 201
 
     except Exception as e:
         current_app.logger.error(f"Create package error: {str(e)}")
@@ -186,6 +194,166 @@ def create_package():
 
 
 
+@package_bp.route('/bulk', methods=['POST'])
+@token_required
+def bulk_create_packages():
+    """
+    批量创建软件包记录（CI 一次发布多个构建）
+    先校验全部条目，任一条目不合法时整批不写入；图标在批次内去重，
+    所有记录在一个事务内用一次 executemany 插入，图标上传和元数据解析交给后台任务并发执行
+    ---
+    tags:
+      - 软件包管理
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - packages
+          properties:
+            packages:
+              type: array
+              description: 与单个创建接口相同的字段，另可传 is_debug(默认 true)
+              items:
+                type: object
+    responses:
+      201:
+        description: 全部创建成功
+        schema:
+          type: object
+          properties:
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  index:
+                    type: integer
+                  id:
+                    type: integer
+                  oss_key:
+                    type: string
+                  icon_id:
+                    type: integer
+      400:
+        description: 存在不合法的条目，results 中给出每个条目的错误
+        schema:
+          type: object
+          properties:
+            error:
+              type: string
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  index:
+                    type: integer
+                  error:
+                    type: string
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('packages')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'packages 必须是非空数组'}), 400
+    if len(items) > Config.PACKAGE_BULK_LIMIT:
+        return jsonify({'error': f'单次最多 {Config.PACKAGE_BULK_LIMIT} 个软件包'}), 400
+
+    # 1. 全部校验通过后才写入
+    errors = []
+    icons = {}  # md5 -> (图标字节, 旧版名称)
+    icon_names = []
+    seen_keys = set()
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': '条目必须是对象'})
+            icon_names.append(None)
+            continue
+        missing_fields = [field for field in REQUIRED_PACKAGE_FIELDS if field not in item]
+        if missing_fields:
+            errors.append({'index': index, 'error': f'Missing required fields: {", ".join(missing_fields)}'})
+        elif item['oss_key'] in seen_keys:
+            errors.append({'index': index, 'error': f'oss_key 在本批次中重复: {item["oss_key"]}'})
+        else:
+            seen_keys.add(item['oss_key'])
+            try:
+                int(item['size'])
+            except (TypeError, ValueError):
+                errors.append({'index': index, 'error': 'size 必须是整数'})
+
+        name = None
+        if item.get('icon'):
+            try:
+                icon_bytes = decode_base64_image(item['icon'])
+            except ValueError:
+                errors.append({'index': index, 'error': 'icon 不是合法的Base64数据'})
+            else:
+                name = hashlib.md5(icon_bytes).hexdigest()
+                icons.setdefault(name, (icon_bytes, hashlib.md5(item['icon'].encode()).hexdigest()))
+        icon_names.append(name)
+
+    if errors:
+        return jsonify({'error': 'Invalid packages', 'results': errors}), 400
+
+    try:
+        # 2. 同一批次里相同的图标只登记一次
+        icon_ids = {name: ingest_icon(icon_bytes, legacy_name) for name, (icon_bytes, legacy_name) in icons.items()}
+
+        # 3. 一个事务、一次 executemany
+        create_time = datetime.now().replace(microsecond=0)
+        rows = [
+            build_package_data(item, icon_ids.get(name), create_time)
+            for item, name in zip(items, icon_names)
+        ]
+        # 4. 服务端解析安装包元数据，由后台 worker 并发执行；任务与包记录在同一事务内提交
+        package_ids = PackageRepository.bulk_create(rows, jobs=lambda ids: enqueue_build_jobs(
+            [(package_id, row['system']) for package_id, row in zip(ids, rows)]))
+
+        results = [
+            {'index': index, 'id': package_id, 'oss_key': row['oss_key'], 'icon_id': row['icon_id']}
+            for index, (package_id, row) in enumerate(zip(package_ids, rows))
+        ]
+        return jsonify({'message': 'Packages created successfully', 'results': results}), 201
+
+    except Exception as e:
+        current_app.logger.error(f"Bulk create package error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def enqueue_build_jobs(packages):
+    """
+    登记新上传包的后台任务（元数据解析、Android 增量补丁），不提交，随包记录一起提交
+    :param packages: [(package_id, system), ...]
+    """
+    enqueue_many('package.extract_meta', [{'package_id': package_id} for package_id, _ in packages], commit=False)
+    enqueue_many('package.build_delta', [
+        {'package_id': package_id} for package_id, system in packages if system == 'android'
+    ], commit=False)
+
+
+def build_package_data(package_info, icon_id, create_time=None):
+    """把请求中的软件包信息转换为 packages 表的字段"""
+    package_data = {
+        'appname': package_info.get('appname', ''),
+        'version': package_info['version'],
+        'name': package_info['name'],
+        'size': int(package_info['size']),
+        'system': package_info['system'],
+        'create_time': create_time or datetime.now().replace(microsecond=0),
+        'comment': package_info.get('comment', ''),
+        'ar': package_info.get('ar', 'x64'),
+        'package_name': package_info['package_name'],
+        'oss_key': package_info['oss_key'],
+        'icon_id': icon_id,
+        'is_debug': package_info.get('is_debug', True)
+    }
+    if isinstance(package_data['is_debug'], str):
+        package_data['is_debug'] = package_data['is_debug'].lower() in ('true', '1')
+    return package_data
+
+
 @package_bp.route('/<int:package_id>', methods=['PUT'])
 @token_required
 def update_package(package_id):
@@ -301,8 +469,10 @@ def delete_package(package_id):
                 "message": "Package not found"
             }), 404
         
+        oss_key = package.oss_key
+
         # 2. 先删除OSS文件
-        oss_success = delete_oss_file(package.oss_key)
+        oss_success = delete_oss_file(oss_key)
         if not oss_success:
             raise Exception("Failed to delete OSS file")
         
@@ -310,6 +480,17 @@ def delete_package(package_id):
         db_success = PackageRepository.delete(package_id)
         if not db_success:
             raise Exception("Failed to delete database record")
+        cache = get_package_cache()
+        if cache is not None:
+            cache.discard(oss_key)
+
+        # 以该包为起点或终点的增量补丁一并删除
+        try:
+            delta_keys = PackageDeltaRepository.delete_for_package(package_id)
+            if delta_keys:
+                delete_oss_files(delta_keys)
+        except Exception as delta_error:
+            current_app.logger.error(f"Failed to delete deltas of package {package_id}: {str(delta_error)}")
             
         return jsonify({
             "success": True,
@@ -394,6 +575,9 @@ def get_package_by_id(package_id):
                 'message': f'Package with ID {package_id} not found'
             }), 404
         
+        # 只做内存累加，由后台线程批量写库
+        download_stats.record(package.id, get_device_id())
+
         # 2. 生成下载URL（如果有OSS存储）
         download_url = None
         # print(package.oss_key)
@@ -408,7 +592,7 @@ def get_package_by_id(package_id):
         plist_url = None
 
         if package.system == 'ios':
-            plist_url = f"itms-services://?action=download-manifest&url=https://oss.superrabbithero.xyz/packages/plists/{package.oss_key[9:-4]}.plist"
+            plist_url = f"itms-services://?action=download-manifest&url={get_manifest_url(package.id)}"
         
         # package.create_time = package.create_time.isoformat()
 
@@ -431,6 +615,270 @@ def get_package_by_id(package_id):
         }), 500
     
 
+@package_bp.route('/<int:package_id>/delta', methods=['GET'])
+def get_package_delta(package_id):
+    """
+    获取从旧版本升级到该版本的增量补丁
+    补丁尚未生成时会登记生成任务并返回 202，客户端稍后重试或直接下载完整安装包
+    ---
+    tags:
+      - 下载管理
+    parameters:
+      - name: package_id
+        in: path
+        type: integer
+        required: true
+        description: 目标(新)版本ID
+      - name: from
+        in: query
+        type: integer
+        required: true
+        description: 设备上已安装的旧版本ID（同渠道最近几个更早的构建）
+    responses:
+      200:
+        description: 补丁已生成
+        schema:
+          type: object
+          properties:
+            status:
+              type: string
+              example: ready
+            url:
+              type: string
+            expires:
+              type: string
+            size:
+              type: integer
+            full_size:
+              type: integer
+      202:
+        description: 补丁生成中
+      400:
+        description: 旧版本不是同一 Android 应用同渠道最近 DELTA_MAX_FROM_BUILDS 个更早的构建之一
+      404:
+        description: 软件包不存在
+      409:
+        description: 补丁收益不足(skipped)或生成失败(failed)，请下载完整安装包
+    """
+    from_id = request.args.get('from', type=int)
+    if not from_id:
+        return jsonify({'error': 'from is required'}), 400
+
+    package = PackageRepository.get(package_id)
+    previous = PackageRepository.get(from_id)
+    if not package or not previous:
+        return jsonify({'error': 'Package not found'}), 404
+    # 只接受同渠道最近几个更早的构建，避免任意两两组合都触发补丁生成
+    if package.system != 'android' or from_id not in PackageRepository.get_previous_build_ids(
+            package, current_app.config['DELTA_MAX_FROM_BUILDS']):
+        return jsonify({'error': 'Delta is only available from recent earlier builds of the same Android package'}), 400
+
+    delta = PackageDeltaRepository.get(from_id, package_id)
+    if delta is None:
+        # 登记和生成任务在同一事务内提交；并发的首次请求只有登记成功的那个投递任务
+        PackageDeltaRepository.request(from_id, package_id, jobs=lambda _: enqueue(
+            'package.build_delta', {'package_id': package_id, 'from_id': from_id}, commit=False))
+        return jsonify({'status': 'pending'}), 202
+    if delta.status == 'pending':
+        return jsonify({'status': 'pending'}), 202
+    if delta.status != 'ready':
+        return jsonify({'status': delta.status, 'full_size': delta.full_size}), 409
+
+    return jsonify({
+        'status': 'ready',
+        **get_download_url(delta.oss_key),
+        'size': delta.size,
+        'full_size': delta.full_size
+    })
+
+@package_bp.route('/<int:package_id>/stats', methods=['GET'])
+def get_package_stats(package_id):
+    """
+    软件包下载统计
+    ---
+    tags:
+      - 软件包查询
+    parameters:
+      - name: package_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: 下载次数和独立设备数（HyperLogLog 估计值，误差约 1.6%）
+        schema:
+          type: object
+          properties:
+            package_id:
+              type: integer
+            downloads:
+              type: integer
+              example: 320
+            unique_devices:
+              type: integer
+              example: 57
+    """
+    return jsonify({'package_id': package_id, **download_stats.summary(package_id)})
+
+def get_device_id():
+    """客户端设备标识：优先使用 X-Device-Id 请求头，否则用 IP + User-Agent 近似"""
+    return request.headers.get('X-Device-Id') or f"{request.remote_addr}|{request.user_agent.string}"
+
+def is_first_download_request():
+    """完整下载或从0开始的第一个分段才计一次下载，断点续传的后续分段不重复计数"""
+    return request.range is None or request.range.ranges[0][0] == 0
+
+@package_bp.route('/<int:package_id>/file', methods=['GET'])
+def download_package_file(package_id):
+    """
+    下载软件包文件（本地磁盘缓存，支持断点续传）
+    ---
+    tags:
+      - 下载管理
+    produces:
+      - application/octet-stream
+    parameters:
+      - name: package_id
+        in: path
+        type: integer
+        required: true
+        description: 软件包ID
+      - name: Range
+        in: header
+        type: string
+        description: 断点续传范围，如 bytes=1048576-
+    responses:
+      200:
+        description: 完整文件
+      206:
+        description: 部分内容
+      302:
+        description: 未启用本地缓存，重定向到OSS签名地址
+      404:
+        description: 软件包不存在
+    """
+    package = PackageRepository.get(package_id)
+    if not package or not package.oss_key:
+        return jsonify({'error': 'Package not found'}), 404
+
+    # 下载计数只做内存累加，由后台线程批量写库
+    first_request = is_first_download_request()
+
+    cache = get_package_cache()
+    if cache is None:
+        if first_request:
+            download_stats.record(package.id, get_device_id())
+        return redirect(get_download_url(package.oss_key)['url'])
+
+    # 传已打开的文件而不是路径：打开之后即使被其他请求淘汰删除也能完整发送；拉取或打开失败时回退到OSS
+    try:
+        f = cache.open_file(package.oss_key)
+    except Exception as e:
+        current_app.logger.error(f"Failed to cache package {package_id}: {str(e)}")
+        if first_request:
+            download_stats.record(package.id, get_device_id())
+        return redirect(get_download_url(package.oss_key)['url'])
+
+    ext = os.path.splitext(package.oss_key)[1].lower()
+    download_name = package.name if package.name.lower().endswith(ext) else f"{package.name}{ext}"
+
+    # 文件对象不带大小和修改时间，由 fstat 补上，再处理 Range/If-Range/If-None-Match；
+    # 响应体通过 wsgi.file_wrapper(sendfile) 发送
+    stat = os.fstat(f.fileno())
+    response = send_file(
+        f,
+        mimetype=PACKAGE_MIMETYPES.get(ext, 'application/octet-stream'),
+        as_attachment=True,
+        download_name=download_name,
+        conditional=False,
+        etag=f"{int(stat.st_mtime)}-{stat.st_size}",
+        last_modified=stat.st_mtime,
+        max_age=Config.PACKAGE_CACHE_MAX_AGE
+    )
+    response.content_length = stat.st_size
+    response = response.make_conditional(request, accept_ranges=True, complete_length=stat.st_size)
+    # 304（客户端已有最新文件）和 416 不算下载；If-Range 不匹配时返回整个文件，按完整下载计数
+    if response.status_code == 200 or (response.status_code == 206 and first_request):
+        download_stats.record(package.id, get_device_id())
+    return response
+
+
+@package_bp.route('/<int:package_id>/manifest.plist', methods=['GET'])
+def get_package_manifest(package_id):
+    """
+    获取 iOS 安装清单(itms-services 使用)
+    ---
+    tags:
+      - 下载管理
+    produces:
+      - application/x-plist
+    parameters:
+      - name: package_id
+        in: path
+        type: integer
+        required: true
+        description: 软件包ID
+      - name: If-None-Match
+        in: header
+        type: string
+        description: 上次返回的ETag
+    responses:
+      200:
+        description: manifest.plist 内容
+      304:
+        description: 内容未变化
+      404:
+        description: 软件包不存在或不是iOS包
+    """
+    cache_key = (package_generation.current(), package_id)
+    cached = manifest_cache.get(cache_key)
+    if cached is None:
+        package = PackageRepository.get(package_id)
+        if not package or package.system != 'ios':
+            return jsonify({'error': 'Manifest not found'}), 404
+
+        body = build_install_manifest(
+            f"https://{Config.OSS_CUSTOM_DOMAIN}/{package.oss_key}",
+            package.package_name,
+            package.version,
+            get_app_title(package.appname)
+        )
+        cached = (body, hashlib.md5(body).hexdigest())
+        manifest_cache.set(cache_key, cached)
+
+    body, etag = cached
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='application/x-plist')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def parse_fields(fields):
+    """
+    解析 ?fields= 参数
+    :return: 字段元组，id 总是包含在内
+    :raises ValueError: 包含不支持的字段
+    """
+    if not fields:
+        return Package.LIST_FIELDS
+    selected = [f.strip() for f in fields.split(',') if f.strip()]
+    invalid = [f for f in selected if f not in Package.SELECTABLE_FIELDS]
+    if invalid:
+        raise ValueError(f"不支持的字段: {', '.join(invalid)}")
+    if 'id' not in selected:
+        selected.insert(0, 'id')
+    return tuple(dict.fromkeys(selected))
+
+def get_manifest_url(package_id):
+    """manifest.plist 的完整地址（itms-services 要求 https）"""
+    if Config.MANIFEST_BASE_URL:
+        return f"{Config.MANIFEST_BASE_URL.rstrip('/')}/api/packages/{package_id}/manifest.plist"
+    return url_for('package.get_package_manifest', package_id=package_id, _external=True, _scheme='https')
+
+
 @package_bp.route('/versions', methods=['GET'])
 def get_version_list():
     """
@@ -450,7 +898,7 @@ def get_version_list():
         description: 系统类型(android/ios)
     responses:
       200:
-        description: 版本列表
+        description: 版本列表（按语义化版本从新到旧排序）
         schema:
           type: object
           properties:
@@ -463,13 +911,224 @@ def get_version_list():
     appname = request.args.get('appname', 'default')
     system = request.args.get('system', None)
     
-    versions = PackageRepository.get_versions(
-        appname=appname,
-        system=system if system != 'all' else None
-    )
+    if Config.PACKAGE_CATALOG_ENABLED:
+        versions = package_catalog.versions(appname, system)
+    else:
+        versions = sorted(
+            PackageRepository.get_versions(appname=appname, system=system if system != 'all' else None),
+            key=version_sort_key,
+            reverse=True
+        )
     
     return jsonify({'versions': versions})
 
+@package_bp.route('/facets', methods=['GET'])
+def get_package_facets():
+    """
+    分面计数：一次返回按系统/版本/架构/调试包统计的数量
+    ---
+    tags:
+      - 软件包查询
+    parameters:
+      - name: appname
+        in: query
+        type: string
+        required: true
+        description: 应用名称
+    responses:
+      200:
+        description: 分面计数，by_system 为每个系统下的同结构计数
+        schema:
+          type: object
+          properties:
+            total:
+              type: integer
+              example: 120
+            system:
+              type: array
+              items:
+                type: object
+                properties:
+                  value:
+                    type: string
+                    example: android
+                  count:
+                    type: integer
+                    example: 80
+            version:
+              type: array
+              items:
+                type: object
+            ar:
+              type: array
+              items:
+                type: object
+            is_debug:
+              type: array
+              items:
+                type: object
+            by_system:
+              type: object
+    """
+    appname = request.args.get('appname', 'default')
+
+    if Config.PACKAGE_CATALOG_ENABLED:
+        return jsonify(package_catalog.facets(appname))
+
+    key = (appname, package_generation.current())
+    facets = facets_cache.get(key)
+    if facets is None:
+        facets = build_facets(PackageRepository.get_facet_groups(appname))
+        facets_cache.set(key, facets)
+    return jsonify(facets)
+
+@package_bp.route('/latest', methods=['GET'])
+def get_latest_packages():
+    """
+    更新检查：一次查询多个 (包名, 系统, 渠道) 的最新构建
+    直接读取进程内的最新构建表，支持 If-None-Match，内容未变化时返回 304
+    ---
+    tags:
+      - 软件包查询
+    parameters:
+      - name: q
+        in: query
+        type: array
+        items:
+          type: string
+        collectionFormat: multi
+        required: true
+        description: package_name:system[:channel]，channel 为 release(默认)或 debug，可重复传入
+    responses:
+      200:
+        description: 与 q 顺序一致的结果，没有构建时 latest 为 null
+        schema:
+          type: object
+          properties:
+            results:
+              type: array
+              items:
+                type: object
+                properties:
+                  package_name:
+                    type: string
+                    example: com.example.student
+                  system:
+                    type: string
+                    example: android
+                  channel:
+                    type: string
+                    example: release
+                  latest:
+                    type: object
+                    properties:
+                      id:
+                        type: integer
+                      version:
+                        type: string
+                      create_time:
+                        type: string
+      304:
+        description: 内容未变化
+      400:
+        description: 参数错误
+    """
+    queries = request.args.getlist('q')
+    if not queries:
+        return jsonify({'error': 'q is required'}), 400
+    if len(queries) > LATEST_QUERY_LIMIT:
+        return jsonify({'error': f'单次最多查询 {LATEST_QUERY_LIMIT} 个'}), 400
+
+    keys = []
+    for query in queries:
+        parts = query.split(':')
+        if len(parts) == 2:
+            parts.append('release')
+        if len(parts) != 3 or not parts[0] or parts[2] not in CHANNELS:
+            return jsonify({'error': f'无效的查询: {query}'}), 400
+        keys.append(tuple(parts))
+    keys = tuple(keys)
+
+    package_catalog.ensure_fresh()
+    cache_key = (package_catalog.generation, keys)
+    cached = latest_cache.get(cache_key)
+    if cached is None:
+        entries = package_catalog.latest([(name, system, CHANNELS[channel]) for name, system, channel in keys])
+        results = [
+            {
+                'package_name': name,
+                'system': system,
+                'channel': channel,
+                'latest': {
+                    'id': entry.id,
+                    'version': entry.version,
+                    'create_time': entry.create_time.isoformat()
+                } if entry else None
+            }
+            for (name, system, channel), entry in zip(keys, entries)
+        ]
+        # ETag 只取决于每个渠道的最新构建ID，其他应用的上传不会让客户端缓存失效
+        etag = hashlib.md5(','.join(str(entry.id if entry else 0) for entry in entries).encode()).hexdigest()
+        cached = (current_app.json.dumps({'results': results}).encode('utf-8'), etag)
+        latest_cache.set(cache_key, cached)
+
+    body, etag = cached
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@package_bp.route('/count', methods=['GET'])
+def get_package_count():
+    """
+    统计软件包数量
+    ---
+    tags:
+      - 软件包查询
+    parameters:
+      - name: appname
+        in: query
+        type: string
+        required: true
+        description: 应用名称
+      - name: system
+        in: query
+        type: string
+        description: 系统类型(android/ios/all)
+      - name: version
+        in: query
+        type: string
+      - name: ar
+        in: query
+        type: string
+        description: 架构(x32/x64/x32、x64)
+    responses:
+      200:
+        description: 数量
+        schema:
+          type: object
+          properties:
+            count:
+              type: integer
+              example: 42
+    """
+    params = {
+        'appname': request.args.get('appname', 'default'),
+        'system': request.args.get('system'),
+        'version': request.args.get('version'),
+        'ar': request.args.get('ar')
+    }
+
+    if Config.PACKAGE_CATALOG_ENABLED:
+        count = package_catalog.count(**params)
+    else:
+        count = PackageRepository.get_count(**params)
+
+    return jsonify({'count': count})
+
 @package_bp.route('/search', methods=['GET'])
 def search_packages():
     """
@@ -499,6 +1158,23 @@ def search_packages():
         in: query
         type: integer
         default: 10
+      - name: after
+        in: query
+        type: string
+        description: 游标分页，传入上一页返回的 next_cursor（格式 create_time,id）；传入后忽略 page
+      - name: with_total
+        in: query
+        type: boolean
+        description: 是否返回 total/pages，页码模式默认 true，游标模式默认 false
+      - name: with_download_url
+        in: query
+        type: boolean
+        default: false
+        description: 是否在每条记录中附带签名下载地址(download_url)
+      - name: fields
+        in: query
+        type: string
+        description: 逗号分隔的返回字段，如 id,version,create_time,icon_id；默认为全部列表字段(不含 meta)
     responses:
       200:
         description: 分页结果
@@ -508,13 +1184,31 @@ def search_packages():
             packages:
               type: array
               items:
-                $ref: '#/definitions/Package'
+                type: object
+                description: 列表字段，图标只返回 icon_id
+            icons:
+              type: object
+              description: 本页用到的图标，按 icon_id 索引
+              additionalProperties:
+                type: object
+                properties:
+                  id:
+                    type: integer
+                  url:
+                    type: string
+                  name:
+                    type: string
             total:
               type: integer
               example: 100
             pages:
               type: integer
               example: 10
+            next_cursor:
+              type: string
+              example: "2024-05-01T08:30:00,128"
+            has_more:
+              type: boolean
       400:
         description: 参数错误
     """
@@ -524,16 +1218,56 @@ def search_packages():
             'system': request.args.get('system'),
             'version': request.args.get('version'),
             'is_debug': request.args.get('is_debug'),
-            'page': int(request.args.get('page', 1)),
-            'per_page': int(request.args.get('per_page', 10))
+            'per_page': min(max(int(request.args.get('per_page', 10)), 1), 500)
         }
-        
-        pagination = PackageRepository.get_paginated_packages(**params)
+        after = request.args.get('after')
+        with_total = request.args.get('with_total')
+
+        if Config.PACKAGE_CATALOG_ENABLED:
+            # 在内存目录索引中完成过滤、排序和分页，只按主键读取当前页的详情
+            pagination = package_catalog.search(
+                page=None if after is not None else int(request.args.get('page', 1)),
+                after=after,
+                with_total=with_total.lower() == 'true' if with_total is not None else after is None,
+                **params
+            )
+        elif after is not None:
+            pagination = PackageRepository.get_packages_after(
+                after=after,
+                with_total=with_total is not None and with_total.lower() == 'true',
+                **params
+            )
+        else:
+            pagination = PackageRepository.get_paginated_packages(
+                page=int(request.args.get('page', 1)),
+                with_total=with_total is None or with_total.lower() == 'true',
+                **params
+            )
+
+        fields = parse_fields(request.args.get('fields'))
+        with_download_url = request.args.get('with_download_url', 'false').lower() == 'true'
+        query_fields = fields + ('oss_key',) if with_download_url and 'oss_key' not in fields else fields
+
+        packages = PackageRepository.get_list_rows(pagination.items, query_fields)
+        if with_download_url:
+            urls = get_download_urls([p['oss_key'] for p in packages])
+            for package, url in zip(packages, urls):
+                package['download_url'] = url['url']
+                if 'oss_key' not in fields:
+                    del package['oss_key']
+
+        # 同一应用的几十个包通常只共用两三个图标，图标单独返回一次
+        icons = {}
+        if 'icon_id' in fields:
+            icons = IconRepository.get_map(p['icon_id'] for p in packages)
         
         return jsonify({
-            'packages': [p.to_dict() for p in pagination.items],
+            'packages': packages,
+            'icons': {str(icon_id): icon for icon_id, icon in icons.items()},
             'total': pagination.total,
-            'pages': pagination.pages
+            'pages': pagination.pages,
+            'next_cursor': pagination.next_cursor,
+            'has_more': pagination.has_more
         })
         
     except ValueError as e:
@@ -577,22 +1311,3 @@ def generate_download_link():
         })
     
     return jsonify({'link': f"{base_url}/{filename}"})
-
-
-
-
-
-def base64_to_png(base64_data, output_path):
-    """
-    将Base64数据保存为PNG文件
-    :param base64_data: 纯Base64字符串（不含data:image/png;base64,前缀）
-    :param output_path: 输出文件路径
-    """
-    # 移除可能的Base64前缀
-    if ";base64," in base64_data:
-        base64_data = base64_data.split(";base64,")[1]
-    
-    # 解码并保存文件
-    with open(output_path, "wb") as f:
-        f.write(base64.b64decode(base64_data))
-
@@ -0,0 +1,153 @@
+"""存量安装包 CPU 架构回填：按块遍历 packages，在进程池中读取每个 APK 的中央目录重新判断 ar"""
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain
+
+from app import db
+from app.repositories.package_repository import PackageRepository
+from .oss_utils import get_bucket
+from .package_meta import list_abis, describe_abis
+from .zip_reader import ZipDirectory, BucketRangeSource
+
+logger = logging.getLogger(__name__)
+
+HEAD_CONCURRENCY = 16  # 每块并发 HEAD 请求数
+
+
+def _inspect_abis(oss_key, size):
+    """在子进程中读取 APK 中央目录，返回 (ABI 列表, 实际读取字节数)"""
+    source = BucketRangeSource(get_bucket(), oss_key, size=size)
+    with ZipDirectory(source) as zip_dir:
+        return list_abis(zip_dir.namelist()), source.bytes_read
+
+
+def _head(oss_key):
+    """返回对象的内容指纹 (etag:size) 和大小"""
+    meta = get_bucket().head_object(oss_key)
+    return f"{meta.etag}:{meta.content_length}", meta.content_length
+
+
+def _load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'last_id': 0, 'memo': {}, 'failed': []}
+
+
+def _save_checkpoint(path, checkpoint):
+    """先写临时文件再替换，中途被杀也不会留下半个检查点"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def rescan_architectures(chunk_size=200, workers=None, checkpoint_path=None, restart=False, dry_run=False):
+    """
+    重新扫描 Android 安装包的 CPU 架构并批量写回 packages.ar
+    :param chunk_size: 每块处理的软件包数量，每块一次批量 UPDATE 并保存一次检查点
+    :param workers: 解析进程数，None 表示 CPU 核数
+    :param checkpoint_path: 检查点文件路径（last_id + 内容指纹->ABI 缓存 + 解析失败的ID），为空时不可续跑；
+                            续跑时先重试上次解析失败的软件包，再从 last_id 继续
+    :param restart: 忽略已有检查点，从头扫描
+    :param dry_run: 只统计不写库，也不更新检查点
+    :return: 统计信息 dict
+    """
+    checkpoint = {'last_id': 0, 'memo': {}, 'failed': []} if restart else _load_checkpoint(checkpoint_path)
+    memo = checkpoint['memo']
+    # 上次解析失败的软件包（已删除的直接丢弃）
+    retry_rows = PackageRepository.get_chunk_rows(checkpoint.get('failed', []))
+    pending_retry = {row.id for row in retry_rows}  # 还没重试的，中途中断时留在检查点里
+    failed = set()                                   # 本次解析失败的ID
+    stats = {
+        'dry_run': dry_run,
+        'start_id': checkpoint['last_id'],
+        'last_id': checkpoint['last_id'],
+        'chunks': 0,
+        'retried': len(retry_rows),
+        'scanned': 0,
+        'inspected': 0,
+        'memo_hits': 0,
+        'missing': 0,
+        'errors': 0,
+        'changed': 0,
+        'bytes_read': 0,
+        'elapsed': 0.0
+    }
+    started = time.monotonic()
+
+    retry_chunks = (retry_rows[i:i + chunk_size] for i in range(0, len(retry_rows), chunk_size))
+    chunks = chain(retry_chunks, PackageRepository.iter_chunks(
+        system='android', after_id=checkpoint['last_id'], chunk_size=chunk_size))
+
+    # spawn 启动的子进程不继承父进程的线程和锁（HEAD 线程池、OSS 客户端锁），fork 时可能死锁
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool, \
+            ThreadPoolExecutor(max_workers=HEAD_CONCURRENCY) as head_pool:
+        for chunk in chunks:
+            stats['chunks'] += 1
+            stats['scanned'] += len(chunk)
+
+            head_futures = {row.id: head_pool.submit(_head, row.oss_key) for row in chunk}
+            fingerprints = {}
+            inspect_futures = {}
+            for row in chunk:
+                try:
+                    fingerprint, size = head_futures[row.id].result()
+                except Exception as e:
+                    stats['missing'] += 1
+                    logger.warning(f"软件包 {row.id} 的安装包不可读，跳过: {row.oss_key} ({str(e)})")
+                    continue
+                fingerprints[row.id] = fingerprint
+                # 同一内容只解析一次（重复上传、同一安装包登记到多个应用）
+                if fingerprint in memo:
+                    stats['memo_hits'] += 1
+                elif fingerprint in inspect_futures:
+                    stats['memo_hits'] += 1
+                else:
+                    inspect_futures[fingerprint] = pool.submit(_inspect_abis, row.oss_key, size)
+
+            failed_fingerprints = set()
+            for fingerprint, future in inspect_futures.items():
+                try:
+                    abis, bytes_read = future.result()
+                except Exception as e:
+                    stats['errors'] += 1
+                    failed_fingerprints.add(fingerprint)
+                    logger.error(f"解析安装包失败({fingerprint}): {str(e)}")
+                    continue
+                memo[fingerprint] = abis
+                stats['inspected'] += 1
+                stats['bytes_read'] += bytes_read
+
+            changes = []
+            for row in chunk:
+                fingerprint = fingerprints.get(row.id)
+                if fingerprint not in memo:
+                    continue
+                ar = describe_abis(memo[fingerprint])
+                if ar != row.ar:
+                    changes.append({'id': row.id, 'ar': ar})
+            stats['changed'] += len(changes)
+            stats['last_id'] = max(stats['last_id'], chunk[-1].id)
+            failed.update(row.id for row in chunk if fingerprints.get(row.id) in failed_fingerprints)
+            pending_retry.difference_update(row.id for row in chunk)
+
+            if dry_run:
+                continue
+
+            PackageRepository.bulk_update_ar(changes)
+            if checkpoint_path:
+                checkpoint['last_id'] = stats['last_id']
+                checkpoint['failed'] = sorted(failed | pending_retry)
+                _save_checkpoint(checkpoint_path, checkpoint)
+
+    if dry_run:
+        db.session.rollback()
+
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    logger.info(f"架构回填完成: {stats}")
+    return stats
@@ -0,0 +1,318 @@
+"""
+进程内软件包目录索引：appname -> system -> version -> 按 (create_time, id) 排序的包ID
+
+启动时用一次流式查询构建。本进程的写入在提交后直接增量更新；其他进程的写入通过
+change_generations 中的代数发现（最多延迟 CATALOG_CHECK_INTERVAL 秒），发现后整体重建。
+版本列表、数量统计和搜索分页都直接在内存中完成，只有当前页的详情需要查库。
+"""
+import heapq
+import logging
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple, Counter
+from itertools import islice
+
+from app.repositories.pagination import Page, encode_cursor, decode_cursor
+from .generation import watcher_for, GenerationIndex
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_GENERATION = 'packages'
+
+CatalogEntry = namedtuple('CatalogEntry', 'id appname system version is_debug ar create_time package_name')
+
+_VERSION_PART_RE = re.compile(r'\d+|[A-Za-z]+')
+
+
+def version_sort_key(version):
+    """
+    语义化版本排序键：数字段按数值比较，1.10.0 > 1.9.2；
+    带预发布标签的版本(1.2.0-beta)排在正式版 1.2.0 之前
+    """
+    core, sep, pre = (version or '').partition('-')
+
+    def parts(text):
+        return tuple((0, int(p), '') if p.isdigit() else (1, 0, p.lower()) for p in _VERSION_PART_RE.findall(text))
+
+    return parts(core), ((0,) + parts(pre) if sep else (1,))
+
+
+def entry_from_package(package):
+    return CatalogEntry(package.id, package.appname, package.system, package.version,
+                        package.is_debug, package.ar, package.create_time, package.package_name)
+
+
+def _channel_key(entry):
+    return entry.package_name, entry.system, bool(entry.is_debug)
+
+
+def _descending(leaf, end):
+    """从 end 之前开始倒序遍历有序列表"""
+    for i in range(end - 1, -1, -1):
+        yield leaf[i]
+
+
+def parse_is_debug(is_debug):
+    """搜索参数中的调试包筛选：None、空字符串和“全部”都表示不筛选"""
+    if is_debug is None or is_debug in ('', '全部'):
+        return None
+    if isinstance(is_debug, str):
+        return is_debug.lower() in ('true', '1')
+    return bool(is_debug)
+
+
+def build_facets(groups):
+    """
+    把 (system, version, ar, is_debug, count) 分组计数汇总成各维度的分面计数
+    :return: {'total', 'system', 'version', 'ar', 'is_debug', 'by_system': {system: 同结构}}
+             每个维度是 [{'value', 'count'}] 列表，版本按语义化版本从新到旧，其余按数量倒序
+    """
+    def empty():
+        return {'total': 0, 'version': Counter(), 'ar': Counter(), 'is_debug': Counter()}
+
+    overall = empty()
+    overall['system'] = Counter()
+    by_system = {}
+    for system, version, ar, is_debug, count in groups:
+        overall['system'][system] += count
+        for bucket in (overall, by_system.setdefault(system, empty())):
+            bucket['total'] += count
+            bucket['version'][version] += count
+            bucket['ar'][ar] += count
+            bucket['is_debug'][bool(is_debug)] += count
+
+    def render(bucket):
+        result = {'total': bucket['total']}
+        for facet, counter in bucket.items():
+            if facet == 'total':
+                continue
+            if facet == 'version':
+                values = sorted(counter, key=version_sort_key, reverse=True)
+            else:
+                values = sorted(counter, key=lambda v: -counter[v])
+            result[facet] = [{'value': v, 'count': counter[v]} for v in values]
+        return result
+
+    result = render(overall)
+    result['by_system'] = {system: render(bucket) for system, bucket in by_system.items()}
+    return result
+
+
+class PackageCatalog(GenerationIndex):
+
+    def __init__(self, watcher):
+        super().__init__(watcher)
+        self._rows = {}
+        self._tree = {}
+        self._channels = {}  # (package_name, system, is_debug) -> 按 (create_time, id) 排序的列表，最后一个即最新构建
+        self._facets = {}  # appname -> 分面计数，代数变化时清空
+
+    # ---------- 构建与更新 ----------
+
+    def _load(self):
+        from app.repositories.package_repository import PackageRepository
+
+        rows, tree, channels = {}, {}, {}
+        for row in PackageRepository.iter_catalog_rows():
+            entry = CatalogEntry(*row)
+            rows[entry.id] = entry
+            tree.setdefault(entry.appname, {}).setdefault(entry.system, {}) \
+                .setdefault(entry.version, []).append((entry.create_time, entry.id))
+            channels.setdefault(_channel_key(entry), []).append((entry.create_time, entry.id))
+        for systems in tree.values():
+            for versions in systems.values():
+                for leaf in versions.values():
+                    leaf.sort()
+        for builds in channels.values():
+            builds.sort()
+        return rows, tree, channels
+
+    def _install(self, state):
+        self._rows, self._tree, self._channels = state
+        self._facets = {}
+        logger.info(f"软件包目录索引已构建: {len(self._rows)} 个包")
+
+    def _apply(self, upsert=(), delete=(), patch=None):
+        """
+        :param upsert: 新增或整体替换的 CatalogEntry
+        :param delete: 删除的包ID
+        :param patch: {id: {字段: 新值}}，只更新部分字段
+        """
+        for package_id in delete:
+            self._remove(package_id)
+        for entry in upsert:
+            self._remove(entry.id)
+            self._insert(entry)
+        for package_id, fields in (patch or {}).items():
+            entry = self._rows.get(package_id)
+            if entry is not None:
+                self._remove(package_id)
+                self._insert(entry._replace(**fields))
+        self._facets = {}
+
+    def _insert(self, entry):
+        self._rows[entry.id] = entry
+        leaf = self._tree.setdefault(entry.appname, {}).setdefault(entry.system, {}).setdefault(entry.version, [])
+        insort(leaf, (entry.create_time, entry.id))
+        insort(self._channels.setdefault(_channel_key(entry), []), (entry.create_time, entry.id))
+
+    def _remove(self, package_id):
+        entry = self._rows.pop(package_id, None)
+        if entry is None:
+            return
+        systems = self._tree[entry.appname]
+        versions = systems[entry.system]
+        leaf = versions[entry.version]
+        leaf.pop(bisect_left(leaf, (entry.create_time, entry.id)))
+        builds = self._channels[_channel_key(entry)]
+        builds.pop(bisect_left(builds, (entry.create_time, entry.id)))
+        if not builds:
+            del self._channels[_channel_key(entry)]
+        # 清理空节点，避免已删除的版本继续出现在版本列表里
+        if not leaf:
+            del versions[entry.version]
+            if not versions:
+                del systems[entry.system]
+                if not systems:
+                    del self._tree[entry.appname]
+
+    # ---------- 查询 ----------
+
+    def latest(self, keys):
+        """
+        各渠道的最新构建（更新检查）
+        :param keys: [(package_name, system, is_debug), ...]
+        :return: 与 keys 对应的 CatalogEntry 列表，没有构建时为 None
+        """
+        self.ensure_fresh()
+        with self._lock:
+            result = []
+            for key in keys:
+                builds = self._channels.get(key)
+                result.append(self._rows[builds[-1][1]] if builds else None)
+            return result
+
+    def _leaves(self, appname, system=None, version=None):
+        systems = self._tree.get(appname, {})
+        if system and system != 'all':
+            systems = {system: systems[system]} if system in systems else {}
+        for versions in systems.values():
+            if version and version != '全部':
+                if version in versions:
+                    yield versions[version]
+            else:
+                yield from versions.values()
+
+    def versions(self, appname, system=None):
+        """应用的全部版本号，按语义化版本从新到旧排序"""
+        self.ensure_fresh()
+        with self._lock:
+            systems = self._tree.get(appname, {})
+            if system and system != 'all':
+                systems = {system: systems[system]} if system in systems else {}
+            versions = {v for versions in systems.values() for v in versions}
+        return sorted(versions, key=version_sort_key, reverse=True)
+
+    def count(self, appname, system=None, version=None, ar=None, is_debug=None):
+        """符合条件的包数量"""
+        self.ensure_fresh()
+        is_debug = parse_is_debug(is_debug)
+        if ar == '全部':
+            ar = None
+        with self._lock:
+            leaves = list(self._leaves(appname, system, version))
+            if ar is None and is_debug is None:
+                return sum(len(leaf) for leaf in leaves)
+            return sum(
+                1 for leaf in leaves for _, package_id in leaf
+                if self._matches(self._rows[package_id], ar, is_debug)
+            )
+
+    def facets(self, appname):
+        """应用在各维度（系统/版本/架构/调试包）上的分面计数，缓存到下一次软件包写入"""
+        self.ensure_fresh()
+        with self._lock:
+            cached = self._facets.get(appname)
+            if cached is not None:
+                return cached
+            groups = Counter()
+            for leaf in self._leaves(appname):
+                for _, package_id in leaf:
+                    entry = self._rows[package_id]
+                    groups[(entry.system, entry.version, entry.ar, entry.is_debug)] += 1
+            result = build_facets(key + (count,) for key, count in groups.items())
+            self._facets[appname] = result
+            return result
+
+    @staticmethod
+    def _matches(entry, ar, is_debug):
+        return (ar is None or entry.ar == ar) and (is_debug is None or entry.is_debug == is_debug)
+
+    def search(self, appname, system=None, version=None, is_debug=None, page=None, after=None,
+               per_page=10, with_total=True):
+        """
+        按 create_time, id 倒序分页，返回的 Page.items 是包ID
+        :param page: 页码模式
+        :param after: 游标模式，上一页的 next_cursor
+        :raises ValueError: 游标格式错误
+        """
+        self.ensure_fresh()
+        is_debug = parse_is_debug(is_debug)
+        cursor = decode_cursor(after) if after else None
+        offset = (max(page, 1) - 1) * per_page if page else 0
+
+        with self._lock:
+            leaves = list(self._leaves(appname, system, version))
+            iterators = []
+            for leaf in leaves:
+                end = bisect_left(leaf, cursor) if cursor else len(leaf)
+                iterators.append(_descending(leaf, end))
+            merged = heapq.merge(*iterators, reverse=True)
+            if is_debug is not None:
+                merged = (key for key in merged if self._rows[key[1]].is_debug == is_debug)
+            keys = list(islice(merged, offset, offset + per_page + 1))
+
+            total = None
+            if with_total:
+                if is_debug is None:
+                    total = sum(len(leaf) for leaf in leaves)
+                else:
+                    total = sum(1 for leaf in leaves for _, package_id in leaf
+                                if self._rows[package_id].is_debug == is_debug)
+
+        has_more = len(keys) > per_page
+        keys = keys[:per_page]
+        return Page(
+            items=[package_id for _, package_id in keys],
+            per_page=per_page,
+            total=total,
+            page=page,
+            next_cursor=encode_cursor(*keys[-1]) if has_more else None,
+            has_more=has_more
+        )
+
+
+package_generation = watcher_for(PACKAGE_GENERATION)
+package_catalog = PackageCatalog(package_generation)
+
+
+def init_package_catalog(app):
+    """收到第一个请求时在后台线程预热索引（命令行操作不会触发）"""
+    started = threading.Event()
+
+    def _warm():
+        with app.app_context():
+            try:
+                package_catalog.ensure_fresh()
+            except Exception as e:
+                logger.error(f"软件包目录索引预热失败: {str(e)}")
+            finally:
+                from app import db
+                db.session.remove()
+
+    @app.before_request
+    def _warm_package_catalog():
+        if not started.is_set():
+            started.set()
+            threading.Thread(target=_warm, name='package-catalog-warmup', daemon=True).start()
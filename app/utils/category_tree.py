@@ -0,0 +1,66 @@
+"""
+进程内分类树：每个 categories 变更代数只读一次全部分类（本进程和其他进程的写入都整体重建），
+分类列表接口和“包含子分类”筛选都直接使用内存中的树
+
+categories.path 由分类名拼成且不随父节点维护，不能用前缀匹配找子树，这里按 parent_id 建树
+"""
+import logging
+
+from app.repositories.category_repository import CategoryRepository, CATEGORY_GENERATION
+from .generation import watcher_for, GenerationIndex
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryTree(GenerationIndex):
+
+    def __init__(self, watcher):
+        super().__init__(watcher)
+        self._children = {}     # parent_id -> [id, ...]，parent_id 为 None 的是根节点
+        self._tree = []         # 与 CategoryRepository.get_tree() 相同的结构
+        self._descendants = {}  # id -> 自身及全部子孙的ID元组，按需计算
+
+    def _load(self):
+        return CategoryRepository.get_rows()
+
+    def _install(self, rows):
+        ids = {category_id for category_id, _, _ in rows}
+        nodes = {category_id: {'id': category_id, 'name': name, 'children': []} for category_id, name, _ in rows}
+        children, tree = {}, []
+        for category_id, _, parent_id in rows:
+            # 父节点已不存在的分类按根节点处理
+            if parent_id is not None and parent_id in ids:
+                children.setdefault(parent_id, []).append(category_id)
+                nodes[parent_id]['children'].append(nodes[category_id])
+            else:
+                children.setdefault(None, []).append(category_id)
+                tree.append(nodes[category_id])
+        self._children, self._tree, self._descendants = children, tree, {}
+        logger.info(f"分类树已构建: {len(rows)} 个分类")
+
+    def tree(self):
+        """分类树（只读，调用方不要修改）"""
+        self.ensure_fresh()
+        return self._tree
+
+    def descendants(self, category_id):
+        """
+        分类自身及全部子孙分类的ID
+        :return: 升序元组，分类不存在时只包含它自己
+        """
+        self.ensure_fresh()
+        with self._lock:
+            cached = self._descendants.get(category_id)
+            if cached is not None:
+                return cached
+            seen, stack = {category_id}, [category_id]
+            while stack:
+                for child in self._children.get(stack.pop(), ()):
+                    if child not in seen:  # 防御 parent_id 成环
+                        seen.add(child)
+                        stack.append(child)
+            result = self._descendants[category_id] = tuple(sorted(seen))
+            return result
+
+
+category_tree = CategoryTree(watcher_for(CATEGORY_GENERATION))
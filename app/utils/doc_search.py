@@ -0,0 +1,59 @@
+"""
+文档全文检索：倒排表 doc_search_terms 按词项范围扫描，只读取查询词项的倒排链，
+耗时取决于查询词项的文档数而不是文档总数；结果按 BM25 打分排序
+"""
+import threading
+import time
+
+from config import Config
+from app.repositories.doc_search_repository import DocSearchRepository
+from app.repositories.document_repository import count_generations
+from app.repositories.pagination import Page, paginate
+from .search_terms import query_terms, bm25_idf
+
+_stats_lock = threading.Lock()
+_stats = {'value': None, 'loaded_at': 0.0}
+
+
+def corpus_stats():
+    """(文档数, 平均长度)，只用于打分，按 SEARCH_STATS_TTL 缓存"""
+    now = time.monotonic()
+    with _stats_lock:
+        if _stats['value'] is not None and now - _stats['loaded_at'] < Config.SEARCH_STATS_TTL:
+            return _stats['value']
+    value = DocSearchRepository.corpus_stats()
+    with _stats_lock:
+        _stats['value'], _stats['loaded_at'] = value, now
+    return value
+
+
+def search_documents(q, page=1, per_page=10, status=None, category_id=None, user_id=None, with_total=True):
+    """
+    检索同时包含全部查询词项的文档，按 BM25 得分倒序分页
+    :param with_total: False 时不计算总数，只返回 has_more
+    :return: Page，items 为 (doc_id, score)
+    """
+    page = max(page, 1)
+    terms = query_terms(q)
+    if not terms:
+        return Page(items=[], per_page=per_page, total=0 if with_total else None, page=page)
+
+    frequencies = DocSearchRepository.document_frequencies(terms)
+    if len(frequencies) < len(terms):
+        # 有词项没有任何文档包含，不可能全部命中
+        return Page(items=[], per_page=per_page, total=0 if with_total else None, page=page)
+
+    total_docs, avg_length = corpus_stats()
+    total_docs = max(total_docs, max(frequencies.values()))
+    idfs = {term: bm25_idf(df, total_docs) for term, df in frequencies.items()}
+
+    query = DocSearchRepository.ranked(
+        idfs, avg_length, Config.SEARCH_BM25_K1, Config.SEARCH_BM25_B,
+        status=status, category_id=category_id, user_id=user_id
+    )
+    count_key = ('doc_search', tuple(terms), tuple(sorted(status)) if status is not None else None,
+                 category_id, user_id or None)
+    result = paginate(query, page=page, per_page=per_page, with_total=with_total,
+                      count_key=count_key, generations=count_generations(status))
+    result.items = [(row.doc_id, float(row.score)) for row in result.items]
+    return result
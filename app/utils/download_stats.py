@@ -0,0 +1,128 @@
+"""
+软件包下载统计：请求线程只做内存累加，后台线程每隔几秒把有变化的包批量写入 package_stats
+
+刷新时把本进程尚未写入的增量（次数、新增设备的 HyperLogLog）合并进每个包唯一的统计行，
+写入成功后才从内存中清掉，失败时放回下次重试；表的行数只与包的数量有关，不随进程重启增长。
+"""
+import atexit
+import logging
+import threading
+
+from app import db
+from app.repositories.package_stats_repository import PackageStatsRepository
+from .hll import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._downloads = {}  # package_id -> 尚未写入的次数
+        self._sketches = {}   # package_id -> 尚未写入的设备 HyperLogLog
+
+    def record(self, package_id, device_id):
+        """记录一次下载（热路径，只做内存操作）"""
+        with self._lock:
+            self._downloads[package_id] = self._downloads.get(package_id, 0) + 1
+            sketch = self._sketches.get(package_id)
+            if sketch is None:
+                sketch = self._sketches[package_id] = HyperLogLog()
+            sketch.add(device_id)
+
+    def flush(self):
+        """把有变化的包写入数据库，返回写入行数"""
+        with self._lock:
+            downloads, self._downloads = self._downloads, {}
+            sketches, self._sketches = self._sketches, {}
+        if not downloads:
+            return 0
+        rows = [
+            {'package_id': package_id, 'downloads': count, 'sketch': sketches[package_id]}
+            for package_id, count in downloads.items()
+        ]
+        try:
+            PackageStatsRepository.merge_many(rows)
+        except Exception:
+            db.session.rollback()
+            # 增量放回内存，与刷新期间的新记录合并后下次重试
+            with self._lock:
+                for package_id, count in downloads.items():
+                    self._downloads[package_id] = self._downloads.get(package_id, 0) + count
+                    sketch = self._sketches.get(package_id)
+                    self._sketches[package_id] = sketches[package_id].merge(sketch) if sketch is not None else sketches[package_id]
+            raise
+        return len(rows)
+
+    def summary(self, package_id):
+        """
+        已写入的统计加上本进程尚未写入的增量
+        :return: {'downloads': 次数, 'unique_devices': 独立设备数(估计值)}
+        """
+        row = PackageStatsRepository.get_for_package(package_id)
+        downloads = row.downloads if row else 0
+        sketch = HyperLogLog.from_bytes(row.sketch) if row else HyperLogLog()
+
+        with self._lock:
+            downloads += self._downloads.get(package_id, 0)
+            local = self._sketches.get(package_id)
+            if local is not None:
+                sketch.merge(local)
+        return {'downloads': downloads, 'unique_devices': sketch.count()}
+
+
+download_stats = DownloadStats()
+
+
+class StatsFlusher:
+    """定时刷新下载统计的后台线程"""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='stats-flusher', daemon=True)
+        self._thread.start()
+        # 进程正常退出时把最后几秒的数据也写进去
+        atexit.register(self.stop, self.interval)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        with self.app.app_context():
+            while not self._stop.wait(self.interval):
+                self._flush()
+            self._flush()
+
+    def _flush(self):
+        try:
+            download_stats.flush()
+        except Exception as e:
+            logger.error(f"下载统计刷新失败: {str(e)}")
+        finally:
+            db.session.remove()
+
+
+_flusher = None
+_flusher_lock = threading.Lock()
+
+
+def init_download_stats(app):
+    """收到第一个请求时启动刷新线程（命令行操作不会启动）"""
+
+    @app.before_request
+    def _start_stats_flusher():
+        global _flusher
+        if _flusher is not None:
+            return
+        with _flusher_lock:
+            if _flusher is None:
+                _flusher = StatsFlusher(app, app.config['STATS_FLUSH_INTERVAL'])
+                _flusher.start()
@@ -0,0 +1,129 @@
+"""变更代数观察器：节流读取 change_generations，供进程内存索引和缓存判断数据是否变化"""
+import threading
+import time
+
+from config import Config
+
+# 本模块会被 app.repositories 中的仓储导入，这里不在模块顶层导入 app.repositories，避免循环导入
+
+
+def _generation_repository():
+    from app.repositories.generation_repository import GenerationRepository
+    return GenerationRepository
+
+
+class GenerationWatcher:
+    """
+    按固定间隔从数据库读取某个数据集的变更代数，间隔内直接返回上次读到的值
+    本进程自己的写入通过 note() 立即生效，不必等到下次轮询
+    """
+
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self._value = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self, force=False):
+        now = time.monotonic()
+        if not force and self._value is not None and now - self._checked_at < self.interval:
+            return self._value
+
+        value = _generation_repository().get(self.name)
+        with self._lock:
+            if self._value is None or value > self._value:
+                self._value = value
+            self._checked_at = now
+            return self._value
+
+    def note(self, generation):
+        """记录本进程提交的变更代数"""
+        with self._lock:
+            if self._value is None or generation > self._value:
+                self._value = generation
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def watcher_for(name):
+    """
+    进程内共享的观察器：同一数据集的索引和缓存用同一个实例，本进程写入 note() 后对它们同时生效
+    """
+    watcher = _watchers.get(name)
+    if watcher is None:
+        with _watchers_lock:
+            watcher = _watchers.setdefault(name, GenerationWatcher(name, Config.CATALOG_CHECK_INTERVAL))
+    return watcher
+
+
+class GenerationIndex:
+    """
+    按变更代数维护的进程内索引的公共部分：首次使用时构建；本进程的写入提交后增量更新；
+    其他进程的写入通过代数变化发现后整体重建（已有旧索引时不阻塞读请求）
+    子类实现 _load()（读库，返回新状态）、_install(state) 和 _apply(**changes)，后两者在 self._lock 内调用
+    """
+
+    def __init__(self, watcher):
+        self._watcher = watcher
+        self._lock = threading.Lock()        # 保护子类的索引结构
+        self._build_lock = threading.Lock()  # 同一时间只有一个线程重建
+        self._generation = None
+        self._stale = False
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _install(self, state):
+        raise NotImplementedError
+
+    def _apply(self, **changes):
+        raise NotImplementedError
+
+    def rebuild(self):
+        """从数据库重新构建（先读代数再读数据，二者在同一事务内）"""
+        generation = _generation_repository().get(self._watcher.name)
+        state = self._load()
+        with self._lock:
+            self._install(state)
+            self._generation = generation
+            self._stale = False
+        self._watcher.note(generation)
+
+    def ensure_fresh(self):
+        current = self._watcher.current()
+        if self._generation is not None and not self._stale and current == self._generation:
+            return
+        if self._build_lock.acquire(blocking=self._generation is None):
+            try:
+                if self._generation is None or self._stale or self._watcher.current() != self._generation:
+                    self.rebuild()
+            finally:
+                self._build_lock.release()
+
+    def apply(self, generation, **changes):
+        """
+        本进程提交写入后增量更新
+        :param generation: 这次写入得到的代数，不是当前代数 +1 时说明中间有其他进程的写入，标记为过期
+        :return: 是否已增量更新
+        """
+        with self._lock:
+            if self._generation is None:
+                return False
+            if self._stale or generation != self._generation + 1:
+                self._stale = True
+                return False
+            self._apply(**changes)
+            self._generation = generation
+        self._watcher.note(generation)
+        return True
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+    @property
+    def generation(self):
+        return self._generation
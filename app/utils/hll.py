@@ -0,0 +1,51 @@
+"""HyperLogLog 基数估计：固定 4KB 的寄存器即可估算独立设备数（标准误差约 1.6%）"""
+import hashlib
+import math
+
+PRECISION = 12                 # 寄存器数 2^12，修改后已持久化的 sketch 无法合并
+REGISTERS = 1 << PRECISION
+_VALUE_BITS = 64 - PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+
+    __slots__ = ('registers',)
+
+    def __init__(self, registers=None):
+        if registers is not None and len(registers) != REGISTERS:
+            raise ValueError(f"HyperLogLog 寄存器长度应为 {REGISTERS}，实际 {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(REGISTERS)
+
+    def add(self, value):
+        h = _hash64(value)
+        index = h >> _VALUE_BITS
+        rest = h & ((1 << _VALUE_BITS) - 1)
+        rank = _VALUE_BITS - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """逐个寄存器取最大值，合并后等价于两个集合的并集"""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        estimate = _ALPHA * REGISTERS * REGISTERS / sum(2.0 ** -r for r in self.registers)
+        if estimate <= 2.5 * REGISTERS:
+            zeros = self.registers.count(0)
+            if zeros:
+                # 小基数时改用线性计数
+                estimate = REGISTERS * math.log(REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(data)
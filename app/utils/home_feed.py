@@ -0,0 +1,250 @@
+"""
+首页文档流：已发布文档的ID按 (created_at, id) 排好序常驻内存，全站一份，另按分类、标签各一份
+
+首页请求直接在内存中分页；渲染好的响应体按 (代数, 筛选条件, 页码, 每页数量) 缓存，
+构建索引和本进程写入后预先渲染全站和各分类的第一页，首页访问不需要查库。
+本进程的写入提交后增量更新；其他进程的写入通过 documents 变更代数发现后整体重建。
+"""
+import heapq
+import logging
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+from itertools import islice
+from datetime import datetime
+from math import ceil
+
+from flask import current_app
+
+from config import Config
+from app.repositories.document_repository import DocumentRepository, DOCUMENT_GENERATION
+from app.repositories.pagination import Page
+from .cache import LRUCache
+from .category_tree import category_tree
+from .generation import watcher_for, GenerationIndex
+
+logger = logging.getLogger(__name__)
+
+FeedEntry = namedtuple('FeedEntry', 'id created_at category_id tags')
+
+
+def _sort_key(entry):
+    return entry.created_at or datetime.min, entry.id
+
+
+def _descending_unique(lists):
+    """多个升序列表合并成一个倒序序列，同一文档只出现一次（同一文档的排序键相同，合并后相邻）"""
+    previous = None
+    for key in heapq.merge(*(reversed(keys) for keys in lists), reverse=True):
+        if key != previous:
+            previous = key
+            yield key
+
+
+class HomeFeed(GenerationIndex):
+
+    def __init__(self, watcher, cache_size):
+        super().__init__(watcher)
+        self._entries = {}
+        self._all = []          # [(created_at, id)] 升序，最后一个是最新发布的文档
+        self._by_category = {}  # category_id -> 同结构
+        self._by_tag = {}       # tag_id -> 同结构
+        self._pages = LRUCache(cache_size)
+
+    # ---------- 构建与更新 ----------
+
+    def _load(self):
+        rows, tag_rows = DocumentRepository.get_feed_rows()
+        tags = {}
+        for doc_id, tag_id in tag_rows:
+            tags.setdefault(doc_id, set()).add(tag_id)
+        return [
+            FeedEntry(doc_id, created_at, category_id, frozenset(tags.get(doc_id, ())))
+            for doc_id, created_at, category_id in rows
+        ]
+
+    def _install(self, entries):
+        self._entries, self._all, self._by_category, self._by_tag = {}, [], {}, {}
+        for entry in entries:
+            self._entries[entry.id] = entry
+            key = _sort_key(entry)
+            self._all.append(key)
+            self._by_category.setdefault(entry.category_id, []).append(key)
+            for tag_id in entry.tags:
+                self._by_tag.setdefault(tag_id, []).append(key)
+        for keys in (self._all, *self._by_category.values(), *self._by_tag.values()):
+            keys.sort()
+        self._pages.clear()
+        logger.info(f"首页文档流已构建: {len(self._entries)} 篇文档")
+
+    def _apply(self, upsert=(), delete=()):
+        """
+        :param upsert: 新发布或内容/分类/标签变化的 FeedEntry
+        :param delete: 删除或撤回发布的文档ID
+        """
+        for doc_id in delete:
+            self._remove(doc_id)
+        for entry in upsert:
+            self._remove(entry.id)
+            self._insert(entry)
+        self._pages.clear()
+
+    def _insert(self, entry):
+        self._entries[entry.id] = entry
+        key = _sort_key(entry)
+        insort(self._all, key)
+        insort(self._by_category.setdefault(entry.category_id, []), key)
+        for tag_id in entry.tags:
+            insort(self._by_tag.setdefault(tag_id, []), key)
+
+    def _remove(self, doc_id):
+        entry = self._entries.pop(doc_id, None)
+        if entry is None:
+            return
+        key = _sort_key(entry)
+        self._all.pop(bisect_left(self._all, key))
+        for index, group in [(self._by_category, entry.category_id)] + [(self._by_tag, t) for t in entry.tags]:
+            keys = index[group]
+            keys.pop(bisect_left(keys, key))
+            if not keys:
+                del index[group]
+
+    def rebuild(self):
+        super().rebuild()
+        self._warm_quietly()
+
+    def apply(self, generation, **changes):
+        applied = super().apply(generation, **changes)
+        if applied:
+            self._warm_quietly()
+        return applied
+
+    def _warm_quietly(self):
+        # 预渲染失败不影响索引本身，请求到来时会重新渲染
+        try:
+            self.warm()
+        except Exception as e:
+            logger.error(f"首页文档流预渲染失败: {str(e)}")
+
+    # ---------- 查询 ----------
+
+    def _select_tags(self, category_ids, tag_ids, match_all):
+        """
+        包含任一（match_all 时为全部）标签、并且属于这些分类之一的文档
+        :return: (倒序的排序键迭代器, 总数)
+        """
+        if match_all:
+            if any(tag_id not in self._by_tag for tag_id in tag_ids):
+                return iter(()), 0
+            # 从最短的标签列表出发逐个检查，相当于倒排链求交
+            shortest = min((self._by_tag[tag_id] for tag_id in tag_ids), key=len)
+            wanted = frozenset(tag_ids)
+            ids = {
+                doc_id for _, doc_id in shortest
+                if wanted <= self._entries[doc_id].tags
+                and (category_ids is None or self._entries[doc_id].category_id in category_ids)
+            }
+            return (key for key in reversed(shortest) if key[1] in ids), len(ids)
+
+        lists = [self._by_tag[tag_id] for tag_id in tag_ids if tag_id in self._by_tag]
+        if category_ids is None:
+            total = len({doc_id for keys in lists for _, doc_id in keys})
+            return _descending_unique(lists), total
+        ids = {doc_id for keys in lists for _, doc_id in keys if self._entries[doc_id].category_id in category_ids}
+        return (key for key in _descending_unique(lists) if key[1] in ids), len(ids)
+
+    def _page(self, category_ids, tag_ids, page, per_page, match_all=False):
+        """
+        :param category_ids: None 表示全站，否则为分类ID元组（包含子分类时有多个）
+        :return: Page，items 为文档ID
+        """
+        offset = (page - 1) * per_page
+        with self._lock:
+            if tag_ids:
+                keys, total = self._select_tags(category_ids, tag_ids, match_all)
+                ids = [doc_id for _, doc_id in islice(keys, offset, offset + per_page)]
+            elif category_ids is not None and len(category_ids) > 1:
+                # 每篇文档只属于一个分类，子树的文档流就是各分类列表的归并
+                lists = [self._by_category[c] for c in category_ids if c in self._by_category]
+                total = sum(len(keys) for keys in lists)
+                ids = [doc_id for _, doc_id in islice(_descending_unique(lists), offset, offset + per_page)]
+            else:
+                keys = self._by_category.get(category_ids[0], []) if category_ids is not None else self._all
+                total = len(keys)
+                end = max(total - offset, 0)
+                ids = [doc_id for _, doc_id in reversed(keys[max(end - per_page, 0):end])]
+        return Page(items=ids, per_page=per_page, total=total, page=page, has_more=offset + per_page < total)
+
+    def render(self, category_id=None, tag_ids=None, page=1, per_page=10, match_all=False,
+               include_descendants=False):
+        """
+        已发布文档按发布时间倒序分页，tag_ids 为包含任一标签（match_all 时为包含全部标签）
+        :param include_descendants: 为 True 时 category_id 包含其全部子孙分类
+        :return: JSON 响应体 bytes（与文档列表接口的结构一致），命中缓存时不查库
+        """
+        self.ensure_fresh()
+        category_ids = None
+        if category_id is not None:
+            category_ids = category_tree.descendants(category_id) if include_descendants else (category_id,)
+        tag_ids = tuple(sorted(set(tag_ids))) if tag_ids else ()
+        match_all = bool(match_all) and len(tag_ids) > 1
+        return self._render(category_ids, tag_ids, max(page, 1), per_page, match_all)
+
+    def _render(self, category_ids, tag_ids, page, per_page, match_all=False, docs=None):
+        # 分类子树直接作为缓存键的一部分，分类结构变化后自然落到新的键上
+        key = (self._generation, category_ids, tag_ids, match_all, page, per_page)
+        body = self._pages.get(key)
+        if body is not None:
+            return body
+
+        result = self._page(category_ids, tag_ids, page, per_page, match_all)
+        if docs is None:
+            docs = {doc.id: doc for doc in DocumentRepository.get_by_ids(result.items)}
+        body = current_app.json.dumps({
+            'items': [docs[doc_id].to_dict() for doc_id in result.items if doc_id in docs],
+            'total': result.total,
+            'pages': ceil(result.total / per_page) if per_page else 0,
+            'current_page': page,
+            'has_more': result.has_more
+        }).encode('utf-8')
+        self._pages.set(key, body)
+        return body
+
+    def warm(self, per_page=None):
+        """预先渲染全站和各分类的第一页（所有文档一次查询取回）"""
+        per_page = per_page or Config.HOME_FEED_PER_PAGE
+        with self._lock:
+            scopes = [None] + [(category_id,) for category_id in self._by_category if category_id is not None]
+        first_pages = {scope: self._page(scope, (), 1, per_page).items for scope in scopes}
+        docs = {doc.id: doc for doc in DocumentRepository.get_by_ids(
+            list({doc_id for ids in first_pages.values() for doc_id in ids}))}
+        for scope in scopes:
+            self._render(scope, (), 1, per_page, docs=docs)
+
+
+home_feed = HomeFeed(watcher_for(DOCUMENT_GENERATION), Config.HOME_FEED_CACHE_SIZE)
+
+
+def feed_entry(doc, tag_ids):
+    return FeedEntry(doc.id, doc.created_at, doc.category_id, frozenset(tag_ids))
+
+
+def init_home_feed(app):
+    """收到第一个请求时在后台线程构建首页文档流并预渲染第一页"""
+    started = threading.Event()
+
+    def _warm():
+        with app.app_context():
+            try:
+                home_feed.ensure_fresh()
+            except Exception as e:
+                logger.error(f"首页文档流预热失败: {str(e)}")
+            finally:
+                from app import db
+                db.session.remove()
+
+    @app.before_request
+    def _warm_home_feed():
+        if not started.is_set():
+            started.set()
+            threading.Thread(target=_warm, name='home-feed-warmup', daemon=True).start()
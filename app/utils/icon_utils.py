@@ -0,0 +1,70 @@
+"""软件包图标入库：内存中计算md5、进程内 md5->icon_id 缓存、直接上传字节到OSS"""
+import base64
+import hashlib
+import logging
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.repositories.icon_repository import IconRepository
+from config import Config
+from .cache import LRUCache
+from .job_queue import enqueue
+from .oss_utils import get_object_url, object_exists
+
+logger = logging.getLogger(__name__)
+
+# md5 -> icon_id；同一个应用的图标几乎不变，命中后既不查库也不上传
+icon_id_cache = LRUCache(Config.ICON_CACHE_SIZE)
+
+
+def ingest_icon(data, legacy_name=None):
+    """
+    登记图标并返回 icon_id，新图标的上传交给后台任务
+    :param data: 图标二进制内容
+    :param legacy_name: 旧版本按 Base64 文本计算的 md5 名称，用于复用已有记录
+    :return: icon_id
+    """
+    name = hashlib.md5(data).hexdigest()
+
+    icon_id = icon_id_cache.get(name) or (legacy_name and icon_id_cache.get(legacy_name))
+    if icon_id:
+        return icon_id
+
+    icon = IconRepository.get_by_names([name, legacy_name])
+    object_name = f'package_icons/{name}.png'
+    if icon is None:
+        try:
+            # 图标记录和上传任务在同一事务内提交，不会出现有记录却没有上传任务的情况
+            icon = IconRepository.create({'name': name, 'url': get_object_url(object_name)}, commit=False)
+            _enqueue_upload(object_name, data, commit=False)
+            db.session.commit()
+        except IntegrityError:
+            # 并发请求已登记同一图标
+            db.session.rollback()
+            icon = IconRepository.get_by_names([name])
+    elif icon.name == name and not _uploaded(object_name):
+        # 记录存在但OSS上没有对象（上传任务重试耗尽等），用这次收到的数据重新上传
+        logger.warning(f"图标 {name} 未上传到OSS，重新投递上传任务")
+        _enqueue_upload(object_name, data)
+
+    icon_id_cache.set(name, icon.id)
+    if legacy_name:
+        icon_id_cache.set(legacy_name, icon.id)
+    return icon.id
+
+
+def _enqueue_upload(object_name, data, commit=True):
+    enqueue('package.upload_icon', {
+        'object_name': object_name,
+        'data': base64.b64encode(data).decode('ascii')
+    }, commit=commit)
+
+
+def _uploaded(object_name):
+    """只在进程内缓存未命中时检查一次；查询失败时按已上传处理，不影响入库"""
+    try:
+        return object_exists(object_name)
+    except Exception as e:
+        logger.error(f"检查图标 {object_name} 是否已上传失败: {str(e)}")
+        return True
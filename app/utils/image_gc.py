@@ -0,0 +1,70 @@
+"""孤儿图片回收：清理预留后未上传、或已不再被任何文档引用的图片（数据库记录 + OSS对象）"""
+import logging
+import time
+from datetime import timedelta
+
+from app import db
+from app.repositories.image_repository import ImageRepository
+from .oss_utils import delete_oss_files
+
+logger = logging.getLogger(__name__)
+
+
+def collect_orphan_images(grace_hours=24, chunk_size=1000, dry_run=False, rate_limit=None):
+    """
+    回收孤儿图片
+    :param grace_hours: 宽限期(小时)，只处理预留时间早于该时长的图片
+    :param chunk_size: 每批处理数量（不超过OSS批量删除上限1000）
+    :param dry_run: 只统计不删除
+    :param rate_limit: 每秒最多删除的图片数，None 表示不限速
+    :return: 统计信息 dict
+    """
+    chunk_size = max(1, min(chunk_size, 1000))
+    # created_at 由数据库 NOW() 写入（服务器本地时区），宽限期也按数据库时钟计算
+    cutoff = ImageRepository.db_now() - timedelta(hours=grace_hours)
+    stats = {
+        'cutoff': cutoff.isoformat(),
+        'dry_run': dry_run,
+        'chunks': 0,
+        'scanned': 0,
+        'not_uploaded': 0,
+        'not_in_use': 0,
+        'oss_deleted': 0,
+        'rows_deleted': 0,
+        'errors': 0,
+        'elapsed': 0.0
+    }
+    started = time.monotonic()
+
+    for chunk in ImageRepository.iter_orphan_chunks(cutoff, chunk_size, lock=not dry_run):
+        chunk_started = time.monotonic()
+        stats['chunks'] += 1
+        stats['scanned'] += len(chunk)
+        stats['not_uploaded'] += sum(1 for image in chunk if not image.uploaded)
+        stats['not_in_use'] += sum(1 for image in chunk if image.uploaded and not image.in_use)
+
+        if dry_run:
+            continue
+
+        try:
+            deleted_keys = set(delete_oss_files([image.oss_key for image in chunk]))
+            ids = [image.id for image in chunk if image.oss_key in deleted_keys]
+            stats['oss_deleted'] += len(deleted_keys)
+            stats['rows_deleted'] += ImageRepository.delete_by_ids(ids, cutoff)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            stats['errors'] += 1
+            logger.error(f"孤儿图片回收失败(第 {stats['chunks']} 批): {str(e)}")
+
+        if rate_limit:
+            wait = len(chunk) / rate_limit - (time.monotonic() - chunk_started)
+            if wait > 0:
+                time.sleep(wait)
+
+    if dry_run:
+        db.session.rollback()
+
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    logger.info(f"孤儿图片回收完成: {stats}")
+    return stats
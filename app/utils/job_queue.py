@@ -0,0 +1,211 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app import db
+from app.repositories.job_repository import JobRepository
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def job_handler(kind):
+    """
+    注册任务处理函数，任务参数(payload)以关键字参数传入
+
+        @job_handler('package.upload_icon')
+        def upload_icon(object_name, data): ...
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, delay=0, max_attempts=None, commit=True):
+    """
+    投递后台任务
+    :param kind: 任务类型（需已通过 job_handler 注册）
+    :param payload: 任务参数，必须可JSON序列化
+    :param delay: 延迟执行秒数
+    :return: Job
+    """
+    from config import Config
+
+    if kind not in _handlers:
+        raise ValueError(f"未注册的任务类型: {kind}")
+    return JobRepository.enqueue(
+        kind,
+        payload,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or Config.JOB_MAX_ATTEMPTS,
+        commit=commit
+    )
+
+
+def enqueue_many(kind, payloads, delay=0, max_attempts=None, commit=True):
+    """
+    批量投递同类后台任务（一次提交），由各 worker 并发执行
+    :param commit: False 时不提交，随调用方的业务数据一起提交
+    :return: [Job, ...]
+    """
+    from config import Config
+
+    if kind not in _handlers:
+        raise ValueError(f"未注册的任务类型: {kind}")
+    if not payloads:
+        return []
+    return JobRepository.enqueue_many(
+        kind,
+        payloads,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or Config.JOB_MAX_ATTEMPTS,
+        commit=commit
+    )
+
+
+class JobWorkerPool:
+    """
+    轮询数据库执行后台任务的线程池
+    失败的任务按指数退避重试，超过最大次数后标记为 failed
+    """
+
+    def __init__(self, app, size, poll_interval=1.0):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._identity = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(
+                target=self._loop,
+                args=(f"{self._identity}:{i}",),
+                name=f"job-worker-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"后台任务线程已启动: {self.size} 个")
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_once(self, worker_id):
+        """领取并执行一个任务，没有到期任务时返回 False"""
+        job = JobRepository.claim_next(worker_id)
+        if job is None:
+            return False
+        self._execute(job, worker_id)
+        return True
+
+    def _loop(self, worker_id):
+        last_requeue = 0.0
+        with self.app.app_context():
+            while not self._stop.is_set():
+                try:
+                    if time.monotonic() - last_requeue > self.app.config['JOB_LOCK_TIMEOUT']:
+                        last_requeue = time.monotonic()
+                        JobRepository.requeue_stale(self.app.config['JOB_LOCK_TIMEOUT'])
+
+                    if not self.run_once(worker_id):
+                        self._stop.wait(self.poll_interval)
+                except Exception as e:
+                    logger.error(f"后台任务轮询失败: {str(e)}")
+                    db.session.rollback()
+                    self._stop.wait(self.poll_interval * 5)
+                finally:
+                    db.session.remove()
+
+    def _execute(self, job, worker_id):
+        handler = _handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise ValueError(f"未注册的任务类型: {job.kind}")
+            with _Heartbeat(self.app, job.id, worker_id, self.app.config['JOB_HEARTBEAT_INTERVAL']):
+                handler(**(job.payload or {}))
+        except Exception as e:
+            db.session.rollback()
+            retry_at = None
+            if handler is not None and job.attempts < job.max_attempts:
+                delay = min(
+                    self.app.config['JOB_RETRY_BASE_DELAY'] * 2 ** (job.attempts - 1),
+                    self.app.config['JOB_RETRY_MAX_DELAY']
+                )
+                retry_at = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"任务 {job.id}({job.kind}) 第 {job.attempts} 次执行失败: {str(e)}")
+            owned = JobRepository.mark_failed(job.id, worker_id, str(e), retry_at)
+        else:
+            owned = JobRepository.mark_succeeded(job.id, worker_id)
+        if not owned:
+            logger.warning(f"任务 {job.id}({job.kind}) 已超时被重新入队，本次执行结果不再记录")
+
+
+class _Heartbeat:
+    """任务执行期间在后台线程定期刷新心跳，执行时间再长也不会被当作 worker 崩溃而被其他 worker 接管"""
+
+    def __init__(self, app, job_id, worker_id, interval):
+        self.app = app
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.wait(self.interval):
+                try:
+                    if not JobRepository.heartbeat(self.job_id, self.worker_id):
+                        return  # 任务已不归本 worker 所有
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"任务 {self.job_id} 心跳失败: {str(e)}")
+                finally:
+                    db.session.remove()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_job_queue(app):
+    """
+    注册任务处理函数；worker 线程在收到第一个请求时才启动，
+    这样 flask db upgrade 等命令行操作不会启动后台线程
+    """
+    from . import package_tasks  # noqa: F401 注册任务处理函数
+    from .package_retention import schedule_retention
+
+    @app.before_request
+    def _start_job_workers():
+        global _pool
+        if _pool is not None or app.config['JOB_WORKERS'] <= 0:
+            return
+        with _pool_lock:
+            if _pool is None:
+                _pool = JobWorkerPool(app, app.config['JOB_WORKERS'], app.config['JOB_POLL_INTERVAL'])
+                _pool.start()
+                # 构建保留策略的定时任务链在这里补种（已有待执行任务时不会重复投递）
+                try:
+                    schedule_retention()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"投递构建保留任务失败: {str(e)}")
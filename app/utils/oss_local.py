@@ -0,0 +1,169 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from urllib.parse import quote
+
+from oss2.exceptions import NoSuchKey
+
+
+class _LocalResult:
+    """模拟 oss2 的请求结果对象（只保留业务代码用到的字段）"""
+
+    def __init__(self, status, etag=None, content_length=None, headers=None):
+        self.status = status
+        self.etag = etag
+        self.content_length = content_length
+        self.headers = headers or {}
+        self.request_id = 'local'
+
+
+class _LocalObject(_LocalResult):
+    """模拟 oss2.models.GetObjectResult，可像文件一样 read()"""
+
+    def __init__(self, data, etag):
+        super().__init__(200, etag=etag, content_length=len(data),
+                         headers={'Content-Length': str(len(data)), 'ETag': f'"{etag}"'})
+        self._data = data
+        self._pos = 0
+
+    def read(self, amt=None):
+        if amt is None or amt < 0:
+            chunk = self._data[self._pos:]
+        else:
+            chunk = self._data[self._pos:self._pos + amt]
+        self._pos += len(chunk)
+        return chunk
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                return
+            yield chunk
+
+
+class LocalBucket:
+    """
+    基于本地文件系统的 OSS Bucket 替身
+    接口与 oss2.Bucket 保持一致（仅实现项目用到的部分），用于离线开发、测试与压测
+    """
+
+    def __init__(self, root, bucket_name='local'):
+        self.root = os.path.abspath(root)
+        self.bucket_name = bucket_name
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key.lstrip('/')))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"非法的对象键: {key}")
+        return path
+
+    @staticmethod
+    def _not_found(key):
+        return NoSuchKey(404, {}, b'', {'Code': 'NoSuchKey', 'Key': key})
+
+    @staticmethod
+    def _etag(path):
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(chunk)
+        return md5.hexdigest().upper()
+
+    def get_bucket_info(self):
+        return SimpleNamespace(
+            name=self.bucket_name,
+            creation_date=datetime.fromtimestamp(os.path.getctime(self.root)).isoformat(),
+            location='local'
+        )
+
+    def put_object(self, key, data, headers=None, **kwargs):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        # 先写临时文件再原子替换，避免并发读到半个文件
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.upload-')
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f)
+        os.replace(tmp_path, path)
+        return _LocalResult(200, etag=self._etag(path))
+
+    def put_object_from_file(self, key, filename, headers=None, **kwargs):
+        with open(filename, 'rb') as f:
+            return self.put_object(key, f, headers=headers)
+
+    def get_object(self, key, byte_range=None, headers=None, **kwargs):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise self._not_found(key)
+
+        with open(path, 'rb') as f:
+            if byte_range:
+                start, end = byte_range
+                size = os.path.getsize(path)
+                if start is None:
+                    start, end = max(size - end, 0), size - 1
+                elif end is None:
+                    end = size - 1
+                f.seek(start)
+                data = f.read(end - start + 1)
+            else:
+                data = f.read()
+        return _LocalObject(data, self._etag(path))
+
+    def get_object_to_file(self, key, filename, byte_range=None, headers=None, **kwargs):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise self._not_found(key)
+        if byte_range:
+            with open(filename, 'wb') as f:
+                f.write(self.get_object(key, byte_range=byte_range).read())
+        else:
+            shutil.copyfile(path, filename)
+        return _LocalResult(200, etag=self._etag(path), content_length=os.path.getsize(filename))
+
+    def head_object(self, key, headers=None, **kwargs):
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise self._not_found(key)
+        size = os.path.getsize(path)
+        etag = self._etag(path)
+        return _LocalResult(200, etag=etag, content_length=size,
+                            headers={'Content-Length': str(size), 'ETag': f'"{etag}"'})
+
+    def object_exists(self, key, headers=None):
+        return os.path.isfile(self._path(key))
+
+    def delete_object(self, key, params=None, headers=None):
+        path = self._path(key)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # 与OSS一致：删除不存在的对象也返回204
+        return _LocalResult(204)
+
+    def batch_delete_objects(self, key_list, headers=None):
+        for key in key_list:
+            self.delete_object(key)
+        result = _LocalResult(200)
+        result.deleted_keys = list(key_list)
+        return result
+
+    def restore_object(self, key, params=None, headers=None, input=None):
+        if not os.path.isfile(self._path(key)):
+            raise self._not_found(key)
+        return _LocalResult(202)
+
+    def sign_url(self, method, key, expires, headers=None, params=None, slash_safe=False, additional_headers=None):
+        return f"file://{quote(self._path(key))}"
@@ -0,0 +1,67 @@
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime
+from urllib.parse import quote
+
+from config import Config
+from .cache import LRUCache
+
+
+class UrlSigner:
+    """
+    本地生成 OSS 下载签名URL（V1签名，不产生任何网络请求）
+
+    过期时间按 OSS_URL_EXPIRE_BUCKET 向上取整，同一时间段内同一个 key 得到完全相同的URL，
+    CDN 才能命中缓存；签好的URL放在以 oss_key 为键的LRU中，所在时间段结束前即被替换。
+    """
+
+    def __init__(self, maxsize=10000):
+        self._cache = LRUCache(maxsize)
+
+    @staticmethod
+    def _expires_at(now):
+        expire = Config.OSS_URL_EXPIRE
+        step = Config.OSS_URL_EXPIRE_BUCKET
+        return -(-(int(now) + expire) // step) * step
+
+    @staticmethod
+    def _sign(oss_key, expires):
+        string_to_sign = f"GET\n\n\n{expires}\n/{Config.OSS_BUCKET}/{oss_key}"
+        secret = (Config.OSS_ACCESS_KEY_SECRET or '').encode('utf-8')
+        digest = hmac.new(secret, string_to_sign.encode('utf-8'), hashlib.sha1).digest()
+        signature = quote(base64.b64encode(digest).decode('utf-8'), safe='')
+
+        return (
+            f"https://{Config.OSS_CUSTOM_DOMAIN}/{quote(oss_key, safe='/')}"
+            f"?OSSAccessKeyId={quote(Config.OSS_ACCESS_KEY_ID or '', safe='')}"
+            f"&Expires={expires}&Signature={signature}"
+        )
+
+    def sign(self, oss_key, now=None):
+        """
+        获取 oss_key 的下载地址
+        :param oss_key: OSS文件key
+        :return: (url, expires) expires 为 Unix 时间戳
+        """
+        expires = self._expires_at(now if now is not None else time.time())
+
+        cached = self._cache.get(oss_key)
+        if cached and cached[1] == expires:
+            return cached
+
+        entry = (self._sign(oss_key, expires), expires)
+        self._cache.set(oss_key, entry)
+        return entry
+
+    def clear(self):
+        self._cache.clear()
+
+
+url_signer = UrlSigner(Config.OSS_URL_CACHE_SIZE)
+
+
+def format_expires(expires):
+    """将过期时间戳格式化为 ISO 字符串（与原接口保持一致，使用本地时间）"""
+    return datetime.fromtimestamp(expires).isoformat()
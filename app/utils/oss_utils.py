@@ -4,41 +4,107 @@ from oss2.exceptions import OssError, NoSuchKey
 import oss2 
 from oss2 import Auth, Bucket, exceptions
 from functools import lru_cache
-from urllib.parse import urlparse
 
 import logging
+import threading
+import time
 # from flask import jsonify
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 from config import Config
+from .oss_local import LocalBucket
+from .oss_sign import url_signer, format_expires
+from .sts_cache import StsCredentialCache, LocalStsResponder
+
+OSS_BATCH_DELETE_LIMIT = 1000  # OSS DeleteMultipleObjects 单次最多删除数量
+
 
 class OSSOperationError(Exception):
     """自定义OSS操作异常"""
     pass
 
-def get_bucket():
-    """
-    获取OSS Bucket实例
-    :return: oss2.Bucket 实例
-    """
+_bucket = None
+_bucket_lock = threading.Lock()
+_last_health_check = 0.0
+
+
+def _create_bucket():
+    """按配置创建 Bucket 实例（真实OSS 或 本地文件系统替身）"""
+    if Config.OSS_BACKEND == 'local':
+        return LocalBucket(Config.OSS_LOCAL_ROOT, Config.OSS_BUCKET or 'local')
+
     auth = Auth(
         Config.OSS_ACCESS_KEY_ID,
         Config.OSS_ACCESS_KEY_SECRET
     )
 
     endpoint = f"https://oss-{Config.OSS_REGION}.aliyuncs.com"
-    print(f"OSS Endpoint: {endpoint}")  # 调试用
 
-    bucket = Bucket(auth, endpoint, Config.OSS_BUCKET)
+    # 所有请求共享同一个连接池，避免每次调用都重新握手
+    session = oss2.Session(pool_size=Config.OSS_CONNECTION_POOL_SIZE)
+
+    return Bucket(
+        auth,
+        endpoint,
+        Config.OSS_BUCKET,
+        session=session,
+        connect_timeout=Config.OSS_CONNECT_TIMEOUT
+    )
+
+
+def _check_bucket_health(bucket):
+    """
+    周期性地探测 Bucket 连通性，失败时丢弃缓存实例，下次调用时重建
+    """
+    global _bucket, _last_health_check
+
+    with _bucket_lock:
+        if time.monotonic() - _last_health_check < Config.OSS_HEALTH_CHECK_INTERVAL:
+            return  # 其他线程刚检查过
+        _last_health_check = time.monotonic()
+
+    try:
+        bucket.get_bucket_info()
+    except Exception as e:
+        logging.warning(f"OSS Bucket 健康检查失败，将在下次调用时重建: {str(e)}")
+        with _bucket_lock:
+            if _bucket is bucket:
+                _bucket = None
+
+
+def get_bucket():
+    """
+    获取进程内共享的OSS Bucket实例（线程安全，复用HTTP连接池）
+    首次使用及每隔 OSS_HEALTH_CHECK_INTERVAL 秒做一次健康检查，而不是每次调用都探测
+    :return: oss2.Bucket 实例
+    """
+    global _bucket, _last_health_check
+
+    bucket = _bucket
+    if bucket is None:
+        with _bucket_lock:
+            if _bucket is None:
+                _bucket = _create_bucket()
+                _last_health_check = 0.0
+            bucket = _bucket
 
-    # 测试连接
-    bucket.get_bucket_info()
-    print("OSS Bucket 连接成功")
+    if time.monotonic() - _last_health_check >= Config.OSS_HEALTH_CHECK_INTERVAL:
+        _check_bucket_health(bucket)
 
     return bucket
 
+
+def reset_bucket():
+    """丢弃缓存的 Bucket 实例（配置变更或 fork 子进程后调用）"""
+    global _bucket, _last_health_check
+    with _bucket_lock:
+        _bucket = None
+        _last_health_check = 0.0
+
+
+@lru_cache(maxsize=1)
 def get_oss_client():
-    """获取OSS客户端"""
+    """获取OSS客户端（进程内复用）"""
     try:
         # 使用主账号AK创建客户端
         client = AcsClient(
@@ -50,47 +116,72 @@ def get_oss_client():
     except Exception as e:
         print(f"创建OSS客户端失败: {str(e)}")
         raise OSSOperationError(f"客户端创建失败: {str(e)}")
-        
-def generate_sts_token():
+
+
+def _assume_role(scope):
+    """
+    调用 STS AssumeRole 获取临时凭证
+    :param scope: (user_id, policy)，policy 为 JSON 字符串或 None
+    :return: STS 返回的 Credentials 字典
+    """
+    _, policy = scope
+
+    if Config.OSS_BACKEND == 'local':
+        return local_sts_responder.assume_role(scope)
+
+    client = get_oss_client()
+
+    # 创建 AssumeRole 请求
+    request = AssumeRoleRequest.AssumeRoleRequest()
+    request.set_accept_format('json')  # 明确指定返回格式
+
+    # 设置角色参数
+    request.set_RoleArn(Config.OSS_ROLE_ARN)
+    request.set_RoleSessionName('vue3-upload-session')
+    request.set_DurationSeconds(Config.OSS_TOKEN_EXPIRE)
+
+    # 设置精细化的权限策略(可以不设置策略)
+    # policy = {
+    #     "Version": "1",
+    #     "Statement": [{
+    #         "Effect": "Allow",
+    #         "Action": ["oss:PutObject"],
+    #         "Resource": [
+    #             f"acs:oss:*:*:{Config.OSS_BUCKET}/packages/*",
+    #             f"acs:oss:*:*:{Config.OSS_BUCKET}"  # 某些操作需要bucket级别权限
+    #         ],
+    #         "Condition": {
+    #             "IpAddress": {"acs:SourceIp": Config.ALLOWED_IPS} if hasattr(Config, 'ALLOWED_IPS') else None
+    #         }
+    #     }]
+    # }
+    if policy:
+        request.set_Policy(policy)
+
+    # 发送请求并处理响应
+    response = client.do_action_with_exception(request)
+    response_data = json.loads(response.decode('utf-8'))
+    return response_data['Credentials']
+
+
+local_sts_responder = LocalStsResponder(Config.OSS_TOKEN_EXPIRE)
+
+sts_cache = StsCredentialCache(
+    _assume_role,
+    safety_margin=Config.OSS_TOKEN_SAFETY_MARGIN,
+    refresh_margin=Config.OSS_TOKEN_REFRESH_MARGIN
+)
+
+
+def generate_sts_token(user_id=None, policy=None):
     """
     生成 OSS 临时上传凭证（STS Token）
-    使用阿里云 SDK v3 风格改造
+    凭证按 (user_id, policy) 缓存复用，临近过期时后台刷新，并发请求只触发一次 AssumeRole
+    :param user_id: 当前用户ID
+    :param policy: 权限策略（JSON 字符串），None 表示使用角色默认权限
     """
     try:
-        # 1. 初始化客户端（新版推荐使用 credential 链）
-        client =  get_oss_client()
-
-        # 2. 创建 AssumeRole 请求
-        request = AssumeRoleRequest.AssumeRoleRequest()
-        request.set_accept_format('json')  # 明确指定返回格式
-        
-        # 3. 设置角色参数
-        request.set_RoleArn(Config.OSS_ROLE_ARN)
-        request.set_RoleSessionName('vue3-upload-session')
-        request.set_DurationSeconds(Config.OSS_TOKEN_EXPIRE)
-        
-        # 4. 设置精细化的权限策略(可以不设置策略)
-        # policy = {
-        #     "Version": "1",
-        #     "Statement": [{
-        #         "Effect": "Allow",
-        #         "Action": ["oss:PutObject"],
-        #         "Resource": [
-        #             f"acs:oss:*:*:{Config.OSS_BUCKET}/packages/*",
-        #             f"acs:oss:*:*:{Config.OSS_BUCKET}"  # 某些操作需要bucket级别权限
-        #         ],
-        #         "Condition": {
-        #             "IpAddress": {"acs:SourceIp": Config.ALLOWED_IPS} if hasattr(Config, 'ALLOWED_IPS') else None
-        #         }
-        #     }]
-        # }
-        # request.set_Policy(json.dumps(policy))
-
-        # 5. 发送请求并处理响应
-        response = client.do_action_with_exception(request)
-        response_data = json.loads(response.decode('utf-8'))
-        
-        credentials = response_data['Credentials']
+        credentials = sts_cache.get((user_id, policy))
         return {
             'status': 'success',
             'data': {
@@ -124,12 +215,7 @@ def delete_oss_file(oss_key):
     """
     # print(oss_key)
     try:
-        # print(f"开始创建bucket")
         bucket = get_bucket()
-
-        info = bucket.get_bucket_info()
-        # print(f"Bucket验证成功，创建时间: {info.creation_date}")
-
         result = bucket.delete_object(oss_key)
         return result.status == 204
     except NoSuchKey:
@@ -139,6 +225,24 @@ def delete_oss_file(oss_key):
         logging.error(f"OSS删除失败: {str(e)}")
         raise OSSOperationError(f"OSS删除失败: {str(e)}")
 
+def delete_oss_files(oss_keys):
+    """
+    批量删除OSS文件（每次请求最多1000个key）
+    :param oss_keys: 文件路径列表
+    :raises: OSSOperationError
+    :return: 已删除的key列表（不存在的key同样视为删除成功）
+    """
+    bucket = get_bucket()
+    deleted = []
+    try:
+        for i in range(0, len(oss_keys), OSS_BATCH_DELETE_LIMIT):
+            result = bucket.batch_delete_objects(oss_keys[i:i + OSS_BATCH_DELETE_LIMIT])
+            deleted.extend(result.deleted_keys)
+    except OssError as e:
+        logging.error(f"OSS批量删除失败: {str(e)}")
+        raise OSSOperationError(f"OSS批量删除失败: {str(e)}")
+    return deleted
+
 def restore_oss_file(oss_key):
     """
     恢复OSS文件（需开启版本控制）
@@ -154,6 +258,34 @@ def restore_oss_file(oss_key):
         logging.error(f"OSS恢复失败: {str(e)}")
         raise OSSOperationError(f"OSS恢复失败: {str(e)}")
 
+def object_exists(object_name):
+    """
+    对象是否已存在于OSS
+    :param object_name: OSS上的目标路径（不含环境前缀）
+    :raises: OSSOperationError
+    """
+    try:
+        return get_bucket().object_exists(get_object_key(object_name))
+    except OssError as e:
+        logging.error(f"OSS查询失败: {str(e)}")
+        raise OSSOperationError(f"OSS查询失败: {str(e)}")
+
+def get_object_key(object_name):
+    """
+    对象在OSS上的实际key（非生产环境统一加 test/ 前缀）
+    :param object_name: OSS上的目标路径（不含环境前缀）
+    """
+    if Config.APP_ENV != 'production':
+        return f"test/{object_name}"
+    return object_name
+
+def get_object_url(object_name):
+    """
+    获取对象在OSS上的访问地址（与 upload_to_oss 的返回值一致）
+    :param object_name: OSS上的目标路径（不含环境前缀）
+    """
+    return f"https://{Config.OSS_BUCKET}.oss-{Config.OSS_REGION}.aliyuncs.com/{get_object_key(object_name)}"
+
 def upload_to_oss(file_path, object_name=None):
     """
     上传文件到阿里云OSS
@@ -161,115 +293,58 @@ def upload_to_oss(file_path, object_name=None):
     :param object_name: OSS上的目标路径（包含文件名），如果为None则自动生成
     :return: 文件在OSS的URL
     """
-    
-    # 初始化OSS客户端
+    with open(file_path, 'rb') as f:
+        return put_bytes_to_oss(f, object_name)
+
+def put_bytes_to_oss(data, object_name=None, content_type=None):
+    """
+    直接从内存上传数据到OSS（不落地临时文件）
+    :param data: bytes 或可读的文件对象
+    :param object_name: OSS上的目标路径（包含文件名），如果为None则自动生成
+    :param content_type: Content-Type，可选
+    :return: 文件在OSS的URL
+    """
     bucket = get_bucket()
-    
+
     # 生成唯一文件名（如果未指定）
     if not object_name:
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         object_name = f"images/{timestamp}.png"
-    
-    if Config.APP_ENV != 'production':
-        object_name = f"test/{object_name}"
-    # 上传文件
-    with open(file_path, 'rb') as f:
-        bucket.put_object(object_name, f)
-    
-    print("@@@@@@", object_name)
+
+    url = get_object_url(object_name)
+
+    headers = {'Content-Type': content_type} if content_type else None
+    bucket.put_object(get_object_key(object_name), data, headers=headers)
 
     # 返回可访问的URL
-    return f"https://{Config.OSS_BUCKET}.oss-{Config.OSS_REGION}.aliyuncs.com/{object_name}"
+    return url
 
 def get_download_url(oss_key):
-    bucket = get_bucket()
+    """
+    获取文件的下载地址（本地签名，无网络请求；同一时间段内同一 key 返回相同URL）
+    :param oss_key: OSS文件key
+    :return: {'url': 自定义域名下的签名URL, 'expires': 过期时间(ISO格式)}
+    """
+    url, expires = url_signer.sign(oss_key)
 
-    expires = 3600  # 单位：秒
-    # 生成原始签名URL（含OSS默认域名）
-    original_url = bucket.sign_url('GET', oss_key, expires)
-    
-    # 解析原始URL，提取路径和查询参数
-    parsed_url = urlparse(original_url)
-    path_and_query = parsed_url.path + "?" + parsed_url.query
-    
-    # 替换为自定义域名（需确保已绑定到OSS Bucket）
-    custom_domain = "oss.superrabbithero.xyz"  # 替换为你的自定义域名
-    custom_url = f"https://{custom_domain}{path_and_query}"
-
-    # print(url)
-    
     return {
-        'url': custom_url,
-        'expires': (datetime.now() + timedelta(seconds=expires)).isoformat()
+        'url': url,
+        'expires': format_expires(expires)
     }
 
-def createplist(oss_key, bundle_id, version, apptitle):
-    print("上传plist到OSS")
-    
-    filename = (oss_key[14:-4] + ".plist") if Config.APP_ENV != 'production' else (oss_key[9:-4] + ".plist")
-
-    print(filename)
-    
-    # 生成plist内容
-    content = """<?xml version="1.0" encoding="UTF-8"?>
-<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
-<plist version="1.0">
-<dict>
-    <key>items</key>
-        <array>
-            <dict>
-                <key>assets</key>
-                <array>
-                    <dict>
-                        <key>kind</key>
-                        <string>software-package</string>
-                        <key>url</key>
-                        <string>https://oss.superrabbithero.xyz/""" + oss_key + """</string>
-                    </dict>
-                    <dict>
-                        <key>kind</key>
-                        <string>full-size-image</string>
-                        <key>needs-shine</key>
-                        <true/>
-                        <key>url</key>
-                        <string>https://enterprise.cloudpay.com.cn/app/packages/iphone-2x.png</string>
-                    </dict>
-                </array>
-                <key>metadata</key>
-                    <dict>
-                    <key>bundle-identifier</key>
-                    <string>""" + bundle_id + """</string>
-                    <key>bundle-version</key>
-                    <string>""" + version + """</string>
-                    <key>kind</key>
-                    <string>software</string>
-                    <key>title</key>
-                    <string>""" + apptitle + """</string>
-                </dict>
-            </dict>
-        </array>
-</dict>
-</plist>"""
-    
-    try:
-        # 获取OSS bucket
-        bucket = get_bucket()
-
-        base_path = "test/" if Config.APP_ENV != 'production' else ""
-        
-        # 上传文件到OSS
-        print(f"{base_path}packages/plists/{filename}")
-        bucket.put_object(
-            key = f"{base_path}packages/plists/{filename}",
-            data=content,             # 文件内容
-            headers={
-                'Content-Type': 'application/x-plist'  # 设置正确的Content-Type
-            }
-        )
-        
-        print(f"成功上传plist文件到OSS: {filename}")
-        return {'success': True, 'filename': filename}
-        
-    except Exception as e:
-        print(f"上传plist到OSS失败: {str(e)}")
-        return {'error': str(e)}
\ No newline at end of file
+def get_download_urls(oss_keys):
+    """
+    批量获取下载地址（一次遍历完成签名，不逐个创建Bucket）
+    :param oss_keys: OSS文件key列表
+    :return: [{'oss_key', 'url', 'expires'}]，顺序与入参一致
+    """
+    now = time.time()
+    items = []
+    for oss_key in oss_keys:
+        url, expires = url_signer.sign(oss_key, now=now)
+        items.append({
+            'oss_key': oss_key,
+            'url': url,
+            'expires': format_expires(expires)
+        })
+    return items
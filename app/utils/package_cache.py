@@ -0,0 +1,171 @@
+"""软件包本地磁盘缓存：首次从存储后端拉取，之后直接从本地磁盘提供下载"""
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .oss_utils import get_bucket
+
+logger = logging.getLogger(__name__)
+
+
+class PackageFileCache:
+    """
+    按总大小做LRU淘汰的读穿透(read-through)磁盘缓存
+    缓存目录可能被同一台机器上的多个 worker 进程共用：占用量和LRU顺序都以目录本身为准
+    （文件大小、访问时间），淘汰在目录下的文件锁内进行；同一个 oss_key 在进程内并发未命中时只拉取一次
+    """
+
+    LOCK_NAME = '.lock'
+
+    def __init__(self, root, max_bytes):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        os.makedirs(self.root, exist_ok=True)
+        self._evict()
+
+    def _path(self, oss_key):
+        digest = hashlib.sha1(oss_key.encode('utf-8')).hexdigest()
+        ext = os.path.splitext(oss_key)[1]
+        return os.path.join(self.root, f"{digest}{ext}")
+
+    @contextmanager
+    def _dir_lock(self):
+        """进程内线程锁 + 目录文件锁；每次重新打开锁文件，fork 出的进程之间不会共用同一把锁"""
+        with self._lock:
+            with open(os.path.join(self.root, self.LOCK_NAME), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _touch(path):
+        """记录一次使用：只更新访问时间（mtime 用作下载的 ETag，保持不变）"""
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+
+    def _scan(self):
+        """:return: [(访问时间, 路径, 大小), ...]，按访问时间从旧到新"""
+        files = []
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_atime, entry.path, stat.st_size))
+        return sorted(files)
+
+    def _evict(self):
+        """淘汰最久未使用的文件直到目录总大小不超过上限（最近使用的一个文件总是保留）"""
+        with self._dir_lock():
+            files = self._scan()
+            total = sum(size for _, _, size in files)
+            for _, path, size in files[:-1]:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
+
+    def get(self, oss_key):
+        """
+        获取 oss_key 对应的本地文件路径，未命中时从存储后端拉取
+        返回后文件随时可能被淘汰（包括其他进程），需要读取内容时用 open_file()
+        :return: 本地文件路径
+        """
+        path = self._path(oss_key)
+        if os.path.isfile(path):
+            self._touch(path)
+            return path
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(path, threading.Lock())
+
+        with fetch_lock:
+            try:
+                if os.path.isfile(path):
+                    self._touch(path)
+                    return path
+
+                # 临时文件名带上进程号和线程号，多个进程同时拉取同一个文件时互不覆盖
+                tmp_path = os.path.join(
+                    self.root, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.part")
+                try:
+                    get_bucket().get_object_to_file(oss_key, tmp_path)
+                    os.replace(tmp_path, path)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+                logger.info(f"软件包已缓存到本地: {oss_key}")
+                self._touch(path)
+                self._evict()
+                return path
+            finally:
+                # 文件落盘之后才移除拉取锁，之后到达的请求一定能命中，不会重复拉取
+                with self._lock:
+                    if self._fetch_locks.get(path) is fetch_lock:
+                        del self._fetch_locks[path]
+
+    def open_file(self, oss_key):
+        """
+        打开 oss_key 对应的本地文件，未命中时从存储后端拉取
+        在目录锁内打开，之后即使被淘汰删除，已打开的文件仍能完整读取
+        :return: 二进制文件对象，由调用方关闭
+        :raises FileNotFoundError: 重新拉取后仍在打开前被淘汰
+        """
+        for _ in range(2):
+            path = self.get(oss_key)
+            with self._dir_lock():
+                try:
+                    return open(path, 'rb')
+                except FileNotFoundError:
+                    # 拉取后、打开前已被淘汰，重新拉取
+                    continue
+        raise FileNotFoundError(path)
+
+    def cached_path(self, oss_key):
+        """已缓存时返回本地路径，否则返回 None（不会触发拉取）"""
+        path = self._path(oss_key)
+        return path if os.path.isfile(path) else None
+
+    def discard(self, oss_key):
+        """删除本地缓存（软件包被删除时调用）"""
+        with self._dir_lock():
+            try:
+                os.remove(self._path(oss_key))
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_package_cache():
+    """
+    获取进程内共享的软件包缓存，未配置 PACKAGE_CACHE_DIR 时返回 None
+    """
+    from config import Config
+
+    global _cache
+    if not Config.PACKAGE_CACHE_DIR:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PackageFileCache(Config.PACKAGE_CACHE_DIR, Config.PACKAGE_CACHE_MAX_BYTES)
+    return _cache
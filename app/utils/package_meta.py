@@ -0,0 +1,292 @@
+"""
+服务端解析 APK/IPA 元数据（包名、版本、CPU架构、图标）
+
+只读取 ZIP 中央目录和少量条目，不下载整个安装包，详见 zip_reader。
+"""
+import plistlib
+import re
+import struct
+import zlib
+
+from .zip_reader import ZipDirectory, BucketRangeSource, FileRangeSource
+
+# ---------- Android ----------
+
+ABI_BITS = {
+    'armeabi': 32,
+    'armeabi-v7a': 32,
+    'x86': 32,
+    'mips': 32,
+    'arm64-v8a': 64,
+    'x86_64': 64,
+    'mips64': 64,
+    'riscv64': 64,
+}
+
+_LIB_RE = re.compile(r'^lib/([^/]+)/[^/]+\.so$')
+_ANDROID_ICON_RE = re.compile(r'^res/(?:mipmap|drawable)-([a-z]*)dpi[^/]*/(?:ic_launcher|app_icon|icon)\.png$')
+_DENSITY_ORDER = ['xxxh', 'xxh', 'xh', 'h', 'm', 'l', '']
+
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+TYPE_INT_BOOLEAN = 0x12
+
+# android:xxx 属性的资源ID，混淆过的 APK 属性名可能为空，按资源ID识别
+ATTR_RESOURCE_IDS = {
+    0x0101021b: 'versionCode',
+    0x0101021c: 'versionName',
+    0x0101020c: 'minSdkVersion',
+    0x01010270: 'targetSdkVersion',
+}
+
+
+def list_abis(names):
+    """从 ZIP 条目名中提取 lib/<abi>/*.so 对应的 ABI 列表（排序去重）"""
+    abis = set()
+    for name in names:
+        match = _LIB_RE.match(name)
+        if match:
+            abis.add(match.group(1))
+    return sorted(abis)
+
+
+def describe_abis(abis):
+    """
+    把 ABI 列表转换为 packages.ar 使用的描述
+    :return: x32 / x64 / x32、x64 / 未知（没有 native 库）
+    """
+    bits = {ABI_BITS.get(abi) for abi in abis} - {None}
+    if bits == {32, 64}:
+        return "x32、x64"
+    if bits == {32}:
+        return "x32"
+    if bits == {64}:
+        return "x64"
+    return "未知"
+
+
+def _read_string_pool(data, start):
+    _, header_size, _ = struct.unpack_from('<HHL', data, start)
+    count, _, flags, strings_start, _ = struct.unpack_from('<5L', data, start + 8)
+    utf8 = bool(flags & 0x100)
+    offsets = struct.unpack_from(f'<{count}L', data, start + header_size)
+    base = start + strings_start
+
+    strings = []
+    for offset in offsets:
+        pos = base + offset
+        if utf8:
+            # UTF-16 字符数 + UTF-8 字节数，各 1~2 字节
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 2
+            else:
+                pos += 1
+            strings.append(data[pos:pos + length].decode('utf-8', errors='replace'))
+        else:
+            length = struct.unpack_from('<H', data, pos)[0]
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from('<H', data, pos + 2)[0]
+                pos += 4
+            else:
+                pos += 2
+            strings.append(data[pos:pos + length * 2].decode('utf-16-le', errors='replace'))
+    return strings
+
+
+def parse_binary_xml(data, elements=('manifest', 'uses-sdk', 'application')):
+    """
+    解析二进制 AndroidManifest.xml，返回指定元素的属性
+    :return: {元素名: {属性名: 值}}，同名元素只取第一个
+    """
+    chunk_type, header_size, _ = struct.unpack_from('<HHL', data, 0)
+    if chunk_type != RES_XML_TYPE:
+        raise ValueError("不是二进制XML文件")
+
+    strings = []
+    resource_ids = []
+    result = {}
+    pos = header_size
+    while pos + 8 <= len(data):
+        chunk_type, header_size, chunk_size = struct.unpack_from('<HHL', data, pos)
+        if chunk_size == 0:
+            break
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = _read_string_pool(data, pos)
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (chunk_size - header_size) // 4
+            resource_ids = struct.unpack_from(f'<{count}L', data, pos + header_size)
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            ext = pos + header_size
+            _, name_idx, attr_start, attr_size, attr_count = struct.unpack_from('<2L3H', data, ext)
+            tag = strings[name_idx] if name_idx < len(strings) else ''
+            if tag in elements and tag not in result:
+                result[tag] = _read_attributes(
+                    data, ext + attr_start, attr_size, attr_count, strings, resource_ids)
+
+        pos += chunk_size
+    return result
+
+
+def _read_attributes(data, pos, attr_size, count, strings, resource_ids):
+    attrs = {}
+    for i in range(count):
+        _, name_idx, raw_idx, _, _, data_type, value = struct.unpack_from('<3LHBBL', data, pos + i * attr_size)
+        name = strings[name_idx] if name_idx < len(strings) else ''
+        if name_idx < len(resource_ids) and resource_ids[name_idx] in ATTR_RESOURCE_IDS:
+            name = ATTR_RESOURCE_IDS[resource_ids[name_idx]]
+        if not name:
+            continue
+
+        if data_type == TYPE_STRING:
+            attrs[name] = strings[value]
+        elif raw_idx != 0xFFFFFFFF and raw_idx < len(strings):
+            attrs[name] = strings[raw_idx]
+        elif data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+            attrs[name] = value
+        elif data_type == TYPE_INT_BOOLEAN:
+            attrs[name] = value != 0
+    return attrs
+
+
+def _find_android_icon(names):
+    candidates = []
+    for name in names:
+        match = _ANDROID_ICON_RE.match(name)
+        if match and match.group(1) in _DENSITY_ORDER:
+            candidates.append((_DENSITY_ORDER.index(match.group(1)), name))
+    return min(candidates)[1] if candidates else None
+
+
+def extract_apk_meta(zip_dir):
+    """从 APK 的中央目录和 AndroidManifest.xml 解析元数据"""
+    names = zip_dir.namelist()
+    abis = list_abis(names)
+    manifest = parse_binary_xml(zip_dir.read('AndroidManifest.xml'))
+    root = manifest.get('manifest', {})
+    sdk = manifest.get('uses-sdk', {})
+
+    icon_name = _find_android_icon(names)
+    return {
+        'package_name': root.get('package'),
+        'version': root.get('versionName'),
+        'version_code': root.get('versionCode'),
+        'min_sdk': sdk.get('minSdkVersion'),
+        'target_sdk': sdk.get('targetSdkVersion'),
+        'abis': abis,
+        'ar': describe_abis(abis),
+        'icon': zip_dir.read(icon_name) if icon_name else None
+    }
+
+
+# ---------- iOS ----------
+
+_INFO_PLIST_RE = re.compile(r'^Payload/[^/]+\.app/Info\.plist$')
+
+
+def normalize_ios_png(data):
+    """
+    把 Xcode 压缩过的 CgBI PNG 还原为标准 PNG（BGRA -> RGBA，zlib 头补全）
+    非 CgBI 图片原样返回
+    """
+    if data[12:16] != b'CgBI':
+        return data
+
+    pos = 8
+    width = height = 0
+    idat = b''
+    chunks = []
+    while pos < len(data):
+        length, chunk_type = struct.unpack_from('>L4s', data, pos)
+        body = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b'IHDR':
+            width, height = struct.unpack_from('>2L', body)
+            chunks.append((chunk_type, body))
+        elif chunk_type == b'IDAT':
+            idat += body
+        elif chunk_type == b'IEND':
+            break
+        elif chunk_type != b'CgBI':
+            chunks.append((chunk_type, body))
+
+    raw = bytearray(zlib.decompress(idat, -15))
+    stride = width * 4 + 1
+    for row in range(height):
+        start = row * stride + 1
+        line = raw[start:start + width * 4]
+        line[0::4], line[2::4] = line[2::4], line[0::4]
+        raw[start:start + width * 4] = line
+
+    chunks.append((b'IDAT', zlib.compress(bytes(raw))))
+    chunks.append((b'IEND', b''))
+
+    out = bytearray(b'\x89PNG\r\n\x1a\n')
+    for chunk_type, body in chunks:
+        out += struct.pack('>L', len(body)) + chunk_type + body
+        out += struct.pack('>L', zlib.crc32(chunk_type + body) & 0xFFFFFFFF)
+    return bytes(out)
+
+
+def _find_ios_icon(names, app_dir, info):
+    icon_files = []
+    for key in ('CFBundleIcons', 'CFBundleIcons~ipad'):
+        icon_files += info.get(key, {}).get('CFBundlePrimaryIcon', {}).get('CFBundleIconFiles', [])
+    icon_files += info.get('CFBundleIconFiles', [])
+
+    candidates = [
+        name for name in names
+        if name.startswith(app_dir) and name.count('/') == app_dir.count('/')
+        and name.endswith('.png')
+        and any(name[len(app_dir):].startswith(prefix) for prefix in icon_files)
+    ]
+    return candidates
+
+
+def extract_ipa_meta(zip_dir):
+    """从 IPA 的 Info.plist 解析元数据"""
+    names = zip_dir.namelist()
+    plist_name = next((name for name in names if _INFO_PLIST_RE.match(name)), None)
+    if plist_name is None:
+        raise ValueError("IPA 中未找到 Info.plist")
+
+    info = plistlib.loads(zip_dir.read(plist_name))
+    app_dir = plist_name[:-len('Info.plist')]
+
+    icon = None
+    candidates = _find_ios_icon(names, app_dir, info)
+    if candidates:
+        largest = max(candidates, key=lambda name: zip_dir.entries[name].file_size)
+        icon = normalize_ios_png(zip_dir.read(largest))
+
+    return {
+        'package_name': info.get('CFBundleIdentifier'),
+        'version': info.get('CFBundleShortVersionString'),
+        'version_code': info.get('CFBundleVersion'),
+        'display_name': info.get('CFBundleDisplayName') or info.get('CFBundleName'),
+        'min_os': info.get('MinimumOSVersion'),
+        'icon': icon
+    }
+
+
+def extract_package_meta(system, oss_key=None, local_path=None, bucket=None):
+    """
+    解析安装包元数据，优先读取本地文件（mmap），否则对OSS对象做范围读取
+    :param system: android / ios
+    :return: 元数据 dict，另含 bytes_read（实际读取的字节数）和 size（安装包大小）
+    """
+    source = FileRangeSource(local_path) if local_path else BucketRangeSource(bucket, oss_key)
+    with ZipDirectory(source) as zip_dir:
+        meta = extract_ipa_meta(zip_dir) if system == 'ios' else extract_apk_meta(zip_dir)
+    meta['bytes_read'] = source.bytes_read
+    meta['size'] = source.size
+    return meta
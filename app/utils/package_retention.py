@@ -0,0 +1,173 @@
+"""
+构建保留策略：按 PACKAGE_RETENTION_RULES 用窗口函数找出超出保留数量的旧构建，
+先批量删除 OSS 对象（每次最多1000个key），再分批删除数据库记录和相关增量补丁
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from config import Config
+from app import db
+from app.repositories.package_repository import PackageRepository
+from app.repositories.package_delta_repository import PackageDeltaRepository
+from app.repositories.job_repository import JobRepository
+from .job_queue import job_handler, enqueue
+from .oss_utils import delete_oss_files
+from .package_cache import get_package_cache
+
+logger = logging.getLogger(__name__)
+
+RETENTION_JOB = 'package.retention'
+
+
+def normalize_rule(rule):
+    """
+    校验并补全一条保留规则
+    :raises ValueError: 规则格式错误
+    """
+    if not isinstance(rule, dict):
+        raise ValueError(f"保留规则必须是对象: {rule!r}")
+    keep_last = rule.get('keep_last')
+    if not isinstance(keep_last, int) or isinstance(keep_last, bool) or keep_last < 1:
+        raise ValueError(f"keep_last 必须是正整数: {rule!r}")
+    per = rule.get('per', 'version')
+    if per not in ('version', 'app'):
+        raise ValueError(f"per 只能是 version 或 app: {rule!r}")
+    is_debug = rule.get('is_debug')
+    if is_debug is not None and not isinstance(is_debug, bool):
+        raise ValueError(f"is_debug 必须是布尔值: {rule!r}")
+    min_age_days = rule.get('min_age_days', 0)
+    if not isinstance(min_age_days, (int, float)) or min_age_days < 0:
+        raise ValueError(f"min_age_days 不能为负数: {rule!r}")
+
+    return {
+        'appname': rule.get('appname') or '*',
+        'system': rule.get('system') or '*',
+        'is_debug': is_debug,
+        'keep_last': keep_last,
+        'per': per,
+        'min_age_days': min_age_days
+    }
+
+
+def load_rules(rules=None):
+    """未指定时使用配置中的规则"""
+    rules = Config.PACKAGE_RETENTION_RULES if rules is None else rules
+    return [normalize_rule(rule) for rule in rules]
+
+
+def apply_retention(rules=None, chunk_size=200, dry_run=False, rate_limit=None, sample_size=20):
+    """
+    执行保留策略
+    :param rules: 保留规则列表，默认使用 PACKAGE_RETENTION_RULES
+    :param chunk_size: 每批删除数量（不超过OSS批量删除上限1000）
+    :param dry_run: 只生成报告不删除
+    :param rate_limit: 每秒最多删除的包数，None 表示不限速
+    :param sample_size: 报告中每条规则列出的包ID数量
+    :return: 统计信息 dict，rules 中是每条规则的命中数量、字节数和示例ID
+    """
+    rules = load_rules(rules)
+    chunk_size = max(1, min(chunk_size, 1000))
+    now = datetime.utcnow()
+    stats = {
+        'dry_run': dry_run,
+        'rules': [],
+        'expired': 0,
+        'bytes': 0,
+        'chunks': 0,
+        'oss_deleted': 0,
+        'rows_deleted': 0,
+        'deltas_deleted': 0,
+        'errors': 0,
+        'elapsed': 0.0
+    }
+    started = time.monotonic()
+
+    expired = []
+    for index, rule in enumerate(rules):
+        cutoff = now - timedelta(days=rule['min_age_days']) if rule['min_age_days'] else None
+        rows = PackageRepository.find_expired(rule, rules[:index], cutoff)
+        size = sum(row.size for row in rows)
+        stats['rules'].append(dict(
+            rule,
+            expired=len(rows),
+            bytes=size,
+            sample_ids=[row.id for row in rows[:sample_size]]
+        ))
+        stats['expired'] += len(rows)
+        stats['bytes'] += size
+        expired.extend(rows)
+    # 结束只读事务，避免长时间持有快照
+    db.session.rollback()
+
+    if not dry_run:
+        cache = get_package_cache()
+        for i in range(0, len(expired), chunk_size):
+            chunk = expired[i:i + chunk_size]
+            chunk_started = time.monotonic()
+            stats['chunks'] += 1
+
+            # 先删OSS再删记录：中途失败时记录仍在，下次执行会重新删除（不存在的key视为删除成功）
+            try:
+                deleted_keys = set(delete_oss_files([row.oss_key for row in chunk]))
+                ids = [row.id for row in chunk if row.oss_key in deleted_keys]
+                stats['oss_deleted'] += len(deleted_keys)
+                stats['rows_deleted'] += PackageRepository.delete_by_ids(ids)
+                if cache is not None:
+                    for oss_key in deleted_keys:
+                        cache.discard(oss_key)
+            except Exception as e:
+                db.session.rollback()
+                stats['errors'] += 1
+                logger.error(f"构建保留策略删除失败(第 {stats['chunks']} 批): {str(e)}")
+                ids = []
+
+            try:
+                delta_keys = PackageDeltaRepository.delete_for_packages(ids)
+                if delta_keys:
+                    delete_oss_files(delta_keys)
+                stats['deltas_deleted'] += len(delta_keys)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"构建保留策略删除增量补丁失败(第 {stats['chunks']} 批): {str(e)}")
+
+            if rate_limit:
+                wait = len(chunk) / rate_limit - (time.monotonic() - chunk_started)
+                if wait > 0:
+                    time.sleep(wait)
+
+    stats['elapsed'] = round(time.monotonic() - started, 3)
+    logger.info(
+        f"构建保留策略执行完成: 过期 {stats['expired']} 个，已删除 {stats['rows_deleted']} 个，"
+        f"失败批次 {stats['errors']}，耗时 {stats['elapsed']}s"
+    )
+    return stats
+
+
+def schedule_retention(delay=None, from_job=False):
+    """
+    投递下一次定时执行（PACKAGE_RETENTION_INTERVAL 为 0 时不投递）
+    已有待执行或执行中的保留任务时不重复投递
+    :param delay: 延迟秒数，默认等于执行间隔
+    :param from_job: 由保留任务自身调用，此时执行中的任务就是它自己
+    :return: Job 或 None
+    """
+    interval = Config.PACKAGE_RETENTION_INTERVAL
+    if interval <= 0:
+        return None
+    statuses = ('pending',) if from_job else ('pending', 'running')
+    if any(JobRepository.list(status=status, kind=RETENTION_JOB, limit=1) for status in statuses):
+        return None
+    return enqueue(RETENTION_JOB, {}, delay=interval if delay is None else delay)
+
+
+@job_handler(RETENTION_JOB)
+def run_retention():
+    """定时任务：限速执行保留策略，完成后投递下一次"""
+    # 失败不交给任务队列重试，否则重试任务和下一次定时任务会变成两条任务链
+    try:
+        apply_retention(rate_limit=Config.PACKAGE_RETENTION_RATE_LIMIT)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"构建保留策略执行失败: {str(e)}")
+    schedule_retention(from_job=True)
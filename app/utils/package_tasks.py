@@ -0,0 +1,152 @@
+"""软件包创建后的后台任务（OSS 相关的慢操作）"""
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+from config import Config
+from app.repositories.package_repository import PackageRepository
+from app.repositories.package_delta_repository import PackageDeltaRepository
+from .job_queue import job_handler
+from .oss_utils import get_bucket, get_object_key, put_bytes_to_oss
+from .package_cache import get_package_cache
+from .package_meta import extract_package_meta
+from .package_utils import decode_base64_image
+from .zip_delta import build_patch, apply_patch
+from .zip_reader import FileRangeSource
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler('package.upload_icon')
+def upload_icon(object_name, data):
+    """
+    上传应用图标
+    :param object_name: OSS上的目标路径
+    :param data: Base64 编码的PNG数据
+    """
+    put_bytes_to_oss(decode_base64_image(data), object_name, content_type='image/png')
+
+
+@job_handler('package.extract_meta')
+def extract_meta(package_id):
+    """
+    从安装包本身解析包名、版本、ABI 和图标并写回 packages 表
+    只读取 ZIP 中央目录和少数条目，不下载整个安装包
+    """
+    from .icon_utils import ingest_icon
+
+    package = PackageRepository.get(package_id)
+    if not package:
+        return
+
+    cache = get_package_cache()
+    local_path = cache.cached_path(package.oss_key) if cache else None
+    meta = extract_package_meta(
+        package.system,
+        oss_key=package.oss_key,
+        local_path=local_path,
+        bucket=get_bucket()
+    )
+
+    icon = meta.pop('icon')
+    icon_id = None
+    if icon and not package.icon_id:
+        icon_id = ingest_icon(icon)
+
+    # 客户端填写的包名/版本号与安装包不一致时只记录，不覆盖（筛选和安装清单都依赖这两个字段）
+    mismatches = {
+        field: meta[field]
+        for field in ('package_name', 'version')
+        if meta.get(field) and str(meta[field]) != getattr(package, field)
+    }
+    if mismatches:
+        logger.warning(f"软件包 {package_id} 的客户端字段与安装包不一致: {mismatches}")
+        meta['client_mismatch'] = mismatches
+    meta['extracted_at'] = datetime.utcnow().isoformat()
+
+    PackageRepository.update_build_meta(
+        package_id,
+        meta,
+        ar=meta.get('ar') if package.system == 'android' else None,
+        icon_id=icon_id
+    )
+
+
+@contextmanager
+def _package_source(oss_key):
+    """
+    安装包的本地数据源：优先使用本地磁盘缓存，未启用时下载到临时目录，用完删除
+    缓存文件在缓存锁内打开，读取期间被其他请求淘汰删除也不受影响
+    """
+    cache = get_package_cache()
+    if cache is not None:
+        source = FileRangeSource(cache.open_file(oss_key))
+        try:
+            yield source
+        finally:
+            source.close()
+        return
+
+    tmp_dir = tempfile.mkdtemp(prefix='package-')
+    try:
+        path = os.path.join(tmp_dir, os.path.basename(oss_key) or 'package')
+        get_bucket().get_object_to_file(oss_key, path)
+        source = FileRangeSource(path)
+        try:
+            yield source
+        finally:
+            source.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class _DiscardWriter:
+    def write(self, data):
+        return len(data)
+
+
+@job_handler('package.build_delta')
+def build_delta(package_id, from_id=None):
+    """
+    生成 from_id -> package_id 的增量补丁并上传到OSS
+    未指定 from_id 时与同一包名/系统/渠道的上一个构建比较；只处理 Android 安装包
+    """
+    package = PackageRepository.get(package_id)
+    if not package or package.system != 'android':
+        return
+    previous = PackageRepository.get(from_id) if from_id else PackageRepository.get_previous_build(package)
+    if previous is None:
+        return
+
+    delta, _ = PackageDeltaRepository.request(previous.id, package.id)
+    if delta.status in ('ready', 'skipped'):
+        return
+
+    try:
+        with _package_source(previous.oss_key) as old_source, _package_source(package.oss_key) as new_source:
+            with tempfile.TemporaryFile() as patch:
+                stats = build_patch(old_source, new_source, patch)
+                size = patch.tell()
+                if size > new_source.size * Config.DELTA_MAX_RATIO:
+                    logger.info(f"补丁 {previous.id}->{package.id} 收益不足，跳过: {size}/{new_source.size}")
+                    PackageDeltaRepository.update_status(
+                        delta.id, 'skipped', size=size, full_size=new_source.size)
+                    return
+
+                # 上传前先完整还原一遍，确认补丁可用
+                patch.seek(0)
+                apply_patch(old_source, patch, _DiscardWriter())
+
+                patch.seek(0)
+                oss_key = get_object_key(f"package_deltas/{previous.id}-{package.id}.patch")
+                get_bucket().put_object(oss_key, patch)
+    except Exception as e:
+        PackageDeltaRepository.update_status(delta.id, 'failed', error=str(e))
+        raise
+
+    PackageDeltaRepository.update_status(
+        delta.id, 'ready', oss_key=oss_key, size=size, full_size=new_source.size, error=None)
+    logger.info(f"补丁 {previous.id}->{package.id} 已生成: {size} 字节，复用 {stats['copy_bytes']} 字节")
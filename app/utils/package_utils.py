@@ -1,11 +1,16 @@
 # app/utils.py
 import os
+import base64
+import binascii
+import plistlib
 import zipfile
 import logging
 from functools import wraps
 from typing import Optional, Tuple
 from flask import current_app, request
 
+from .package_meta import list_abis, describe_abis
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,22 +36,8 @@ def check_apk_architecture(apk_path: str) -> str:
     Returns:
         str: 架构描述 (x32/x64/x32、x64/未知)
     """
-    arch = {"32bit": False, "64bit": False}
-    
     with zipfile.ZipFile(apk_path, 'r') as zf:
-        for file in zf.namelist():
-            if 'lib/armeabi' in file:
-                arch["32bit"] = True
-            elif 'lib/arm64-v8a' in file:
-                arch["64bit"] = True
-
-    if arch["32bit"] and arch["64bit"]:
-        return "x32、x64"
-    elif arch["32bit"]:
-        return "x32"
-    elif arch["64bit"]:
-        return "x64"
-    return "未知"
+        return describe_abis(list_abis(zf.namelist()))
 
 @handle_errors
 def extract_info_plist(ipa_path: str) -> Optional[str]:
@@ -129,3 +120,75 @@ def validate_file_type(filename: str, allowed_extensions: Tuple[str]) -> bool:
     """
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+@handle_errors
+def decode_base64_image(base64_data: str) -> bytes:
+    """解码Base64图片数据
+    
+    Args:
+        base64_data: Base64字符串（可带 data:image/png;base64, 前缀）
+        
+    Returns:
+        bytes: 图片二进制内容
+
+    Raises:
+        ValueError: 不是合法的Base64数据
+    """
+    # 移除可能的Base64前缀
+    if ";base64," in base64_data:
+        base64_data = base64_data.split(";base64,")[1]
+    # 严格校验字符集和填充，非法数据直接拒绝，而不是静默丢弃字符后得到损坏的图片；允许按行折行的编码
+    try:
+        return base64.b64decode(''.join(base64_data.split()), validate=True)
+    except binascii.Error as e:
+        raise ValueError(f"Invalid base64 image data: {str(e)}") from e
+
+APP_TITLES = ["学测学生端", "学测教师端", "学测家长端"]
+
+@handle_errors
+def get_app_title(appname: str) -> str:
+    """根据 appname（应用序号）获取应用显示名称
+    
+    Args:
+        appname: 应用序号字符串，如 "0"
+        
+    Returns:
+        str: 应用名称，无法映射时原样返回
+    """
+    try:
+        return APP_TITLES[int(appname)]
+    except (TypeError, ValueError, IndexError):
+        return appname
+
+@handle_errors
+def build_install_manifest(package_url: str, bundle_id: str, version: str, title: str) -> bytes:
+    """生成 itms-services 安装清单(manifest.plist)
+    
+    Args:
+        package_url: IPA 下载地址
+        bundle_id: Bundle Identifier
+        version: 版本号
+        title: 安装时显示的应用名称
+        
+    Returns:
+        bytes: XML 格式的 plist 内容
+    """
+    manifest = {
+        'items': [{
+            'assets': [
+                {'kind': 'software-package', 'url': package_url},
+                {
+                    'kind': 'full-size-image',
+                    'needs-shine': True,
+                    'url': 'https://enterprise.cloudpay.com.cn/app/packages/iphone-2x.png'
+                }
+            ],
+            'metadata': {
+                'bundle-identifier': bundle_id,
+                'bundle-version': version,
+                'kind': 'software',
+                'title': title
+            }
+        }]
+    }
+    return plistlib.dumps(manifest, fmt=plistlib.FMT_XML, sort_keys=False)
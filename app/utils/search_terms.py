@@ -0,0 +1,62 @@
+"""
+文档全文检索的分词：中文按单字 + 相邻双字切分，英文和数字按单词(小写)切分
+建索引时单字和双字都写入；查询时两个字以上的中文片段只用双字，单个汉字才用单字
+"""
+import math
+import re
+from collections import Counter
+
+MAX_TERM_LENGTH = 32   # 与 doc_search_terms.term 列长度一致
+TITLE_WEIGHT = 2       # 标题中的词项按出现 2 次计
+
+_TOKEN_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+')
+
+
+def _runs(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def _bigrams(run):
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def index_terms(text):
+    """建索引用的词项序列（可重复）"""
+    terms = []
+    for run in _runs(text):
+        if run.isascii():
+            terms.append(run[:MAX_TERM_LENGTH])
+        else:
+            terms.extend(run)
+            terms.extend(_bigrams(run))
+    return terms
+
+
+def query_terms(text):
+    """查询用的词项，去重并保持顺序"""
+    terms = []
+    for run in _runs(text):
+        if run.isascii():
+            terms.append(run[:MAX_TERM_LENGTH])
+        elif len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(_bigrams(run))
+    return list(dict.fromkeys(terms))
+
+
+def document_terms(title, short_content):
+    """
+    :return: (Counter 词项 -> 加权词频, 加权长度)
+    """
+    counts = Counter()
+    for term in index_terms(title):
+        counts[term] += TITLE_WEIGHT
+    for term in index_terms(short_content):
+        counts[term] += 1
+    return counts, sum(counts.values())
+
+
+def bm25_idf(df, total):
+    """BM25 的逆文档频率（加 1 保证常见词不为负）"""
+    return math.log(1 + (total - df + 0.5) / (df + 0.5))
@@ -0,0 +1,118 @@
+import calendar
+import logging
+import secrets
+import threading
+import time
+from datetime import datetime
+
+
+def parse_expiration(expiration):
+    """解析 STS 返回的 UTC 过期时间（如 2025-01-01T00:00:00Z）为时间戳"""
+    return calendar.timegm(datetime.strptime(expiration, '%Y-%m-%dT%H:%M:%SZ').timetuple())
+
+
+class LocalStsResponder:
+    """
+    STS AssumeRole 的本地替身，返回结构与阿里云 STS 的 Credentials 一致
+    用于测试和离线环境（OSS_BACKEND=local）
+    """
+
+    def __init__(self, duration_seconds):
+        self.duration_seconds = duration_seconds
+        self.calls = 0
+
+    def assume_role(self, scope):
+        self.calls += 1
+        expiration = datetime.utcfromtimestamp(time.time() + self.duration_seconds)
+        return {
+            'AccessKeyId': f"STS.local{secrets.token_hex(8)}",
+            'AccessKeySecret': secrets.token_hex(16),
+            'SecurityToken': secrets.token_urlsafe(32),
+            'Expiration': expiration.strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+
+
+class _Flight:
+    """一次正在进行中的凭证刷新，同 scope 的并发请求共享结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.credentials = None
+        self.error = None
+
+
+class StsCredentialCache:
+    """
+    按 scope（用户/权限策略）缓存 STS 临时凭证
+
+    - 剩余有效期大于 safety_margin 的凭证直接复用
+    - 剩余有效期小于 refresh_margin 时在后台线程刷新，期间继续返回旧凭证
+    - 同一 scope 同时只有一个 AssumeRole 请求（single-flight）
+    """
+
+    def __init__(self, fetcher, safety_margin=120, refresh_margin=300):
+        self._fetcher = fetcher
+        self.safety_margin = safety_margin
+        self.refresh_margin = refresh_margin
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope):
+        """
+        获取 scope 对应的凭证
+        :param scope: 可哈希的缓存键，如 (user_id, policy)
+        :return: STS Credentials 字典
+        """
+        entry = self._entries.get(scope)
+        now = time.time()
+        if entry:
+            credentials, expires_at = entry
+            if now < expires_at - self.safety_margin:
+                if now >= expires_at - self.refresh_margin:
+                    self._refresh(scope, wait=False)
+                return credentials
+        return self._refresh(scope, wait=True)
+
+    def invalidate(self, scope=None):
+        with self._lock:
+            if scope is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(scope, None)
+
+    def _refresh(self, scope, wait):
+        with self._lock:
+            flight = self._flights.get(scope)
+            leader = flight is None
+            if leader:
+                flight = self._flights[scope] = _Flight()
+
+        if leader:
+            if wait:
+                self._run(scope, flight)
+            else:
+                threading.Thread(target=self._run, args=(scope, flight), daemon=True).start()
+                return None
+
+        if not wait:
+            return None
+
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.credentials
+
+    def _run(self, scope, flight):
+        try:
+            credentials = self._fetcher(scope)
+            with self._lock:
+                self._entries[scope] = (credentials, parse_expiration(credentials['Expiration']))
+            flight.credentials = credentials
+        except Exception as e:
+            logging.error(f"STS 凭证刷新失败: {str(e)}")
+            flight.error = e
+        finally:
+            with self._lock:
+                self._flights.pop(scope, None)
+            flight.done.set()
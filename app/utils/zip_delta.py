@@ -0,0 +1,172 @@
+"""
+APK 增量补丁：按 ZIP 条目比较两个构建，未变化条目的压缩数据直接引用旧文件
+
+补丁格式（版本 1）：
+    头部  MAGIC + <B 版本> + <Q 旧文件大小> + <Q 新文件大小> + 新文件 MD5(16字节)
+    正文  zlib 压缩的操作流
+          b'C' <Q 旧文件偏移> <Q 长度>   从旧文件复制
+          b'D' <Q 长度> <数据>           直接写入
+          b'E'                           结束
+按顺序执行全部操作即可逐字节还原新文件（包括签名块和中央目录），客户端校验 MD5 后安装。
+只有名称、压缩方式、CRC 和大小都相同的条目才会复制，其余区域（本地文件头、变化的条目、
+APK 签名块、中央目录）全部作为数据写入。
+"""
+import hashlib
+import struct
+import zlib
+
+from .zip_reader import ZipDirectory
+
+MAGIC = b'APKDELTA'
+VERSION = 1
+HEADER_STRUCT = struct.Struct('<8sBQQ16s')
+COPY_STRUCT = struct.Struct('<QQ')
+DATA_STRUCT = struct.Struct('<Q')
+
+READ_CHUNK = 4 * 1024 * 1024
+
+
+class DeltaFormatError(Exception):
+    """补丁文件损坏或与旧文件不匹配"""
+    pass
+
+
+def _data_span(zip_dir, entry):
+    """条目压缩数据在文件中的 [start, end)"""
+    start = zip_dir.data_offset(entry)
+    return start, start + entry.compressed_size
+
+
+def plan_delta(old_dir, new_dir):
+    """
+    生成还原新文件所需的操作序列
+    :return: [('C', 旧偏移, 长度) | ('D', 新偏移, 长度)]，相邻的同类操作已合并
+    :raises DeltaFormatError: 条目数据区重叠或越界，无法按顺序还原
+    """
+    old_entries = old_dir.entries
+    ops = []
+
+    def emit(kind, offset, length):
+        if length <= 0:
+            return
+        if ops and ops[-1][0] == kind and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = (kind, ops[-1][1], ops[-1][2] + length)
+        else:
+            ops.append((kind, offset, length))
+
+    position = 0
+    for entry in sorted(new_dir.entries.values(), key=lambda e: e.header_offset):
+        old = old_entries.get(entry.name)
+        if old is None or (old.method, old.crc, old.compressed_size, old.file_size) != \
+                (entry.method, entry.crc, entry.compressed_size, entry.file_size) or entry.compressed_size == 0:
+            continue
+        start, end = _data_span(new_dir, entry)
+        old_start, _ = _data_span(old_dir, old)
+        if start < position or end > new_dir.source.size:
+            raise DeltaFormatError(f"条目数据区重叠或越界: {entry.name}")
+        emit('D', position, start - position)
+        emit('C', old_start, entry.compressed_size)
+        position = end
+    emit('D', position, new_dir.source.size - position)
+    return ops
+
+
+def build_patch(old_source, new_source, out):
+    """
+    生成补丁并写入 out（可写的二进制文件对象）
+    :param old_source: 旧文件数据源（zip_reader 的 FileRangeSource/BucketRangeSource）
+    :param new_source: 新文件数据源
+    :return: 统计信息 {'copy_bytes', 'data_bytes', 'ops'}
+    """
+    old_dir = ZipDirectory(old_source)
+    new_dir = ZipDirectory(new_source)
+    ops = plan_delta(old_dir, new_dir)
+
+    # 校验值取自新文件本身而不是操作序列，还原结果与新文件不一致时 apply_patch 才能发现
+    md5 = hashlib.md5()
+    for chunk_offset in range(0, new_source.size, READ_CHUNK):
+        md5.update(new_source.read(chunk_offset, min(READ_CHUNK, new_source.size - chunk_offset)))
+
+    out.write(HEADER_STRUCT.pack(MAGIC, VERSION, old_source.size, new_source.size, md5.digest()))
+    compressor = zlib.compressobj(6)
+    stats = {'copy_bytes': 0, 'data_bytes': 0, 'ops': len(ops)}
+    for kind, offset, length in ops:
+        if kind == 'C':
+            out.write(compressor.compress(b'C' + COPY_STRUCT.pack(offset, length)))
+            stats['copy_bytes'] += length
+        else:
+            out.write(compressor.compress(b'D' + DATA_STRUCT.pack(length)))
+            for chunk_offset in range(offset, offset + length, READ_CHUNK):
+                out.write(compressor.compress(
+                    new_source.read(chunk_offset, min(READ_CHUNK, offset + length - chunk_offset))))
+            stats['data_bytes'] += length
+    out.write(compressor.compress(b'E'))
+    out.write(compressor.flush())
+    return stats
+
+
+class _Inflater:
+    """从补丁正文中按需解压指定字节数"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._decompressor = zlib.decompressobj()
+        self._buffer = b''
+        self._pos = 0
+
+    def read(self, size):
+        while len(self._buffer) - self._pos < size:
+            data = self._stream.read(READ_CHUNK)
+            tail = self._buffer[self._pos:]
+            self._pos = 0
+            if not data:
+                self._buffer = tail + self._decompressor.flush()
+                if len(self._buffer) < size:
+                    raise DeltaFormatError("补丁数据不完整")
+                break
+            self._buffer = tail + self._decompressor.decompress(data)
+        result = self._buffer[self._pos:self._pos + size]
+        self._pos += size
+        return result
+
+
+def apply_patch(old_source, patch, out):
+    """
+    用旧文件和补丁还原新文件并校验 MD5
+    :param old_source: 旧文件数据源
+    :param patch: 补丁文件对象
+    :param out: 新文件写入目标
+    :raises DeltaFormatError: 补丁损坏、旧文件不匹配或校验失败
+    """
+    magic, version, old_size, new_size, expected_md5 = HEADER_STRUCT.unpack(patch.read(HEADER_STRUCT.size))
+    if magic != MAGIC or version != VERSION:
+        raise DeltaFormatError("不是支持的补丁格式")
+    if old_size != old_source.size:
+        raise DeltaFormatError("旧文件大小与补丁不匹配")
+
+    inflater = _Inflater(patch)
+    md5 = hashlib.md5()
+    written = 0
+    while True:
+        op = inflater.read(1)
+        if op == b'E':
+            break
+        if op == b'C':
+            offset, length = COPY_STRUCT.unpack(inflater.read(COPY_STRUCT.size))
+            reader = lambda pos, size, base=offset: old_source.read(base + pos, size)
+        elif op == b'D':
+            length, = DATA_STRUCT.unpack(inflater.read(DATA_STRUCT.size))
+            reader = lambda pos, size: inflater.read(size)
+        else:
+            raise DeltaFormatError(f"未知的补丁操作: {op!r}")
+
+        for pos in range(0, length, READ_CHUNK):
+            data = reader(pos, min(READ_CHUNK, length - pos))
+            md5.update(data)
+            out.write(data)
+        written += length
+
+    if written != new_size or md5.digest() != expected_md5:
+        raise DeltaFormatError("还原后的文件校验失败")
+    return written
+
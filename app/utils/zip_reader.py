@@ -0,0 +1,203 @@
+"""
+只读取 ZIP 目录和所需条目的读取器
+
+APK/IPA 都是 ZIP 文件。先按范围读取文件尾部的 End Of Central Directory，
+再读取中央目录，之后只拉取需要的条目（如 AndroidManifest.xml、Info.plist），
+几百 MB 的安装包只需要几百 KB 的 I/O。数据源可以是 OSS（HTTP Range）或本地文件（mmap）。
+"""
+import mmap
+import struct
+import zlib
+from collections import namedtuple
+
+EOCD_SIG = b'PK\x05\x06'
+ZIP64_LOCATOR_SIG = b'PK\x06\x07'
+ZIP64_EOCD_SIG = b'PK\x06\x06'
+CENTRAL_DIR_SIG = b'PK\x01\x02'
+LOCAL_HEADER_SIG = b'PK\x03\x04'
+
+EOCD_STRUCT = struct.Struct('<4s4H2LH')
+ZIP64_LOCATOR_STRUCT = struct.Struct('<4sLQL')
+ZIP64_EOCD_STRUCT = struct.Struct('<4sQ2H2L4Q')
+CENTRAL_DIR_STRUCT = struct.Struct('<4s6H3L5H2L')
+LOCAL_HEADER_STRUCT = struct.Struct('<4s5H3L2H')
+
+MAX_EOCD_SEARCH = EOCD_STRUCT.size + 0xFFFF  # EOCD + 最长注释
+
+ZipEntry = namedtuple('ZipEntry', 'name method crc compressed_size file_size header_offset')
+
+
+class ZipFormatError(Exception):
+    """不是合法的ZIP文件或使用了不支持的特性"""
+    pass
+
+
+class BucketRangeSource:
+    """通过 OSS Range 请求按需读取对象"""
+
+    def __init__(self, bucket, key, size=None):
+        self.bucket = bucket
+        self.key = key
+        self.size = size if size is not None else bucket.head_object(key).content_length
+        self.bytes_read = 0
+
+    def read(self, offset, length):
+        if length <= 0:
+            return b''
+        end = min(offset + length, self.size) - 1
+        data = self.bucket.get_object(self.key, byte_range=(offset, end)).read()
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        pass
+
+
+class FileRangeSource:
+    """通过 mmap 读取本地文件，只有被访问的页才会真正读盘"""
+
+    def __init__(self, path_or_file):
+        """:param path_or_file: 本地文件路径，或已打开的二进制文件（close() 时一并关闭）"""
+        self._file = path_or_file if hasattr(path_or_file, 'fileno') else open(path_or_file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._mmap)
+        self.bytes_read = 0
+
+    def read(self, offset, length):
+        data = self._mmap[offset:offset + length]
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+class ZipDirectory:
+    """
+    ZIP 中央目录
+    :param source: 提供 size 属性和 read(offset, length) 方法的数据源
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.entries = {}
+        self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.source.close()
+
+    def namelist(self):
+        return list(self.entries)
+
+    def _load(self):
+        tail_size = min(self.source.size, MAX_EOCD_SEARCH)
+        tail_offset = self.source.size - tail_size
+        tail = self.source.read(tail_offset, tail_size)
+
+        pos = tail.rfind(EOCD_SIG)
+        if pos < 0 or len(tail) - pos < EOCD_STRUCT.size:
+            raise ZipFormatError("未找到 End Of Central Directory")
+        (_, _, _, _, count, cd_size, cd_offset, _) = EOCD_STRUCT.unpack_from(tail, pos)
+
+        if 0xFFFFFFFF in (cd_size, cd_offset) or count == 0xFFFF:
+            count, cd_size, cd_offset = self._load_zip64(tail, tail_offset, pos)
+
+        # 中央目录通常就在 EOCD 之前，已经在尾部数据中时不再重复读取
+        if cd_offset >= tail_offset:
+            directory = tail[cd_offset - tail_offset:cd_offset - tail_offset + cd_size]
+        else:
+            directory = self.source.read(cd_offset, cd_size)
+        self._parse_directory(directory, count)
+
+    def _load_zip64(self, tail, tail_offset, eocd_pos):
+        locator_pos = eocd_pos - ZIP64_LOCATOR_STRUCT.size
+        if locator_pos < 0 or tail[locator_pos:locator_pos + 4] != ZIP64_LOCATOR_SIG:
+            raise ZipFormatError("缺少 ZIP64 locator")
+        _, _, eocd64_offset, _ = ZIP64_LOCATOR_STRUCT.unpack_from(tail, locator_pos)
+
+        if eocd64_offset >= tail_offset:
+            record = tail[eocd64_offset - tail_offset:eocd64_offset - tail_offset + ZIP64_EOCD_STRUCT.size]
+        else:
+            record = self.source.read(eocd64_offset, ZIP64_EOCD_STRUCT.size)
+        if record[:4] != ZIP64_EOCD_SIG:
+            raise ZipFormatError("ZIP64 End Of Central Directory 损坏")
+        fields = ZIP64_EOCD_STRUCT.unpack(record)
+        return fields[7], fields[8], fields[9]
+
+    def _parse_directory(self, data, count):
+        pos = 0
+        for _ in range(count):
+            if data[pos:pos + 4] != CENTRAL_DIR_SIG:
+                raise ZipFormatError("中央目录损坏")
+            (_, _, _, flags, method, _, _, crc, csize, usize,
+             name_len, extra_len, comment_len, _, _, _, offset) = CENTRAL_DIR_STRUCT.unpack_from(data, pos)
+            pos += CENTRAL_DIR_STRUCT.size
+
+            raw_name = data[pos:pos + name_len]
+            name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+            extra = data[pos + name_len:pos + name_len + extra_len]
+            pos += name_len + extra_len + comment_len
+
+            if 0xFFFFFFFF in (csize, usize, offset):
+                usize, csize, offset = self._apply_zip64_extra(extra, usize, csize, offset)
+
+            self.entries[name] = ZipEntry(name, method, crc, csize, usize, offset)
+
+    @staticmethod
+    def _apply_zip64_extra(extra, usize, csize, offset):
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, size = struct.unpack_from('<2H', extra, pos)
+            if header_id == 0x0001:
+                values = iter(struct.unpack_from(f'<{size // 8}Q', extra, pos + 4))
+                if usize == 0xFFFFFFFF:
+                    usize = next(values)
+                if csize == 0xFFFFFFFF:
+                    csize = next(values)
+                if offset == 0xFFFFFFFF:
+                    offset = next(values)
+                break
+            pos += 4 + size
+        return usize, csize, offset
+
+    def data_offset(self, entry):
+        """条目压缩数据在文件中的起始位置"""
+        header = self.source.read(entry.header_offset, LOCAL_HEADER_STRUCT.size)
+        return self._data_offset(entry, header)
+
+    @staticmethod
+    def _data_offset(entry, header):
+        if header[:4] != LOCAL_HEADER_SIG:
+            raise ZipFormatError(f"本地文件头损坏: {entry.name}")
+        fields = LOCAL_HEADER_STRUCT.unpack_from(header)
+        return entry.header_offset + LOCAL_HEADER_STRUCT.size + fields[9] + fields[10]
+
+    def read(self, name):
+        """读取并解压单个条目"""
+        entry = self.entries.get(name)
+        if entry is None:
+            raise KeyError(name)
+
+        # 一次请求同时取回本地文件头和数据（额外预留一段给 extra 字段），多数情况下不需要第二次往返
+        guess = LOCAL_HEADER_STRUCT.size + len(name.encode('utf-8')) + 64
+        chunk = self.source.read(entry.header_offset, guess + entry.compressed_size)
+        start = self._data_offset(entry, chunk) - entry.header_offset
+        if start + entry.compressed_size <= len(chunk):
+            raw = chunk[start:start + entry.compressed_size]
+        else:
+            raw = self.source.read(entry.header_offset + start, entry.compressed_size)
+
+        if entry.method == 0:
+            data = raw
+        elif entry.method == 8:
+            data = zlib.decompress(raw, -15)
+        else:
+            raise ZipFormatError(f"不支持的压缩方式 {entry.method}: {name}")
+
+        if zlib.crc32(data) & 0xFFFFFFFF != entry.crc:
+            raise ZipFormatError(f"CRC 校验失败: {name}")
+        return data
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
@@ -33,9 +34,68 @@ class Config:
     OSS_BUCKET = os.getenv('OSS_BUCKET')
     OSS_ROLE_ARN = os.getenv('OSS_ROLE_ARN')  # RAM 角色 ARN
     OSS_TOKEN_EXPIRE = 900  # 临时凭证有效期（秒，建议 15 分钟）
+    OSS_TOKEN_SAFETY_MARGIN = 120     # 剩余有效期低于该值的缓存凭证不再下发(秒)
+    OSS_TOKEN_REFRESH_MARGIN = 300    # 剩余有效期低于该值时后台刷新凭证(秒)
+
+    # OSS客户端配置
+    OSS_BACKEND = os.getenv('OSS_BACKEND', 'oss')  # oss-阿里云OSS / local-本地文件系统替身(离线测试、压测)
+    OSS_LOCAL_ROOT = os.getenv('OSS_LOCAL_ROOT', 'local_oss')  # local 后端的存储目录
+    OSS_CONNECTION_POOL_SIZE = int(os.getenv('OSS_CONNECTION_POOL_SIZE', '20'))  # 每个进程的HTTP连接池大小
+    OSS_CONNECT_TIMEOUT = 10          # 建立连接超时时间(秒)
+    OSS_HEALTH_CHECK_INTERVAL = 300   # Bucket 健康检查间隔(秒)
+
+    # 下载签名URL配置
+    OSS_CUSTOM_DOMAIN = os.getenv('OSS_CUSTOM_DOMAIN', 'oss.superrabbithero.xyz')  # 已绑定到Bucket的自定义域名
+    OSS_URL_EXPIRE = 3600             # 签名URL最短有效期(秒)
+    OSS_URL_EXPIRE_BUCKET = 600       # 过期时间取整粒度(秒)，同一时间段内同一文件URL不变，便于CDN缓存
+    OSS_URL_CACHE_SIZE = 10000        # 签名URL缓存条数
+    OSS_BATCH_SIGN_LIMIT = 500        # 批量签名接口单次最多key数
+
+    ICON_CACHE_SIZE = 1024            # 图标 md5->id 缓存条数
+    PACKAGE_BULK_LIMIT = 50           # 批量创建接口单次最多条数
+    STATS_FLUSH_INTERVAL = 5          # 下载统计写入数据库的间隔(秒)
+    DELTA_MAX_RATIO = 0.8             # 增量补丁超过新安装包大小的该比例时不保存，直接下载完整安装包
+    DELTA_MAX_FROM_BUILDS = int(os.getenv('DELTA_MAX_FROM_BUILDS', 5))  # 只为同渠道最近 N 个更早的构建生成补丁
+
+    # 构建保留规则(JSON列表)，按顺序匹配，每个包只受第一条匹配规则约束；appname/system 为 * 表示不限，is_debug 省略表示不限
+    # per: version-每个版本保留最近 keep_last 个构建，app-整个应用保留最近 keep_last 个；min_age_days 内的构建不删除
+    # 例: [{"appname": "*", "system": "*", "is_debug": true, "keep_last": 3, "per": "version", "min_age_days": 7}]
+    PACKAGE_RETENTION_RULES = json.loads(os.getenv('PACKAGE_RETENTION_RULES', '[]'))
+    PACKAGE_RETENTION_INTERVAL = int(os.getenv('PACKAGE_RETENTION_INTERVAL', '0'))  # 定时执行间隔(秒)，0 表示不定时执行
+    PACKAGE_RETENTION_RATE_LIMIT = 20  # 定时执行时每秒最多删除的包数
+
+    HOME_FEED_PER_PAGE = 10           # 首页默认每页数量，构建和写入后预渲染这个大小的第一页
+    HOME_FEED_CACHE_SIZE = 2000       # 首页已渲染响应体的缓存条数(筛选条件 x 页码)
+    HOME_FEED_PER_PAGE_LIMIT = 50     # 首页每页最多条数
+
+    # 文档全文检索(BM25)参数
+    SEARCH_BM25_K1 = 1.2              # 词频饱和度
+    SEARCH_BM25_B = 0.75              # 文档长度归一化程度
+    SEARCH_STATS_TTL = 300            # 文档总数/平均长度的缓存时间(秒)，只影响打分
+    SEARCH_PER_PAGE_LIMIT = 50        # 检索接口每页最多条数
+
+    # 软件包本地磁盘缓存（局域网高频下载），为空时不启用，下载直接走OSS
+    PACKAGE_CACHE_DIR = os.getenv('PACKAGE_CACHE_DIR')
+    PACKAGE_CACHE_MAX_BYTES = int(os.getenv('PACKAGE_CACHE_MAX_BYTES', str(20 * 1024 ** 3)))  # 缓存总大小上限(字节)
+    PACKAGE_CACHE_MAX_AGE = 3600      # 下载响应的浏览器缓存时间(秒)
+
+    # iOS 安装清单(manifest.plist)对外地址前缀，如 https://api.example.com；为空时按请求域名生成
+    MANIFEST_BASE_URL = os.getenv('MANIFEST_BASE_URL')
 
     APP_ENV = os.getenv('APP_ENV', 'production')  # 默认为生产环境
 
+    PACKAGE_CATALOG_ENABLED = os.getenv('PACKAGE_CATALOG_ENABLED', 'true').lower() == 'true'  # 版本列表/计数/搜索走进程内目录索引
+    CATALOG_CHECK_INTERVAL = 2        # 内存目录索引检查数据库变更代数的间隔(秒)，其他进程的写入最多延迟这么久可见
+
+    # 后台任务队列配置
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # 每个进程的任务线程数，0 表示不在本进程执行任务
+    JOB_POLL_INTERVAL = 1.0           # 无任务时的轮询间隔(秒)
+    JOB_MAX_ATTEMPTS = 5              # 最大执行次数
+    JOB_RETRY_BASE_DELAY = 10         # 重试退避基数(秒)，第 n 次失败后等待 base * 2^(n-1)
+    JOB_RETRY_MAX_DELAY = 3600        # 重试最长等待(秒)
+    JOB_LOCK_TIMEOUT = 600            # 超过该时长没有心跳的执行中任务视为 worker 已崩溃，重新入队(秒)
+    JOB_HEARTBEAT_INTERVAL = 30       # 执行中任务的心跳间隔(秒)，须远小于 JOB_LOCK_TIMEOUT
+
     AI_API_KEY = os.getenv('AI_API_KEY')
 
     